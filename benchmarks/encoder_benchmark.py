@@ -0,0 +1,179 @@
+'''
+Compares the speed of the encoders that create the ".webp" copies (see
+`webp_encoders`) and the size of the files they create. Every image is
+converted by every encoder, one image at a time, into a temporary folder that
+is deleted at the end. The images themselves are never touched.
+
+When FFMPEG is found, the same images are also converted in batches (see
+`ffmpeg_webp_encoder.create_webp_copies_in_batch`, and the `-B` flag of the
+tool), so the time saved by starting FFMPEG once per batch instead of once per
+image can be compared. A batch size of 1 converts each image on its own.
+
+By default, synthetic images are used (see `synthetic_world.py`). The images
+of a real world can be used instead with `--images`.
+
+Usage:
+    python benchmarks/encoder_benchmark.py [--ffmpeg FFMPEG_LOCATION] [--images IMG_FOLDER]
+                                           [--tokens NUMBER] [--maps NUMBER] [--batch-sizes 1,4,16]
+'''
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from synthetic_world import create_synthetic_images
+
+import jegasus_world_manager as jwm
+
+
+def benchmark_webp_encoders(img_paths=None, encoders=None, output_folder=None):
+    '''
+    Converts every image with every encoder, one image at a time.
+
+    INPUTS:
+    -------
+    img_paths (LIST) : File paths of the images to be converted.
+    encoders (LIST) : List of `webp_encoder` objects (see `get_webp_encoder`).
+    output_folder (STR) : Folder where the ".webp" copies are written.
+
+    RETURNS:
+    --------
+    benchmark_results (DICT) : Results of each encoder, indexed by encoder
+        name. Only the images that every encoder converted are counted in the
+        sizes, so that the sizes can be compared.
+        Structure of output:
+        benchmark_results = {'ffmpeg':{'images':200, 'failed':0, 'seconds':9.1, 'images_per_second':22.0,
+                                       'input_bytes':5200000, 'output_bytes':1100000},
+                             'pillow':{...}}
+    '''
+    benchmark_results = {}
+    output_sizes = {}
+    for this_encoder in encoders:
+        webp_img_paths = [os.path.join(output_folder, f'{this_encoder.encoder_name}_{img_number}.webp')
+                          for img_number in range(len(img_paths))]
+        start_time = time.perf_counter()
+        return_codes = [this_encoder.create_webp_copy(this_img_path, this_webp_img_path)
+                        for this_img_path, this_webp_img_path in zip(img_paths, webp_img_paths)]
+        elapsed_seconds = time.perf_counter() - start_time
+
+        output_sizes[this_encoder.encoder_name] = {img_number: os.path.getsize(this_webp_img_path)
+                                                   for img_number, (this_return_code, this_webp_img_path)
+                                                   in enumerate(zip(return_codes, webp_img_paths))
+                                                   if this_return_code == 0 and os.path.isfile(this_webp_img_path)}
+        benchmark_results[this_encoder.encoder_name] = {'images': len(img_paths),
+                                                        'failed': len(img_paths) - len(output_sizes[this_encoder.encoder_name]),
+                                                        'seconds': elapsed_seconds,
+                                                        'images_per_second': len(img_paths) / max(elapsed_seconds, 1e-9)}
+
+    # Comparing the sizes only over the images that all encoders converted
+    converted_by_all = set(range(len(img_paths)))
+    for this_encoder_name in output_sizes:
+        converted_by_all &= set(output_sizes[this_encoder_name])
+    for this_encoder_name, this_result in benchmark_results.items():
+        this_result['input_bytes'] = sum(os.path.getsize(img_paths[img_number]) for img_number in converted_by_all)
+        this_result['output_bytes'] = sum(output_sizes[this_encoder_name][img_number] for img_number in converted_by_all)
+
+    return benchmark_results
+
+
+def benchmark_ffmpeg_batch_sizes(img_paths=None, ffmpeg_encoder=None, output_folder=None, batch_sizes=None):
+    '''
+    Converts every image with FFMPEG, in batches of each of the `batch_sizes`.
+
+    INPUTS:
+    -------
+    img_paths (LIST) : File paths of the images to be converted.
+    ffmpeg_encoder (ffmpeg_webp_encoder) : Encoder that calls FFMPEG.
+    output_folder (STR) : Folder where the ".webp" copies are written.
+    batch_sizes (LIST) : Number of images converted by each FFMPEG call. Ex: [1, 4, 16]
+
+    RETURNS:
+    --------
+    batch_results (DICT) : Results of each batch size. Structure of output:
+        batch_results = {1:{'ffmpeg_calls':200, 'failed':0, 'seconds':9.1, 'images_per_second':22.0},
+                         16:{...}}
+    '''
+    batch_results = {}
+    for this_batch_size in batch_sizes:
+        webp_img_paths = [os.path.join(output_folder, f'batch{this_batch_size}_{img_number}.webp')
+                          for img_number in range(len(img_paths))]
+        return_codes = []
+        start_time = time.perf_counter()
+        for batch_start in range(0, len(img_paths), this_batch_size):
+            return_codes += ffmpeg_encoder.create_webp_copies_in_batch(img_paths[batch_start:batch_start + this_batch_size],
+                                                                       webp_img_paths[batch_start:batch_start + this_batch_size])
+        elapsed_seconds = time.perf_counter() - start_time
+
+        batch_results[this_batch_size] = {'ffmpeg_calls': -(-len(img_paths) // this_batch_size),
+                                          'failed': sum(this_return_code != 0 for this_return_code in return_codes),
+                                          'seconds': elapsed_seconds,
+                                          'images_per_second': len(img_paths) / max(elapsed_seconds, 1e-9)}
+    return batch_results
+
+
+def get_installed_encoders(ffmpeg_location=None):
+    '''
+    Returns the encoders that can run here: FFMPEG when it is found, and
+    Pillow when it is installed.
+    '''
+    encoders = []
+    ffmpeg_location = ffmpeg_location or shutil.which('ffmpeg')
+    if ffmpeg_location:
+        encoders.append(jwm.get_webp_encoder('ffmpeg', ffmpeg_location))
+    else:
+        print('FFMPEG was not found, so it is left out (use --ffmpeg to point to it).')
+    if jwm.PIL_Image is not None:
+        encoders.append(jwm.get_webp_encoder('pillow'))
+    else:
+        print('Pillow is not installed, so it is left out.')
+    return encoders
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares the speed and output size of the ".webp" encoders.')
+    parser.add_argument('--ffmpeg', default=None, help='Location of the FFMPEG executable.')
+    parser.add_argument('--images', default=None, help='Folder with the images to convert (not modified).')
+    parser.add_argument('--tokens', type=int, default=40, help='Number of synthetic 256x256 images.')
+    parser.add_argument('--maps', type=int, default=2, help='Number of synthetic 1024x768 images.')
+    parser.add_argument('--batch-sizes', default='1,4,16',
+                        help='Comma-separated numbers of images converted by each FFMPEG call.')
+    args = parser.parse_args()
+
+    encoders = get_installed_encoders(args.ffmpeg)
+    if not encoders:
+        return
+
+    temp_folder = tempfile.mkdtemp(prefix='jwm_encoder_benchmark_')
+    try:
+        if args.images:
+            img_paths = sorted(os.path.join(args.images, this_file).replace('\\', '/')
+                               for this_file in os.listdir(args.images)
+                               if this_file.lower().endswith(('.png', '.jpg', '.jpeg')))
+        else:
+            img_paths = create_synthetic_images(os.path.join(temp_folder, 'img'), args.tokens, args.maps)
+        output_folder = os.path.join(temp_folder, 'webp')
+        os.makedirs(output_folder)
+
+        benchmark_results = benchmark_webp_encoders(img_paths, encoders, output_folder)
+        for this_encoder_name, this_result in benchmark_results.items():
+            print(f'{this_encoder_name}: {this_result["images_per_second"]:.1f} images per second, '
+                  f'{this_result["output_bytes"]} of {this_result["input_bytes"]} bytes '
+                  f'({100 * this_result["output_bytes"] / max(this_result["input_bytes"], 1):.1f}%), '
+                  f'{this_result["failed"]} failed.')
+
+        ffmpeg_encoders = [this_encoder for this_encoder in encoders if this_encoder.encoder_name == 'ffmpeg']
+        if ffmpeg_encoders:
+            batch_sizes = [int(this_batch_size) for this_batch_size in args.batch_sizes.split(',')]
+            batch_results = benchmark_ffmpeg_batch_sizes(img_paths, ffmpeg_encoders[0], output_folder, batch_sizes)
+            for this_batch_size, this_result in batch_results.items():
+                print(f'ffmpeg in batches of {this_batch_size}: {this_result["images_per_second"]:.1f} images per second '
+                      f'({this_result["ffmpeg_calls"]} calls, {this_result["seconds"]:.2f} s), '
+                      f'{this_result["failed"]} failed.')
+    finally:
+        shutil.rmtree(temp_folder, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+'''
+Compares the speed of reading and writing ".db" lines with each JSON library
+supported by `select_json_backend` ("orjson", "ujson" and the standard
+"json"), and checks that every library writes exactly the same bytes.
+
+Two synthetic files are used: actors with several image references per line,
+and items with long HTML descriptions.
+
+Usage:
+    python benchmarks/json_codec_benchmark.py [number_of_lines] [repeats]
+'''
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jegasus_world_manager as jwm
+
+
+def make_actor_line(line_number):
+    return {'_id': f'actor{line_number:012d}',
+            'name': f'Goblin {line_number}',
+            'img': f'worlds/bench/img/actor_{line_number}.png',
+            'token': {'img': f'worlds/bench/img/token_{line_number}.png', 'scale': 1.25, 'vision': None},
+            'items': [{'_id': f'item{line_number}_{this_item}', 'img': f'icons/weapons/sword_{this_item}.jpg',
+                       'data': {'weight': 0.5 * this_item, 'price': this_item * 10}}
+                      for this_item in range(8)],
+            'flags': {'core': {'sheetClass': ''}, 'exportSource': {'coreVersion': '0.7.9'}},
+            'permission': {'default': 0}}
+
+
+def make_item_line(line_number):
+    description = ''.join(f'<p>Paragraph {this_paragraph} of item {line_number}, with <em>é</em> and '
+                          f'<img src="worlds/bench/img/item_{line_number}_{this_paragraph}.webp" width="200"></p>'
+                          for this_paragraph in range(6))
+    return {'_id': f'item{line_number:012d}', 'name': f'Item {line_number}',
+            'img': f'icons/items/item_{line_number % 50}.png',
+            'data': {'description': {'value': description}, 'quantity': 1, 'weight': 1.5}}
+
+
+def time_best_of(function, repeats):
+    best_time = float('inf')
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        function()
+        best_time = min(best_time, time.perf_counter() - start_time)
+    return best_time
+
+
+def main(number_of_lines=20000, repeats=7):
+    installed_backends = [this_name for this_name, this_module in
+                          (('json', json), ('ujson', jwm.ujson), ('orjson', jwm.orjson)) if this_module is not None]
+
+    for file_name, make_line in (('actors.db', make_actor_line), ('items.db', make_item_line)):
+        db_lines = [json.dumps(make_line(this_line), separators=(',', ':'), ensure_ascii=False)
+                    for this_line in range(number_of_lines)]
+        db_contents = [json.loads(this_line) for this_line in db_lines]
+        print(f'{file_name}: {number_of_lines} lines, {sum(map(len, db_lines))} characters '
+              f'(best of {repeats} runs)')
+
+        for this_backend in installed_backends:
+            jwm.select_json_backend(this_backend)
+            loads_time = time_best_of(lambda: [jwm.json_loads(this_line) for this_line in db_lines], repeats)
+            dumps_time = time_best_of(lambda: [jwm.json_dumps(this_content) for this_content in db_contents], repeats)
+
+            # Every library must write the exact same bytes as the standard one
+            identical_output = all(jwm.json_dumps(jwm.json_loads(this_line)) == this_line for this_line in db_lines)
+            print(f'    {this_backend:>6}: loads {loads_time:.3f} s, dumps {dumps_time:.3f} s, '
+                  f'identical output: {identical_output}')
+
+    jwm.select_json_backend()
+
+
+if __name__ == '__main__':
+    main(*[int(this_arg) for this_arg in sys.argv[1:3]])
@@ -0,0 +1,106 @@
+'''
+Measures the memory held by the `img_ref` objects of a world with
+`tracemalloc`: the memory still allocated after
+`world_refs.find_all_img_references_in_world` runs on a synthetic world (see
+`synthetic_world.py`), and after `world_refs.all_img_refs_by_id` is built.
+With the default sizes, the world has 20k actors (10k in "actors.db" and 10k
+in a compendium pack) and about 200k image references.
+
+The same scan is measured twice: once with `img_ref` as it is, and once with
+a copy of the class that keeps its attributes in a `__dict__` instead of in
+`__slots__`, so the two numbers can be compared.
+
+Usage:
+    python benchmarks/memory_benchmark.py [actors_per_file] [items_per_actor]
+'''
+
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from synthetic_world import create_synthetic_world
+
+import jegasus_world_manager as jwm
+
+
+def make_dict_img_ref_class():
+    '''
+    Copy of the `img_ref` class without `__slots__`, so that each object keeps
+    its attributes in a `__dict__` (like a regular class does).
+    '''
+    slot_names = set(jwm.img_ref.__slots__) | {'__slots__', '__dict__', '__weakref__'}
+    class_namespace = {this_name: this_value for this_name, this_value in vars(jwm.img_ref).items()
+                       if this_name not in slot_names}
+    return type('dict_img_ref', (), class_namespace)
+
+
+def measure_img_refs(world_inputs=None, img_ref_class=None):
+    '''
+    Scans the world with `img_ref_class` in place of `img_ref`.
+
+    RETURNS:
+    --------
+    measurement (DICT) : Number of references, scan time and retained
+        memory (in bytes). Ex: {'refs':200000, 'seconds':38.1,
+        'retained_bytes':52000000, 'retained_bytes_with_ids':61000000}
+    '''
+    original_img_ref_class = jwm.img_ref
+    jwm.img_ref = img_ref_class
+    try:
+        my_world_refs = jwm.world_refs(world_inputs['user_data_folder'], world_inputs['world_folder'],
+                                       world_inputs['core_data_folder'], world_inputs['ffmpeg_location'],
+                                       scan_cache=False, webp_cache_size=0)
+
+        # Only the references created from here on are measured (the DB
+        # files are already loaded)
+        gc.collect()
+        tracemalloc.start()
+        start_time = time.perf_counter()
+        my_world_refs.find_all_img_references_in_world()
+        elapsed_seconds = time.perf_counter() - start_time
+        gc.collect()
+        retained_bytes = tracemalloc.get_traced_memory()[0]
+
+        my_world_refs.all_img_refs_by_id
+        gc.collect()
+        retained_bytes_with_ids = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    finally:
+        jwm.img_ref = original_img_ref_class
+
+    return {'refs': len(my_world_refs.all_img_refs), 'seconds': elapsed_seconds,
+            'retained_bytes': retained_bytes, 'retained_bytes_with_ids': retained_bytes_with_ids}
+
+
+def main(actors_per_file=10000, items_per_actor=7):
+    original_folder = os.getcwd()
+    temp_folder = tempfile.mkdtemp(prefix='jwm_memory_benchmark_')
+    try:
+        world_inputs = create_synthetic_world(temp_folder, actors_per_file, items_per_actor)
+        measurements = {}
+        for this_label, this_class in [('img_ref (__slots__)', jwm.img_ref),
+                                       ('img_ref with a __dict__', make_dict_img_ref_class())]:
+            measurements[this_label] = measure_img_refs(world_inputs, this_class)
+            os.chdir(original_folder)
+
+        for this_label, this_measurement in measurements.items():
+            print(f'{this_label}: {this_measurement["refs"]} image references found in '
+                  f'{this_measurement["seconds"]:.2f} s')
+            print(f'    Retained memory: {this_measurement["retained_bytes"] / 2**20:.1f} MiB '
+                  f'({this_measurement["retained_bytes"] / max(this_measurement["refs"], 1):.0f} bytes per reference)')
+            print(f'    Retained memory with `all_img_refs_by_id`: '
+                  f'{this_measurement["retained_bytes_with_ids"] / 2**20:.1f} MiB')
+        slots_bytes, dict_bytes = [this_measurement['retained_bytes'] for this_measurement in measurements.values()]
+        print(f'__slots__ saves {(dict_bytes - slots_bytes) / 2**20:.1f} MiB '
+              f'({100 * (dict_bytes - slots_bytes) / max(dict_bytes, 1):.0f}% of the memory held by the references).')
+    finally:
+        os.chdir(original_folder)
+        shutil.rmtree(temp_folder, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main(*[int(this_arg) for this_arg in sys.argv[1:3]])
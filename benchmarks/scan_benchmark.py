@@ -0,0 +1,60 @@
+'''
+Compares the speed of the "deep scan" (every field of every document is
+walked, see `dict_walker`) with the default scan, which only walks the fields
+that can hold images in each type of Foundry document (see
+`foundry_image_fields` and `schema_walker`).
+
+Two measurements are made on a synthetic pack of actors (see
+`synthetic_world.py`):
+    1) Walking the documents of the pack in memory with `find_img_refs_in_dict`.
+    2) Building a whole `world_refs` object (without the scan cache).
+
+Usage:
+    python benchmarks/scan_benchmark.py [number_of_actors] [items_per_actor]
+'''
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from synthetic_world import create_synthetic_world, make_actor
+
+import jegasus_world_manager as jwm
+
+
+def main(number_of_actors=500, items_per_actor=20):
+    print(f'Pack of {number_of_actors} actors with {items_per_actor} items each')
+
+    # 1) Walking the documents in memory
+    pack_documents = [json.loads(json.dumps(make_actor(this_actor, items_per_actor)))
+                      for this_actor in range(number_of_actors)]
+    actors_field_tree = jwm.build_image_field_tree(jwm.foundry_image_fields['actors'])
+    for scan_name, field_tree in (('deep scan', None), ('default scan', actors_field_tree)):
+        start_time = time.perf_counter()
+        img_refs_found = sum(1 for this_document in pack_documents
+                             for _ in jwm.find_img_refs_in_dict(this_document, field_tree))
+        print(f'    {scan_name:>12}: {time.perf_counter() - start_time:.3f} s to walk the pack, '
+              f'{img_refs_found} image references')
+
+    # 2) Building the whole `world_refs` object
+    original_folder = os.getcwd()
+    temp_folder = tempfile.mkdtemp(prefix='jwm_scan_benchmark_')
+    try:
+        world_inputs = create_synthetic_world(temp_folder, number_of_actors, items_per_actor)
+        for scan_name, deep_scan in (('deep scan', True), ('default scan', False)):
+            start_time = time.perf_counter()
+            my_world_refs = jwm.world_refs(world_inputs['user_data_folder'], world_inputs['world_folder'],
+                                           world_inputs['core_data_folder'], world_inputs['ffmpeg_location'],
+                                           deep_scan=deep_scan, scan_cache=False, webp_cache_size=0)
+            print(f'    {scan_name:>12}: {time.perf_counter() - start_time:.3f} s to build the world_refs, '
+                  f'{len(my_world_refs.all_img_refs)} image references')
+    finally:
+        os.chdir(original_folder)
+        shutil.rmtree(temp_folder, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main(*[int(this_arg) for this_arg in sys.argv[1:3]])
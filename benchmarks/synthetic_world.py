@@ -0,0 +1,135 @@
+'''
+Builds a synthetic Foundry world for the benchmarks: a world whose "actors.db"
+file and "monsters" compendium pack hold many actors, each with several
+embedded items, HTML descriptions and module flags that mention images.
+The image files themselves are not created, since most benchmarks only scan
+the references. The encoder benchmarks use `create_synthetic_images` instead.
+'''
+
+import json
+import os
+import random
+import struct
+import sys
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_actor(actor_number, items_per_actor=20):
+    '''
+    Returns one actor document, in the Foundry 0.7 layout. Most of its fields
+    don't hold images (ex: the abilities and the skills), just like in a real
+    world.
+    '''
+    return {'_id': f'actor{actor_number:012d}',
+            'name': f'Goblin {actor_number}',
+            'type': 'npc',
+            'img': f'worlds/bench/tokens/goblin_{actor_number % 500}.png',
+            'token': {'img': f'worlds/bench/tokens/goblin_{actor_number % 500}.png', 'width': 1, 'height': 1,
+                      'bar1': {'attribute': 'attributes.hp'}, 'displayName': 20, 'vision': False},
+            'data': {'abilities': {this_ability: {'value': 10, 'proficient': 0, 'mod': 0, 'save': 0}
+                                   for this_ability in ('str', 'dex', 'con', 'int', 'wis', 'cha')},
+                     'skills': {f'skill_{this_skill}': {'value': 0, 'ability': 'dex', 'bonus': 0, 'mod': 0,
+                                                        'passive': 10, 'total': 0}
+                                for this_skill in range(18)},
+                     'attributes': {'hp': {'value': 7, 'max': 7, 'temp': None}, 'ac': {'value': 15},
+                                    'speed': {'value': '30 ft', 'special': ''}},
+                     'details': {'biography': {'value': '<p>A goblin. <img src="worlds/bench/art/goblin.jpg"></p>'},
+                                 'cr': 0.25, 'xp': {'value': 50}, 'source': 'Bench'}},
+            'items': [{'_id': f'item{this_item}', 'name': f'Item {this_item}', 'type': 'weapon',
+                       'img': f'icons/weapons/sword_{this_item}.jpg',
+                       'data': {'description': {'value': f'<p>Item {this_item}.</p>', 'chat': '', 'unidentified': ''},
+                                'quantity': 1, 'weight': 1.5, 'price': 10, 'equipped': True,
+                                'damage': {'parts': [['1d6 + @mod', 'slashing']], 'versatile': ''},
+                                'range': {'value': 5, 'long': None, 'units': 'ft'},
+                                'properties': {this_property: False for this_property in ('fin', 'hvy', 'lgt', 'thr')}},
+                       'flags': {}}
+                      for this_item in range(items_per_actor)],
+            'flags': {'some-module': {'portrait': f'worlds/bench/portraits/goblin_{actor_number % 50}.webp',
+                                      'history': [{'round': this_round, 'hp': 7, 'note': ''}
+                                                  for this_round in range(10)]}}}
+
+
+def create_synthetic_world(root_folder, number_of_actors=500, items_per_actor=20):
+    '''
+    Creates the world "worlds/bench" inside `root_folder`, with `number_of_actors`
+    actors in "data/actors.db" and in the "packs/monsters.db" compendium pack.
+
+    RETURNS:
+    --------
+    world_inputs (DICT) : The first inputs of `world_refs`: user_data_folder,
+        world_folder, core_data_folder and ffmpeg_location.
+    '''
+    user_data_folder = os.path.join(root_folder, 'Data')
+    world_path = os.path.join(user_data_folder, 'worlds', 'bench')
+    core_data_folder = os.path.join(root_folder, 'core', 'resources', 'app', 'public')
+    for this_folder in (os.path.join(world_path, 'data'), os.path.join(world_path, 'packs'), core_data_folder):
+        os.makedirs(this_folder, exist_ok=True)
+    with open(os.path.join(core_data_folder, '..', 'package.json'), 'w') as fout:
+        json.dump({'version': '0.7.9'}, fout)
+    with open(os.path.join(world_path, 'world.json'), 'w') as fout:
+        json.dump({'name': 'bench', 'title': 'Bench',
+                   'packs': [{'name': 'monsters', 'path': 'packs/monsters.db', 'entity': 'Actor'}]}, fout)
+
+    for this_db_file in ('data/actors.db', 'packs/monsters.db'):
+        with open(os.path.join(world_path, this_db_file), 'w', encoding='utf-8') as fout:
+            for this_actor in range(number_of_actors):
+                fout.write(json.dumps(make_actor(this_actor, items_per_actor), separators=(',', ':')) + '\n')
+
+    # The scans never run FFMPEG, but the "ffmpeg" encoder needs a file to point to
+    ffmpeg_location = os.path.join(root_folder, 'ffmpeg')
+    open(ffmpeg_location, 'w').close()
+
+    return {'user_data_folder': user_data_folder.replace('\\', '/'),
+            'world_folder': 'worlds/bench',
+            'core_data_folder': core_data_folder.replace('\\', '/'),
+            'ffmpeg_location': ffmpeg_location.replace('\\', '/')}
+
+
+def write_synthetic_png(file_path, width, height, seed=0):
+    '''
+    Writes an RGB PNG with a smooth gradient and some noise, which compresses
+    roughly like a painted token or map (unlike a flat colour).
+    '''
+    random_generator = random.Random(seed)
+    noise = bytes(random_generator.randrange(8) for _ in range(4096))
+    raw_rows = []
+    for this_row in range(height):
+        red = bytes((this_column * 255 // width) for this_column in range(width))
+        green_value = this_row * 255 // height
+        row_noise = (noise * (3 * width // len(noise) + 2))[this_row % 97:][:3 * width]
+        row_pixels = bytearray(3 * width)
+        row_pixels[0::3] = red
+        row_pixels[1::3] = bytes([green_value]) * width
+        row_pixels[2::3] = bytes([seed * 37 % 256]) * width
+        raw_rows.append(b'\x00' + bytes((this_pixel + this_noise) & 255
+                                        for this_pixel, this_noise in zip(row_pixels, row_noise)))
+
+    def png_chunk(chunk_type, chunk_data):
+        return (struct.pack('>I', len(chunk_data)) + chunk_type + chunk_data
+                + struct.pack('>I', zlib.crc32(chunk_type + chunk_data) & 0xffffffff))
+
+    with open(file_path, 'wb') as fout:
+        fout.write(b'\x89PNG\r\n\x1a\n'
+                   + png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+                   + png_chunk(b'IDAT', zlib.compress(b''.join(raw_rows)))
+                   + png_chunk(b'IEND', b''))
+
+
+def create_synthetic_images(img_folder, number_of_tokens=40, number_of_maps=2):
+    '''
+    Writes small "token" images (256x256) and bigger "map" images (1024x768)
+    into `img_folder`.
+
+    RETURNS:
+    --------
+    img_paths (LIST) : File paths of the images, tokens first.
+    '''
+    os.makedirs(img_folder, exist_ok=True)
+    img_paths = []
+    for img_number in range(number_of_tokens + number_of_maps):
+        is_token = img_number < number_of_tokens
+        img_paths.append(os.path.join(img_folder, f'{"token" if is_token else "map"}_{img_number}.png').replace('\\', '/'))
+        write_synthetic_png(img_paths[-1], *((256, 256) if is_token else (1024, 768)), seed=img_number)
+    return img_paths
@@ -11,7 +11,6 @@ import json
 import re
 import pathlib
 import subprocess
-import shlex
 import warnings
 import hashlib
 import shutil
@@ -19,148 +18,2884 @@ import imghdr
 import argparse
 import mimetypes
 import hashlib
+import sys
+import concurrent.futures
+import threading
+import html.parser
+import array
+import tempfile
+import time
 
-from bs4 import BeautifulSoup
+# BeautifulSoup is only needed for the "strict HTML" mode. The default mode 
+# uses the `img_src_extractor` class defined below.
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+# Faster JSON libraries are used to read and write the DB and JSON files when
+# they are installed (see `select_json_backend`). Otherwise, the standard 
+# `json` library is used.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+# Pillow is only needed for the in-process WEBP encoder (see 
+# `pillow_webp_encoder`). The default encoder calls FFMPEG instead.
+try:
+    from PIL import Image as PIL_Image
+    from PIL import ImageMath as PIL_ImageMath
+except ImportError:
+    PIL_Image = None
+    PIL_ImageMath = None
 
 # Command used to supress multiple warnings about trying to parse regular 
 # strings as HTML chunks. 
 warnings.filterwarnings('ignore')
 
-def dict_walker(in_dict, pre=None):
+# Folder where the tool keeps the caches that are shared by all worlds (next to
+# this file). It is defined here because the working directory changes later.
+tool_cache_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)),'_jwm_cache').replace('\\','/')
+
+class nonfinite_float(float):
+    '''
+    Float used for the "NaN", "Infinity" and "-Infinity" values found in the 
+    DB and JSON files. The standard `json` library writes these values back 
+    as they were, but `orjson` would silently turn them into "null". Since 
+    `orjson` refuses to write subclasses of float, documents holding these
+    values are always written by the standard `json` library instead (see 
+    `json_dumps`).
+    '''
+    pass
+
+def parse_json_float(float_text):
+    '''
+    Parses a float from a JSON file, flagging the values that are not finite
+    (see `nonfinite_float`).
+    '''
+    float_value = float(float_text)
+    if float_value in (float('inf'), float('-inf')):
+        return nonfinite_float(float_value)
+    return float_value
+
+# Used to spot values that `orjson` reads or writes differently from the 
+# standard `json` library: integers that might not fit in 64 bits (`orjson` 
+# reads them as floats), and floats that the standard library writes in 
+# exponent notation (ex: 1e-05 or 1e+16), which `orjson` writes as "0.00001"
+# or "1e16". These are found by turning every digit into a "0" and looking 
+# for 19 zeros in a row or for "0e0" and "0e-" (much faster than a regular 
+# expression). False alarms (ex: an "_id" like "a1e5b") are harmless, since
+# the standard library is then used instead.
+json_digits_to_zeros = bytes.maketrans(b'123456789', b'000000000')
+json_big_int_zeros = b'0' * 19
+
+def select_json_backend(backend_name=None):
+    '''
+    Picks the library used to read and write the DB and JSON files of the 
+    world. Whatever the library, the files are written exactly the same way
+    as the standard `json` library would write them (see `json_dumps`).
+        -"orjson": Fastest option, used for both reading and writing.
+        -"ujson": Only used for reading. Files are written by the standard 
+            `json` library, since `ujson` writes floats differently.
+        -"json": The standard library.
+    
+    INPUTS:
+    -------
+    backend_name (STR or None) : Name of the library ("orjson", "ujson" or 
+        "json"). When this input is left blank (equal to "None"), the fastest
+        library that is installed is used.
+    
+    RETURNS:
+    --------
+    json_backend (STR) : Name of the library that was picked.
+    
+    EXAMPLE:
+    --------
+    # Input:
+    print(select_json_backend())
+    
+    # Output (when `orjson` is installed):
+    # 'orjson'
+    '''
+    global json_backend
+    
+    installed_backends = {'orjson':orjson, 'ujson':ujson, 'json':json}
+    if backend_name is None:
+        backend_name = [this_name for this_name in installed_backends if installed_backends[this_name] is not None][0]
+    elif backend_name not in installed_backends:
+        raise ValueError(f'Unknown JSON library: {backend_name}. Please use "orjson", "ujson" or "json".')
+    elif installed_backends[backend_name] is None:
+        raise ImportError(f'The `{backend_name}` library is not installed.')
+    
+    json_backend = backend_name
+    return json_backend
+
+def json_loads(json_text):
+    '''
+    Parses JSON text (STR or BYTES) with the library picked by 
+    `select_json_backend`. Texts that the faster libraries can't read exactly 
+    like the standard `json` library (ex: "NaN" values or huge integers) are 
+    read by the standard library instead.
+    
+    INPUTS:
+    -------
+    json_text (STR or BYTES) : JSON text. Ex: '{"_id":"a","img":"x.png"}'
+    
+    RETURNS:
+    --------
+    json_content (DICT, LIST, STR, INT, FLOAT, BOOL or None) : Parsed content.
+    '''
+    try:
+        if json_backend == 'orjson':
+            json_bytes = json_text.encode('utf-8') if isinstance(json_text, str) else json_text
+            if json_big_int_zeros not in json_bytes.translate(json_digits_to_zeros):
+                return orjson.loads(json_bytes)
+        elif json_backend == 'ujson':
+            return ujson.loads(json_text)
+        else:
+            return json.loads(json_text)
+    except ValueError:
+        pass
+    
+    # The values that `orjson` would write back differently are flagged 
+    # (see `nonfinite_float`)
+    return json.loads(json_text, parse_float=parse_json_float, parse_constant=nonfinite_float)
+
+def json_dumps(json_content):
+    '''
+    Writes a JSON-like object as compact JSON text, exactly like 
+    `json.dumps(json_content, separators=(',', ':'), ensure_ascii=False)` 
+    would, but with `orjson` whenever it is picked (see `select_json_backend`)
+    and it gives the same result.
+    "NaN" and "Infinity" values must be `nonfinite_float`s (like the ones 
+    returned by `json_loads`), since `orjson` writes plain non-finite floats
+    as "null" without complaining.
+    
+    INPUTS:
+    -------
+    json_content (DICT, LIST, STR, INT, FLOAT, BOOL or None) : Content to be 
+        written.
+    
+    RETURNS:
+    --------
+    json_text (STR) : Compact JSON text. Ex: '{"_id":"a","img":"x.png"}'
+    '''
+    if json_backend == 'orjson':
+        try:
+            json_bytes = orjson.dumps(json_content)
+        except TypeError:
+            # Big integers, lone surrogates, non-finite floats...
+            json_bytes = None
+        if (json_bytes is not None) and (b'0.0000' not in json_bytes):
+            json_zeros = json_bytes.translate(json_digits_to_zeros)
+            if (b'0e0' not in json_zeros) and (b'0e-' not in json_zeros):
+                return json_bytes.decode('utf-8')
+    return json.dumps(json_content, separators=(',', ':'), ensure_ascii=False)
+
+json_backend = select_json_backend()
+
+def dict_walker(in_dict, pre=None):
+    '''
+    Function that walks through an indefinitely complex dictionary (can contain
+    lists, tuples or other dictionaries), and iterates through all of the 
+    dictionary's "leaves". This works as an iterator that returns a big list 
+    that contains the full "address" of a leaf. 
+    
+    Modified from https://stackoverflow.com/a/12507546/8667016
+    
+    INPUTS:
+    -------
+    in_dict (DICT) : A dictionary of arbitrary depth/complexity.
+        
+    RETURNS:
+    --------
+    iterated_output (LIST) : A list that contains the full address of the leaf 
+        in the dictionary.
+        
+    EXAMPLE:
+    --------
+    # Input:
+    my_dict = {'part_1':[5,6,7],
+               'part_2':[3,6,{'a':999,
+                              'b':777,
+                              'c':123}]}
+    
+    for this_full_address in dict_walker(in_dict=my_dict):
+        print(this_full_address)
+    
+    # Output:
+    # ['part_1', 0, 5]
+    # ['part_1', 1, 6]
+    # ['part_1', 2, 7]
+    # ['part_2', 0, 3]
+    # ['part_2', 1, 6]
+    # ['part_2', 2, 'a', 999]
+    # ['part_2', 2, 'b', 777]
+    # ['part_2', 2, 'c', 123]
+    '''
+    
+    pre = pre[:] if pre else []
+    if isinstance(in_dict, dict):
+        for key, value in in_dict.items():
+            if isinstance(value, dict):
+                for d in dict_walker(value, pre + [key]):
+                    yield d
+            elif isinstance(value, list) or isinstance(value, tuple):
+                for i,v in enumerate(value):
+                    for d in dict_walker(v, pre + [key,i]):
+                        yield d
+            else:
+                yield pre + [key, value]
+    else:
+        yield pre + [in_dict]
+
+
+# Fields that can hold images (or HTML chunks with embedded images) inside each
+# type of Foundry document. Each field is described by its "address" inside the
+# document, and the "[]" key stands for "every item of a list".
+# These fields cover the document layouts of Foundry 0.7 through Foundry 11.
+foundry_image_fields = {
+    'world'     : (('background',), ('description',)),
+    'actors'    : (('img',), ('token','img'), ('prototypeToken','texture','src'),
+                   ('data','details','biography','value'), ('data','details','biography','public'),
+                   ('system','details','biography','value'), ('system','details','biography','public'),
+                   ('data','description','value'), ('system','description','value'),
+                   ('items','[]','img'), 
+                   ('items','[]','data','description','value'), ('items','[]','system','description','value'),
+                   ('items','[]','data','description','chat'), ('items','[]','system','description','chat'),
+                   ('items','[]','data','description','unidentified'), ('items','[]','system','description','unidentified'),
+                   ('items','[]','effects','[]','icon'),
+                   ('effects','[]','icon')),
+    'items'     : (('img',), 
+                   ('data','description','value'), ('system','description','value'),
+                   ('data','description','chat'), ('system','description','chat'),
+                   ('data','description','unidentified'), ('system','description','unidentified'),
+                   ('effects','[]','icon')),
+    'scenes'    : (('img',), ('thumb',), ('foreground',), ('description',),
+                   ('background','src'), ('foreground','src'),
+                   ('tiles','[]','img'), ('tiles','[]','texture','src'),
+                   ('tokens','[]','img'), ('tokens','[]','texture','src'),
+                   ('notes','[]','icon'), ('notes','[]','texture','src'),
+                   ('drawings','[]','texture')),
+    'journal'   : (('img',), ('content',), 
+                   ('pages','[]','src'), ('pages','[]','text','content')),
+    'tables'    : (('img',), ('description',), 
+                   ('results','[]','img'), ('results','[]','text')),
+    'playlists' : (('description',), ('sounds','[]','description')),
+    'macros'    : (('img',),),
+    'messages'  : (('content',), ('flavor',)),
+    'users'     : (('avatar',),),
+    'combats'   : (('combatants','[]','img'),),
+    'cards'     : (('img',), ('description',), 
+                   ('cards','[]','img'), ('cards','[]','description'), 
+                   ('cards','[]','back','img'), ('cards','[]','faces','[]','img')),
+    'folders'   : (),
+    }
+
+# Type of document stored inside each type of compendium pack
+foundry_pack_document_types = {
+    'actor'        : 'actors',
+    'item'         : 'items',
+    'scene'        : 'scenes',
+    'journalentry' : 'journal',
+    'rolltable'    : 'tables',
+    'playlist'     : 'playlists',
+    'macro'        : 'macros',
+    'cards'        : 'cards',
+    }
+
+def build_image_field_tree(field_addresses):
+    '''
+    Merges several field "addresses" (like the ones in `foundry_image_fields`)
+    into one tree of nested dictionaries, such that addresses that share a 
+    prefix also share the same branch of the tree. A `None` key inside a 
+    branch indicates that the branch itself is one of the requested fields.
+    
+    INPUTS:
+    -------
+    field_addresses (TUPLE) : Tuple of field addresses. Each address is a tuple
+        of keys, where the "[]" key stands for "every item of a list".
+    
+    RETURNS:
+    --------
+    field_tree (DICT) : Tree of nested dictionaries with all of the addresses.
+    
+    EXAMPLE:
+    --------
+    # Input:
+    print(build_image_field_tree((('img',), ('token','img'), ('items','[]','img'))))
+    
+    # Output:
+    # {'img': {None: True}, 'token': {'img': {None: True}}, 'items': {'[]': {'img': {None: True}}}}
+    '''
+    field_tree = {}
+    for this_address in field_addresses:
+        this_branch = field_tree
+        for this_key in this_address:
+            this_branch = this_branch.setdefault(this_key, {})
+        this_branch[None] = True
+    return field_tree
+
+def schema_walker(in_dict, field_tree, pre=()):
+    '''
+    Function that walks through a Foundry document, just like `dict_walker`, 
+    but that only visits the fields described in `field_tree` (see 
+    `build_image_field_tree`). Everything else in the document (such as the 
+    "flags" set by modules) is skipped without being looked at. The leaves are
+    returned in the same format and in the same order as in `dict_walker`.
+    If a requested field holds a dictionary or a list instead of a string, the
+    whole content of that field is walked using `dict_walker`.
+    
+    INPUTS:
+    -------
+    in_dict (DICT) : A Foundry document. In the recursive calls, this is the
+        content of one of the document's fields.
+    field_tree (DICT) : Tree of the fields to be visited.
+    pre (TUPLE) : Address of `in_dict` inside the document. Only used in the 
+        recursive calls.
+        
+    RETURNS:
+    --------
+    iterated_output (LIST) : A list that contains the full address of the leaf 
+        in the dictionary.
+        
+    EXAMPLE:
+    --------
+    # Input:
+    my_dict = {'img':'a.png',
+               'token':{'img':'b.png', 'width':1},
+               'flags':{'my-module':{'art':'c.png'}}}
+    my_tree = build_image_field_tree((('img',), ('token','img')))
+    
+    for this_full_address in schema_walker(my_dict, my_tree):
+        print(this_full_address)
+    
+    # Output:
+    # ['img', 'a.png']
+    # ['token', 'img', 'b.png']
+    '''
+    if isinstance(in_dict, dict):
+        if len(field_tree) > 1 or None not in field_tree:
+            for key, value in in_dict.items():
+                if key in field_tree:
+                    yield from schema_walker(value, field_tree[key], pre + (key,))
+        else:
+            yield from dict_walker(in_dict, list(pre))
+    elif isinstance(in_dict, list) or isinstance(in_dict, tuple):
+        if '[]' in field_tree:
+            for i,v in enumerate(in_dict):
+                yield from schema_walker(v, field_tree['[]'], pre + (i,))
+        elif None in field_tree:
+            for i,v in enumerate(in_dict):
+                yield from dict_walker(v, list(pre) + [i])
+    elif None in field_tree:
+        yield list(pre) + [in_dict]
+
+def get_nested_dict_recursive(in_dict, dict_address):
+    '''
+    Function that allows you to access a specific "address" inside an 
+    arbitrarily-complex dictionary.
+    
+    INPUTS:
+    -------
+    in_dict (DICT) : Dictionary to be read.
+    dict_address (LIST) : Address of the object being requested.
+    
+    RETURNS:
+    --------
+    output (any) : The output of this function is the actual item at the 
+        "address" inside the input dictionary. 
+
+        
+    EXAMPLE:
+    --------
+    # Input:
+    my_dict = {'part_1':[5,6,7],
+               'part_2':[3,6,{'a':999,
+                              'b':777,
+                              'c':123}]}
+    
+    address_1 = ['part_1', 2]
+    address_2 = ['part_2', 2]
+    
+    print(get_nested_dict_recursive(in_dict=my_dict, dict_address=address_1))
+    print(get_nested_dict_recursive(in_dict=my_dict, dict_address=address_2))
+    
+    # Output:
+    # 7
+    # {'a': 999, 'b': 777, 'c': 123}
+    '''
+    if len(dict_address) == 1:
+        return in_dict[dict_address[0]]
+    else:
+        return get_nested_dict_recursive(in_dict[dict_address[0]], dict_address[1:])
+
+def edit_nested_dict_recursive(in_dict, dict_address, new_value):
+    '''
+    Function that allows you to edit a specific "address" inside an 
+    arbitrarily-complex dictionary and assign a new value/object to it.
+    
+    INPUTS:
+    -------
+    in_dict (DICT) : Dictionary to be read.
+    dict_address (LIST) : Address of the object that will receive `new_value`.
+    new_value (any) : New value to be stored in the input dictionary's "address".
+    
+    RETURNS:
+    --------
+    None
+        
+    EXAMPLE:
+    --------
+    # Input:
+    my_dict = {'part_1':[5,6,7],
+               'part_2':[3,6,{'a':999,
+                              'b':777,
+                              'c':123}]}
+    
+    my_address = ['part_1', 2]
+    my_new_value = 'DOG'
+    
+    edit_nested_dict_recursive(my_dict, my_address, my_new_value)
+    
+    print(my_dict)
+    
+    # Output:
+    # {'part_1': [5, 6, 'DOG'], 
+    #  'part_2': [3, 6, {'a': 999, 
+    #                    'b': 777, 
+    #                    'c': 123}]}
+    '''
+    if len(dict_address) == 1:
+        in_dict[dict_address[0]] = new_value
+    else:
+        edit_nested_dict_recursive(in_dict[dict_address[0]], dict_address[1:],new_value)
+
+class img_src_extractor(html.parser.HTMLParser):
+    '''
+    Streaming HTML tokenizer (built on Python's own `html.parser` module) that
+    looks for `<img>` tags inside a chunk of HTML. This is the same tokenizer 
+    used by BeautifulSoup's "html.parser" mode, but without building the whole
+    HTML tree in memory.
+    
+    Main attributes:
+        self.found_tag (BOOL) : Indicates whether or not at least one HTML tag
+            was found (i.e., whether or not the string is an HTML chunk).
+        self.img_srcs (LIST) : List of the "src" attributes of all the `<img>`
+            tags found, in the order they were found.
+    '''
+    
+    def __init__(self):
+        # BeautifulSoup also turns off `convert_charrefs`
+        super().__init__(convert_charrefs=False)
+        self.found_tag = False
+        self.img_srcs = []
+    
+    def handle_starttag(self, tag, attrs):
+        self.found_tag = True
+        if tag == 'img':
+            # Just like in BeautifulSoup, the last repeated attribute wins and
+            # attributes without a value become empty strings
+            img_src = None
+            for attr_name, attr_value in attrs:
+                if attr_name == 'src':
+                    img_src = attr_value if attr_value is not None else ''
+            if img_src is not None:
+                self.img_srcs.append(img_src)
+
+def parse_img_ref_content(img_ref_content, strict_html=False):
+    '''
+    Parses the content of a reference (a leaf of a JSON-like dictionary) only
+    once and checks whether it is an HTML chunk and which images it embeds.
+    
+    INPUTS:
+    -------
+    img_ref_content (STR) : Content of the reference. Sometimes it is just a 
+        string with the filepath to the image. Other times it is a chunk of 
+        HTML that links to embedded images.
+    strict_html (BOOL) : Indicates whether the content should be parsed with 
+        BeautifulSoup (True) or with the faster `img_src_extractor` (False).
+        Both give the same results.
+    
+    RETURNS:
+    --------
+    img_ref_content_is_html (BOOL) : Indicates whether or not the content is 
+        an HTML chunk.
+    img_srcs (LIST) : List of the unique "src" attributes of the `<img>` tags 
+        found in the content, in the order they first appear. This list is 
+        empty when the content is not an HTML chunk.
+    
+    EXAMPLE:
+    --------
+    # Input:
+    print(parse_img_ref_content('<p><img src="a.png"><img src="b.png"><img src="a.png"></p>'))
+    print(parse_img_ref_content('worlds/porvenir/art/wood-bg.jpg'))
+    
+    # Output:
+    # (True, ['a.png', 'b.png'])
+    # (False, [])
+    '''
+    if strict_html:
+        img_ref_content_soup = BeautifulSoup(img_ref_content, 'html.parser')
+        img_ref_content_is_html = True if img_ref_content_soup.find() else False
+        img_srcs = [this_match['src'] for this_match in img_ref_content_soup.findAll("img") 
+                    if this_match.get('src') is not None]
+    else:
+        # Without a "<" character there can't be any HTML tags
+        if '<' not in img_ref_content:
+            return False, []
+        parser = img_src_extractor()
+        parser.feed(img_ref_content)
+        parser.close()
+        img_ref_content_is_html = parser.found_tag
+        img_srcs = parser.img_srcs
+    
+    return img_ref_content_is_html, list(dict.fromkeys(img_srcs))
+
+# Regular expression used to read the "_id" of a ".db" line straight from the text
+regex_db_id = re.compile(r'"_id":"([^"\\]*)"')
+
+# Regular expression used to find image files
+regex_img_exp = re.compile(r'\.webp|\.jpg|\.jpeg|\.png')
+
+def get_db_line_id(db_file_line):
+    '''
+    Finds the "_id" of the document in one line of a ".db" file. When the line
+    starts with the "_id" field (which is how Foundry saves its documents), or
+    when it only has one "_id" field (i.e., the document has no embedded 
+    documents), the "_id" is read straight from the text. Otherwise, the line
+    is parsed.
+    
+    INPUTS:
+    -------
+    db_file_line (STR) : Raw text of the line.
+    
+    RETURNS:
+    --------
+    db_line_id (STR or None) : "_id" of the document, or None if the line has 
+        no "_id" (ex: "$$indexCreated" lines).
+    db_line_content (DICT or None) : Parsed line, if it had to be parsed.
+    
+    EXAMPLE:
+    --------
+    # Input:
+    print(get_db_line_id('{"_id":"a","img":"x.png"}'))
+    print(get_db_line_id('{"items":[{"_id":"b"}],"_id":"a"}'))
+    
+    # Output:
+    # ('a', None)
+    # ('a', {'items': [{'_id': 'b'}], '_id': 'a'})
+    '''
+    if db_file_line.startswith('{"_id":"'):
+        db_line_id_match = regex_db_id.match(db_file_line, 1)
+    elif db_file_line.count('"_id":') == 1:
+        db_line_id_match = regex_db_id.search(db_file_line)
+    else:
+        db_line_id_match = None
+    if db_line_id_match is not None:
+        return db_line_id_match.group(1), None
+    
+    db_line_content = json_loads(db_file_line)
+    return db_line_content.get('_id'), db_line_content
+
+def is_db_line_deleted(db_file_line, db_line_content=None):
+    '''
+    Checks whether one line of a ".db" file is a "$$deleted" tombstone, i.e. 
+    whether "$$deleted" is a field of the document itself. A document that 
+    only mentions "$$deleted" deeper inside (ex: in a module's flags) is not a
+    tombstone. Lines without the text "$$deleted":true are never parsed.
+    
+    INPUTS:
+    -------
+    db_file_line (STR) : Raw text of the line.
+    db_line_content (DICT or None) : Parsed line, if it was already parsed.
+    
+    RETURNS:
+    --------
+    line_is_deleted (BOOL) : Whether or not the line is a tombstone.
+    
+    EXAMPLE:
+    --------
+    # Input:
+    print(is_db_line_deleted('{"$$deleted":true,"_id":"a"}'))
+    print(is_db_line_deleted('{"_id":"a","flags":{"x":{"$$deleted":true}}}'))
+    
+    # Output:
+    # True
+    # False
+    '''
+    if db_line_content is None:
+        if '"$$deleted":true' not in db_file_line:
+            return False
+        db_line_content = json_loads(db_file_line)
+    return db_line_content.get('$$deleted') is True
+
+def compact_db_file_lines(db_file_lines):
+    '''
+    Keeps only the live version of each document in the lines of a ".db" file.
+    NeDB (the database used by Foundry) saves changes by appending a new copy
+    of the document to the end of the file, and deletions by appending a 
+    "$$deleted" tombstone. When the file is loaded, the last line with a given
+    "_id" wins. This function does the same: lines that were superseded by a 
+    later copy of the same document, tombstones (and the documents they 
+    delete) and blank lines are dropped. Lines without an "_id" (such as the 
+    "$$indexCreated" lines) are kept. The order of the lines that are kept 
+    does not change.
+    To save time, the "_id" of a line that only has one "_id" field is read 
+    straight from the text, so superseded lines usually don't even need to be 
+    parsed. Live lines that don't mention any image file (see `regex_img_exp`)
+    are not parsed either: they are kept as raw text (without the line break)
+    and are written back to disk as they are.
+    
+    INPUTS:
+    -------
+    db_file_lines (LIST) : List of the raw text lines of a ".db" file.
+    
+    RETURNS:
+    --------
+    live_db_file_lines (LIST) : List of the lines that were kept. Lines that
+        mention images are JSON-like dictionaries. All other lines are STRs.
+    lines_removed (INT) : Number of lines that were dropped.
+    bytes_removed (INT) : Number of bytes (in UTF-8) of the lines that were 
+        dropped.
+    
+    EXAMPLE:
+    --------
+    # Input:
+    print(compact_db_file_lines(['{"_id":"a","img":"x.png"}\n',
+                                 '{"_id":"b","img":"y.png"}\n',
+                                 '{"_id":"a","img":"x.webp"}\n',
+                                 '{"_id":"c","name":"Bob"}\n',
+                                 '{"$$deleted":true,"_id":"b"}\n']))
+    
+    # Output:
+    # ([{'_id': 'a', 'img': 'x.webp'}, '{"_id":"c","name":"Bob"}'], 3, 81)
+    '''
+    # Finding the last line of each document
+    parsed_lines = {}
+    last_line_by_id = {}
+    lines_to_keep = []
+    for this_db_file_line, this_line in enumerate(db_file_lines):
+        if not this_line.strip():
+            continue
+        
+        this_id, this_line_content = get_db_line_id(this_line)
+        if this_line_content is not None:
+            parsed_lines[this_db_file_line] = this_line_content
+        
+        if this_id is None:
+            lines_to_keep.append(this_db_file_line)
+        else:
+            last_line_by_id[this_id] = this_db_file_line
+    
+    # Parsing the live lines and dropping the deleted documents
+    live_db_file_lines = []
+    kept_lines = set()
+    for this_db_file_line in sorted(lines_to_keep + list(last_line_by_id.values())):
+        this_line = db_file_lines[this_db_file_line]
+        this_line_content = parsed_lines.get(this_db_file_line)
+        
+        # Tombstones look like this: {"$$deleted":true,"_id":"a"}
+        if is_db_line_deleted(this_line, this_line_content):
+            continue
+        
+        # Only the lines that mention images need to be parsed
+        if not regex_img_exp.search(this_line):
+            this_line_content = this_line.rstrip('\r\n')
+        elif this_line_content is None:
+            this_line_content = json_loads(this_line)
+        
+        live_db_file_lines.append(this_line_content)
+        kept_lines.add(this_db_file_line)
+    
+    lines_removed = len(db_file_lines) - len(live_db_file_lines)
+    bytes_removed = sum(len(this_line.encode('utf-8')) for this_db_file_line, this_line in enumerate(db_file_lines)
+                        if this_db_file_line not in kept_lines)
+    
+    return live_db_file_lines, lines_removed, bytes_removed
+
+class streamed_db_file:
+    '''
+    Stand-in for the list of documents of a ".db" file that does not keep the
+    documents in memory. Only the byte offset of each live line is kept (see 
+    `compact_db_file_lines` for what "live" means). A document is parsed 
+    again every time it is read, and only the documents that were changed 
+    are kept in memory until the file is saved. This lets the tool work on 
+    ".db" files that are much larger than the available memory.
+    The object behaves like a list of documents: `len(my_db_file)`, 
+    `my_db_file[3]`, `my_db_file[3] = new_document` and 
+    `for this_document in my_db_file` all work. Since the documents are 
+    parsed on demand, a document that is edited in place must be assigned 
+    back (ex: `my_db_file[3] = edited_document`) for the change to stick.
+    Just like in `compact_db_file_lines`, lines that don't mention any image 
+    file are not parsed when the file is looped over: they come out as raw 
+    text (STR) instead.
+    
+    Main attributes:
+        self.file_path (STR) : Relative file path of the ".db" file.
+            Ex: 'worlds/porvenir/data/actors.db'
+        self.line_offsets (ARRAY) : Byte offset of each live line of the file.
+        self.changed_lines (DICT) : Documents that were changed and not yet 
+            saved, indexed by line.
+        self.lines_removed (INT) : Number of outdated lines that were left out.
+        self.bytes_removed (INT) : Number of bytes of outdated lines that were
+            left out.
+    
+    EXAMPLE:
+    --------
+    # Input:
+    my_db_file = streamed_db_file('worlds/porvenir/data/actors.db')
+    my_document = my_db_file[0]
+    my_document['img'] = 'worlds/porvenir/art/hero.webp'
+    my_db_file[0] = my_document
+    my_db_file.save('worlds/porvenir/data/actors.dbbak')
+    '''
+    
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.changed_lines = {}
+        self.last_line_read = (None, None)
+        self.index_lines()
+    
+    def index_lines(self):
+        '''
+        Reads the file once and records the byte offset of each live line. 
+        Outdated copies of documents, deleted documents and blank lines are 
+        left out.
+        '''
+        line_offsets = []
+        line_lengths = []
+        last_line_by_id = {}
+        deleted_ids = set()
+        lines_to_keep = []
+        with open(self.file_path,'rb') as fp:
+            this_offset = 0
+            for this_raw_line in fp:
+                this_line_number = len(line_offsets)
+                line_offsets.append(this_offset)
+                line_lengths.append(len(this_raw_line))
+                this_offset += len(this_raw_line)
+                
+                this_line = this_raw_line.decode('utf-8')
+                if not this_line.strip():
+                    continue
+                this_id, this_line_content = get_db_line_id(this_line)
+                
+                if this_id is None:
+                    lines_to_keep.append(this_line_number)
+                    continue
+                last_line_by_id[this_id] = this_line_number
+                
+                # Tombstones look like this: {"$$deleted":true,"_id":"a"}
+                if is_db_line_deleted(this_line, this_line_content):
+                    deleted_ids.add(this_id)
+                else:
+                    deleted_ids.discard(this_id)
+        
+        lines_to_keep.extend(this_line_number for this_id,this_line_number in last_line_by_id.items() 
+                             if this_id not in deleted_ids)
+        lines_to_keep.sort()
+        
+        self.line_offsets = array.array('q', (line_offsets[this_line_number] for this_line_number in lines_to_keep))
+        self.lines_removed = len(line_offsets) - len(lines_to_keep)
+        self.bytes_removed = sum(line_lengths) - sum(line_lengths[this_line_number] for this_line_number in lines_to_keep)
+    
+    def read_raw_line(self, db_file_line, fp=None):
+        '''
+        Reads the raw bytes of one live line from the file on disk.
+        '''
+        if fp is None:
+            with open(self.file_path,'rb') as fp:
+                return self.read_raw_line(db_file_line, fp)
+        fp.seek(self.line_offsets[db_file_line])
+        return fp.readline()
+    
+    def __len__(self):
+        return len(self.line_offsets)
+    
+    def __getitem__(self, db_file_line):
+        if db_file_line in self.changed_lines:
+            return self.changed_lines[db_file_line]
+        
+        # The last document read is kept, since the references in the same 
+        # document are usually read one after the other
+        if self.last_line_read[0] != db_file_line:
+            self.last_line_read = (db_file_line, json_loads(self.read_raw_line(db_file_line)))
+        return self.last_line_read[1]
+    
+    def __setitem__(self, db_file_line, db_file_line_content):
+        self.changed_lines[db_file_line] = db_file_line_content
+        if self.last_line_read[0] == db_file_line:
+            self.last_line_read = (None, None)
+    
+    def __iter__(self):
+        with open(self.file_path,'rb') as fp:
+            for this_db_file_line in range(len(self.line_offsets)):
+                if this_db_file_line in self.changed_lines:
+                    yield self.changed_lines[this_db_file_line]
+                    continue
+                
+                this_line = self.read_raw_line(this_db_file_line, fp).decode('utf-8')
+                if regex_img_exp.search(this_line):
+                    yield json_loads(this_line)
+                else:
+                    yield this_line.rstrip('\r\n')
+    
+    def save(self, backup_file_path=None):
+        '''
+        Writes the file to disk in one single streaming pass. The current file
+        is renamed to `backup_file_path` (which is much faster than copying 
+        it), and the new file is written line by line from the backup. Lines 
+        that were not changed are copied byte for byte.
+        
+        INPUTS:
+        -------
+        backup_file_path (STR) : File path of the backup of the current file.
+            Ex: 'worlds/porvenir/data/actors.dbbak'
+        
+        RETURNS:
+        --------
+        None
+        '''
+        os.replace(self.file_path, backup_file_path)
+        
+        new_line_offsets = array.array('q')
+        with open(backup_file_path,'rb') as fin, open(self.file_path,'wb') as fout:
+            for this_db_file_line in range(len(self.line_offsets)):
+                new_line_offsets.append(fout.tell())
+                if this_db_file_line in self.changed_lines:
+                    new_line = (json_dumps(self.changed_lines[this_db_file_line]) + '\n').encode('utf-8')
+                else:
+                    new_line = self.read_raw_line(this_db_file_line, fin)
+                    if not new_line.endswith(b'\n'):
+                        new_line = new_line + b'\n'
+                fout.write(new_line)
+        
+        # The file on disk is now up to date (and has no outdated lines)
+        self.line_offsets = new_line_offsets
+        self.changed_lines = {}
+        self.last_line_read = (None, None)
+        self.lines_removed = 0
+        self.bytes_removed = 0
+
+def load_db_file(db_file, stream_db=False):
+    '''
+    Loads the live lines of a ".db" file (see `compact_db_file_lines` and 
+    `streamed_db_file`).
+    
+    INPUTS:
+    -------
+    db_file (STR) : Relative file path of the ".db" file.
+        Ex: 'worlds/porvenir/data/actors.db'
+    stream_db (BOOL) : Indicates whether only the position of each line should
+        be kept in memory (see `streamed_db_file`).
+    
+    RETURNS:
+    --------
+    db_file_lines (LIST or streamed_db_file) : Live lines of the file.
+    lines_removed (INT) : Number of outdated lines that were left out.
+    bytes_removed (INT) : Number of bytes of outdated lines that were left out.
+    '''
+    if stream_db:
+        # Indexing the lines of the DB file without keeping them
+        db_file_lines = streamed_db_file(db_file)
+        return db_file_lines, db_file_lines.lines_removed, db_file_lines.bytes_removed
+    
+    # Reading the DB file
+    with open(db_file,'r',encoding="utf-8") as fp:
+        db_file_raw_lines = fp.readlines()
+    
+    # Transforming the JSON-like strings into python dicts, keeping only the 
+    # live version of each document
+    return compact_db_file_lines(db_file_raw_lines)
+
+def find_img_refs_in_dict(dict_content, field_tree=None, strict_html=False):
+    '''
+    Walks a JSON-like dictionary looking for references to images. This is 
+    where the `world_refs` object decides what counts as a reference (see 
+    `world_refs.traverse_dict_and_find_all_refs`).
+    
+    INPUTS:
+    -------
+    dict_content (DICT) : JSON-like content of a JSON file or of a DB line.
+    field_tree (DICT or None) : Tree of the fields that can hold images (see 
+        `world_refs.get_image_field_tree`). When this input is left blank 
+        (equal to "None"), every leaf of the dictionary is visited.
+    strict_html (BOOL) : Indicates whether the HTML chunks should be parsed 
+        with BeautifulSoup (see `parse_img_ref_content`).
+    
+    RETURNS:
+    --------
+    img_ref_records (GENERATOR) : One tuple per reference, in the order in 
+        which they are found: (json_address, img_path_for_ref, 
+        img_ref_content_is_html), where `json_address` is the "address" of 
+        the leaf that holds the reference (without the leaf's content).
+    
+    EXAMPLE:
+    --------
+    # Input:
+    print(list(find_img_refs_in_dict({'img':'a.png', 'content':'<img src="b.png">'})))
+    
+    # Output:
+    # [(['img'], 'a.png', False), (['content'], 'b.png', True)]
+    '''
+    # Within each leaf of the dict tree, see if there is a 
+    # reference to an image. 
+    if field_tree is None:
+        leaf_walker = dict_walker(dict_content)
+    else:
+        leaf_walker = schema_walker(dict_content, field_tree)
+    
+    for this_item in leaf_walker:
+        
+        this_item_content = this_item[-1]
+        if type(this_item_content) == str:
+            
+            # If an image extension is found, extract the full file path
+            if regex_img_exp.search(this_item_content):
+                
+                # Parsing the leaf only once to check if it is an HTML 
+                # block and to find the images embedded in it
+                img_ref_content_is_html, img_html_matches = parse_img_ref_content(this_item_content, 
+                                                                                  strict_html)
+                
+                # If it is an HTML block, generate a reference for every 
+                # image found. If the leaf is not an HTML chunk, it's an 
+                # img reference.
+                if img_ref_content_is_html:
+                    imgs_in_leaf = img_html_matches
+                else:
+                    imgs_in_leaf = [this_item_content]
+                
+                for this_img_ref in imgs_in_leaf:
+                    yield this_item[:-1], this_img_ref, img_ref_content_is_html
+
+def load_and_scan_db_file(db_file, field_tree=None, strict_html=False, stream_db=False,
+                          json_backend_name=None):
+    '''
+    Loads a ".db" file and finds all of its references to images. This is the
+    job that each worker process does in the parallel scan (see 
+    `world_refs.load_db_and_json_files`), so it only returns plain data: the
+    `img_ref` objects themselves are created afterwards by the `world_refs` 
+    object, in the same order as in a serial scan.
+    
+    INPUTS:
+    -------
+    db_file (STR) : Relative file path of the ".db" file.
+        Ex: 'worlds/porvenir/data/actors.db'
+    field_tree (DICT or None) : Tree of the fields that can hold images (see 
+        `find_img_refs_in_dict`).
+    strict_html (BOOL) : Indicates whether the HTML chunks should be parsed 
+        with BeautifulSoup.
+    stream_db (BOOL) : Indicates whether only the position of each line should
+        be kept in memory (see `streamed_db_file`).
+    json_backend_name (STR or None) : JSON library to be used by the worker 
+        (see `select_json_backend`).
+    
+    RETURNS:
+    --------
+    db_file_lines (LIST or streamed_db_file) : Live lines of the file.
+    lines_removed (INT) : Number of outdated lines that were left out.
+    bytes_removed (INT) : Number of bytes of outdated lines that were left out.
+    img_ref_records (LIST) : One tuple per reference: (ref_file_line, 
+        json_address, img_path_for_ref, img_ref_content_is_html).
+    '''
+    if json_backend_name is not None:
+        select_json_backend(json_backend_name)
+    
+    db_file_lines, lines_removed, bytes_removed = load_db_file(db_file, stream_db)
+    
+    img_ref_records = []
+    for this_db_file_line,this_db_file_line_content in enumerate(db_file_lines):
+        # Lines kept as raw text don't mention any images
+        if isinstance(this_db_file_line_content, str):
+            continue
+        for this_json_address, this_img_ref, this_is_html in find_img_refs_in_dict(this_db_file_line_content, 
+                                                                                   field_tree, strict_html):
+            img_ref_records.append((this_db_file_line, tuple(this_json_address), this_img_ref, this_is_html))
+    
+    return db_file_lines, lines_removed, bytes_removed, img_ref_records
+
+def get_partial_hash(file_path, partial_hash_size=64*1024):
+    '''
+    Calculates a "partial" MD5 hash of a file using only its first and its last
+    `partial_hash_size` bytes. This is much faster than hashing huge files in 
+    full, and it is enough to tell apart most files that happen to have the 
+    same size.
+    
+    INPUTS:
+    -------
+    file_path (STR) : File path of the file to be hashed. 
+        Ex: "worlds/porvenir/art/wood-bg.jpg"
+    partial_hash_size (INT) : Number of bytes read from the beginning and from
+        the end of the file.
+    
+    RETURNS:
+    --------
+    partial_hash (STR) : MD5 hash of the first and last bytes of the file.
+    
+    EXAMPLE:
+    --------
+    # Input:
+    print(get_partial_hash("worlds/porvenir/art/wood-bg.jpg"))
+    
+    # Output:
+    # '0c2f6fd8c0d3b1c5f0a9e4f1d6a4c5b2'
+    '''
+    md5_hash = hashlib.md5()
+    with open(file_path,'rb') as fp:
+        md5_hash.update(fp.read(partial_hash_size))
+        fp.seek(0, os.SEEK_END)
+        file_size = fp.tell()
+        fp.seek(max(file_size - partial_hash_size, partial_hash_size))
+        md5_hash.update(fp.read(partial_hash_size))
+    return md5_hash.hexdigest()
+
+def get_full_hash(file_path):
+    '''
+    Calculates the MD5 hash of a whole file. The file is read in chunks to 
+    avoid loading huge files into memory.
+    
+    INPUTS:
+    -------
+    file_path (STR) : File path of the file to be hashed. 
+        Ex: "worlds/porvenir/data/actors.db"
+    
+    RETURNS:
+    --------
+    full_hash (STR) : MD5 hash of the file.
+    '''
+    md5_hash = hashlib.md5()
+    with open(file_path,'rb') as fp:
+        for this_chunk in iter(lambda: fp.read(1024*1024), b''):
+            md5_hash.update(this_chunk)
+    return md5_hash.hexdigest()
+
+def find_duplicated_files(file_paths, hash_cache=None, partial_hash_size=64*1024,
+                          file_index=None):
+    '''
+    Finds which files in a list are exact duplicates of each other. To avoid 
+    reading every file in full, the search is done in three tiers:
+        1) Files are grouped by size. A file with a unique size cannot have a
+           duplicate, so it is dropped without being read at all.
+        2) Files that share their size are grouped by a partial hash of their 
+           first and last `partial_hash_size` bytes (see `get_partial_hash`).
+        3) Only files that still share a group get hashed in full.
+    
+    INPUTS:
+    -------
+    file_paths (LIST) : List of file paths to be checked. 
+    hash_cache (img_hash_cache or None) : Cache used for the full hashes. When 
+        this input is left blank (equal to "None"), the full hashes are 
+        calculated without a cache.
+    partial_hash_size (INT) : Number of bytes read from the beginning and from
+        the end of the files in the second tier.
+    file_index (world_file_index or None) : Index used to get the file sizes
+        and signatures without touching the disk. When this input is left blank
+        (equal to "None"), the files are checked on disk.
+    
+    RETURNS:
+    --------
+    duplicated_files (DICT) : Dictionary that indexes the groups of duplicated
+        files by their full MD5 hash. Only groups with more than one file are 
+        included. Both the groups and the files inside each group keep the 
+        order of `file_paths`.
+        Structure of output:
+        duplicated_files = {'hash_a':['img_1','img_2'],
+                            'hash_b':['img_3','img_4','img_5']}
+    
+    EXAMPLE:
+    --------
+    # Input:
+    print(find_duplicated_files(["worlds/porvenir/a.png", 
+                                 "worlds/porvenir/b.png", 
+                                 "worlds/porvenir/c.png"]))
+    
+    # Output (if "a.png" and "c.png" are the same image):
+    # {'0c2f6fd8c0d3b1c5f0a9e4f1d6a4c5b2': ['worlds/porvenir/a.png', 'worlds/porvenir/c.png']}
+    '''
+    def get_cached_full_hash(file_path):
+        if hash_cache is None:
+            return get_full_hash(file_path)
+        return hash_cache.get_hash(file_path, file_index.get_signature(file_path) if file_index else None)
+    
+    # Removing repeated file paths while keeping their order
+    file_paths = list(dict.fromkeys(file_paths))
+    file_order = {this_path:i for i,this_path in enumerate(file_paths)}
+    
+    # Tier 1: grouping the files by size
+    files_by_size = {}
+    for this_path in file_paths:
+        this_size = file_index.get_size(this_path) if file_index else os.path.getsize(this_path)
+        files_by_size.setdefault(this_size, []).append(this_path)
+    
+    # Tier 2: grouping the files that share a size by their partial hash.
+    # Small files would be read in full anyway, so they go straight to tier 3.
+    candidate_groups = []
+    for this_size, these_paths in files_by_size.items():
+        if len(these_paths) < 2:
+            continue
+        if this_size <= 2*partial_hash_size:
+            candidate_groups.append(these_paths)
+            continue
+        files_by_partial_hash = {}
+        for this_path in these_paths:
+            files_by_partial_hash.setdefault(get_partial_hash(this_path, partial_hash_size), []).append(this_path)
+        candidate_groups.extend([group for group in files_by_partial_hash.values() if len(group) > 1])
+    
+    # Tier 3: grouping the remaining candidates by their full hash
+    duplicated_files = {}
+    for these_paths in candidate_groups:
+        files_by_full_hash = {}
+        for this_path in these_paths:
+            files_by_full_hash.setdefault(get_cached_full_hash(this_path), []).append(this_path)
+        for this_hash, group in files_by_full_hash.items():
+            if len(group) > 1:
+                duplicated_files[this_hash] = group
+    
+    # Sorting the groups by the position of their first file
+    return dict(sorted(duplicated_files.items(), key=lambda item: file_order[item[1][0]]))
+
+class world_file_index:
+    '''
+    Class that holds an in-memory table of all the files inside a folder (and
+    its subfolders), along with their sizes, modification times and inodes. 
+    The table is built with one single walk through the folder, so that the 
+    rest of the tool can check if files exist (or find files by extension) 
+    without hitting the disk over and over again. This is especially helpful 
+    when the world folder is stored on a network drive.
+    Files created, moved or deleted through the `world_refs` object are 
+    updated in the table as they happen.
+    
+    Main attributes:
+        self.root_folder (STR) : Folder that is indexed. Ex: "worlds/porvenir"
+        self.files (DICT) : Dictionary that holds the information of each file.
+            The dictionary is indexed by a "lookup key" (see `get_key`), and its
+            structure is as follows:
+                {'worlds/porvenir/art/wood-bg.jpg' : ['worlds/porvenir/art/wood-bg.jpg', size, mtime_ns, inode],
+                 'worlds/porvenir/data/actors.db'  : ['worlds/porvenir/data/actors.db', size, mtime_ns, inode]}
+    '''
+    
+    def __init__(self, root_folder=None):
+        '''
+        Function used to instantiate new objects from the `world_file_index` 
+        class. The folder is scanned right away.
+        
+        INPUTS:
+        -------
+        root_folder (STR) : Folder to be indexed. Ex: "worlds/porvenir"
+        
+        RETURNS:
+        --------
+        world_file_index (OBJECT) : The newly created `world_file_index` object itself.
+        
+        EXAMPLE:
+        --------
+        # Input:
+        my_file_index = world_file_index("worlds/porvenir")
+        print(my_file_index.isfile("worlds/porvenir/world.json"))
+        
+        # Output:
+        # True
+        '''
+        self.root_folder = root_folder.replace('\\','/')
+        self.root_folder_key = self.get_key(self.root_folder)
+        self.scan()
+    
+    @staticmethod
+    def get_key(file_path):
+        '''
+        Returns the key used to look up a file path in the table. The key is 
+        the normalized file path, which is also lower-cased on Windows because
+        Windows file paths are not case-sensitive.
+        '''
+        return os.path.normcase(os.path.normpath(file_path))
+    
+    def scan(self):
+        '''
+        Walks through the whole folder (using `os.scandir`) and rebuilds the 
+        table of files from scratch. Files are listed folder by folder, with 
+        the files of a folder coming before the files of its subfolders.
+        
+        INPUTS:
+        -------
+        None
+        
+        RETURNS:
+        --------
+        None
+        '''
+        self.files = {}
+        
+        def scan_folder(folder_path):
+            subfolders = []
+            with os.scandir(folder_path) as folder_entries:
+                for this_entry in folder_entries:
+                    if this_entry.is_dir():
+                        subfolders.append(this_entry.path)
+                    elif this_entry.is_file():
+                        self.add(this_entry.path.replace('\\','/'), this_entry.stat())
+            for this_subfolder in subfolders:
+                scan_folder(this_subfolder)
+        
+        if os.path.isdir(self.root_folder):
+            scan_folder(self.root_folder)
+    
+    def add(self, file_path, file_stat):
+        '''
+        Adds one file (and the result of its `os.stat` call) to the table.
+        '''
+        self.files[self.get_key(file_path)] = [file_path, file_stat.st_size, 
+                                               file_stat.st_mtime_ns, file_stat.st_ino]
+    
+    def remove(self, file_path):
+        '''
+        Removes one file from the table (if it is there).
+        '''
+        self.files.pop(self.get_key(file_path), None)
+    
+    def refresh(self, file_path):
+        '''
+        Checks one single file on disk and updates its entry in the table. This
+        should be called every time a file inside the folder is created or 
+        modified.
+        '''
+        try:
+            self.add(file_path.replace('\\','/'), os.stat(file_path))
+        except OSError:
+            self.remove(file_path)
+    
+    def remove_folder(self, folder_path):
+        '''
+        Removes all the files inside a folder (and its subfolders) from the table.
+        '''
+        folder_key = self.get_key(folder_path) + os.sep
+        for this_key in [this_key for this_key in self.files if this_key.startswith(folder_key)]:
+            del self.files[this_key]
+    
+    def move(self, old_file_path, new_file_path):
+        '''
+        Updates the table after a file was moved or renamed.
+        '''
+        self.remove(old_file_path)
+        self.refresh(new_file_path)
+    
+    def is_inside(self, file_path):
+        '''
+        Indicates whether or not a file path is inside the indexed folder.
+        '''
+        return self.get_key(file_path).startswith(self.root_folder_key + os.sep)
+    
+    def isfile(self, file_path):
+        '''
+        Indicates whether or not a file exists inside the indexed folder.
+        '''
+        return self.get_key(file_path) in self.files
+    
+    def get_signature(self, file_path):
+        '''
+        Returns the [size, mtime_ns, inode] of a file, or None if the file is 
+        not in the table.
+        '''
+        this_entry = self.files.get(self.get_key(file_path))
+        return this_entry[1:] if this_entry else None
+    
+    def get_size(self, file_path):
+        '''
+        Returns the size of a file in bytes.
+        '''
+        return self.files[self.get_key(file_path)][1]
+    
+    def find_files(self, extensions=(), excluded_folders=()):
+        '''
+        Lists all of the files in the table that have one of the requested 
+        extensions. Just like `pathlib.Path.rglob`, the extensions are only 
+        case-insensitive on Windows.
+        
+        INPUTS:
+        -------
+        extensions (TUPLE) : Tuple of the file extensions to look for. 
+            Ex: (".db", ".json")
+        excluded_folders (TUPLE) : Tuple of folders whose files should be left
+            out of the output. Ex: ("worlds/porvenir/_trash",)
+        
+        RETURNS:
+        --------
+        found_files (LIST) : List of the file paths found.
+        '''
+        extensions = tuple(os.path.normcase(this_ext) for this_ext in extensions)
+        excluded_folders = tuple(self.get_key(this_folder) + os.sep for this_folder in excluded_folders)
+        
+        found_files = []
+        for this_key, this_entry in self.files.items():
+            if this_key.endswith(extensions) and not (excluded_folders and this_key.startswith(excluded_folders)):
+                found_files.append(this_entry[0])
+        return found_files
+
+def get_foundry_version(core_data_folder=None):
+    '''
+    Finds out which version of Foundry is installed by reading the "package.json"
+    file that sits next to the Foundry Core Data folder.
+    
+    INPUTS:
+    -------
+    core_data_folder (STR) : String that describes the absolute path to the 
+        Foundry Core Data folder. Ex: "C:/Program Files/FoundryVTT/resources/app/public"
+    
+    RETURNS:
+    --------
+    foundry_version (STR or None) : Version of Foundry (ex: "0.7.9" or "11.315"),
+        or None if the version could not be found.
+    
+    EXAMPLE:
+    --------
+    # Input:
+    print(get_foundry_version("C:/Program Files/FoundryVTT/resources/app/public"))
+    
+    # Output:
+    # '0.7.9'
+    '''
+    for this_folder in (os.path.dirname(os.path.normpath(core_data_folder)), core_data_folder):
+        package_json_file = os.path.join(this_folder,'package.json')
+        if not os.path.isfile(package_json_file):
+            continue
+        try:
+            with open(package_json_file,'r',encoding="utf-8") as fp:
+                package_json = json.load(fp)
+        except (OSError, ValueError):
+            continue
+        if not isinstance(package_json, dict):
+            continue
+        
+        # Newer versions of Foundry describe the version in the "release" key
+        release = package_json.get('release')
+        if isinstance(release, dict) and 'generation' in release and 'build' in release:
+            return f'{release["generation"]}.{release["build"]}'
+        if package_json.get('version'):
+            return str(package_json['version'])
+    return None
+
+class core_data_index:
+    '''
+    Class that holds the list of all the files inside the Foundry Core Data 
+    folder (icons, default tokens, etc.). The files in this folder only change
+    when Foundry itself is updated, so the list is built only once per Foundry
+    installation (folder and version) and then saved to disk. Later runs just
+    load the list from disk and only check a cheap "fingerprint" of the 
+    folder (see `get_fingerprint`): when it changed, the list is built again.
+    
+    Main attributes:
+        self.core_data_folder (STR) : Absolute path to the Foundry Core Data 
+            folder. Ex: "C:/Program Files/FoundryVTT/resources/app/public"
+        self.resolved_core_data_folder (STR) : Absolute path to the Core Data
+            folder, with its symbolic links resolved. This is the path that 
+            identifies the installation.
+        self.foundry_version (STR or None) : Version of Foundry found in the 
+            installation. Ex: "0.7.9"
+        self.index_file_path (STR or None) : File path of the saved index. Its
+            name holds the Foundry version and a hash of the resolved path of 
+            the Core Data folder, so different installations never share it.
+            This attribute is None when the Foundry version is unknown, in 
+            which case the index is only kept in memory.
+        self.fingerprint (LIST) : Fingerprint of the Core Data folder (see 
+            `get_fingerprint`).
+        self.files (SET) : Set of all the files inside the Core Data folder. 
+            The file paths are relative to the Core Data folder, exactly like 
+            they are referenced inside a world. Ex: "icons/svg/mystery-man.svg"
+    '''
+    
+    def __init__(self, core_data_folder=None, cache_folder=None):
+        '''
+        Function used to instantiate new objects from the `core_data_index` class.
+        The index is loaded from `cache_folder` if it was already built for this
+        installation of Foundry and the folder did not change since then. 
+        Otherwise, it is built and saved.
+        
+        INPUTS:
+        -------
+        core_data_folder (STR) : Absolute path to the Foundry Core Data folder.
+            Ex: "C:/Program Files/FoundryVTT/resources/app/public"
+        cache_folder (STR or None) : Folder where the index is saved. When this 
+            input is left blank (equal to "None"), the index is not saved.
+        
+        RETURNS:
+        --------
+        core_data_index (OBJECT) : The newly created `core_data_index` object itself.
+        
+        EXAMPLE:
+        --------
+        # Input:
+        my_core_index = core_data_index("C:/Program Files/FoundryVTT/resources/app/public",
+                                        tool_cache_folder)
+        print(my_core_index.isfile("icons/svg/mystery-man.svg"))
+        
+        # Output:
+        # True
+        '''
+        self.core_data_folder = core_data_folder
+        self.foundry_version = get_foundry_version(core_data_folder)
+        self.resolved_core_data_folder = os.path.normcase(os.path.realpath(core_data_folder)).replace('\\','/')
+        self.fingerprint = self.get_fingerprint()
+        
+        if cache_folder and self.foundry_version:
+            safe_version = re.sub('[^0-9A-Za-z._-]','_',self.foundry_version)
+            folder_hash = hashlib.md5(self.resolved_core_data_folder.encode('utf-8')).hexdigest()[:12]
+            self.index_file_path = os.path.join(cache_folder,f'core_data_index_{safe_version}_{folder_hash}.json').replace('\\','/')
+        else:
+            self.index_file_path = None
+        
+        self.files = None
+        if self.index_file_path and os.path.isfile(self.index_file_path):
+            try:
+                with open(self.index_file_path,'r',encoding="utf-8") as fp:
+                    saved_index = json.load(fp)
+                # The saved index is only trusted if it describes this exact 
+                # folder, as it is right now
+                if ((saved_index['core_data_folder'] == self.resolved_core_data_folder) and 
+                    (saved_index['foundry_version'] == self.foundry_version) and
+                    (saved_index['fingerprint'] == self.fingerprint)):
+                    self.files = set(saved_index['files'])
+            except (OSError, ValueError, KeyError, TypeError):
+                self.files = None
+        
+        if self.files is None:
+            self.build()
+            self.save()
+    
+    def get_fingerprint(self):
+        '''
+        Returns a cheap "fingerprint" of the Core Data folder: the number of 
+        entries in the folder, and the modification time of the folder and 
+        of each of its subfolders (which changes whenever a file is added, 
+        removed or renamed directly inside them). Only the top two levels are
+        checked, which is enough to notice a Foundry update without walking 
+        the whole folder.
+        Ex: [12, [['.', 1612345678000000000], ['icons', 1612345678000000000]]]
+        '''
+        try:
+            with os.scandir(self.core_data_folder) as these_entries:
+                these_entries = list(these_entries)
+            folder_mtimes = [['.', os.stat(self.core_data_folder).st_mtime_ns]]
+            folder_mtimes += sorted([this_entry.name, this_entry.stat().st_mtime_ns] 
+                                    for this_entry in these_entries if this_entry.is_dir())
+        except OSError:
+            return None
+        return [len(these_entries), folder_mtimes]
+    
+    def build(self):
+        '''
+        Walks through the whole Core Data folder and lists all of its files.
+        
+        INPUTS:
+        -------
+        None
+        
+        RETURNS:
+        --------
+        None
+        '''
+        self.files = set()
+        for this_folder, _, these_files in os.walk(self.core_data_folder):
+            this_rel_folder = os.path.relpath(this_folder, self.core_data_folder)
+            for this_file in these_files:
+                self.files.add(self.get_key(os.path.join(this_rel_folder, this_file)))
+    
+    def save(self):
+        '''
+        Saves the index to disk. Failing to save the index is not a problem: 
+        the index will just be built again next time.
+        
+        INPUTS:
+        -------
+        None
+        
+        RETURNS:
+        --------
+        None
+        '''
+        if not self.index_file_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.index_file_path), exist_ok=True)
+            temp_index_file_path = self.index_file_path + '.tmp'
+            with open(temp_index_file_path,'w',encoding="utf-8") as fout:
+                json.dump({'core_data_folder':self.resolved_core_data_folder,
+                           'foundry_version':self.foundry_version,
+                           'fingerprint':self.fingerprint,
+                           'files':sorted(self.files)}, fout, separators=(',', ':'), ensure_ascii=False)
+            os.replace(temp_index_file_path, self.index_file_path)
+        except OSError:
+            pass
+    
+    @staticmethod
+    def get_key(rel_file_path):
+        '''
+        Returns the key used to look up a file path in the index.
+        '''
+        return os.path.normcase(os.path.normpath(rel_file_path)).replace('\\','/')
+    
+    def isfile(self, rel_file_path):
+        '''
+        Indicates whether or not a file exists inside the Core Data folder. The
+        file path must be relative to the Core Data folder. Ex: "icons/svg/mystery-man.svg"
+        '''
+        return self.get_key(rel_file_path) in self.files
+
+class img_hash_cache:
+    '''
+    Class that keeps track of the MD5 hashes of the image files inside the 
+    world folder. Hashing an image means reading the whole file from disk, so
+    each hash is calculated only once and then stored in this cache. The cache
+    is also saved to disk (inside the world folder), which means that images 
+    that did not change since the last time the tool was run don't need to be 
+    hashed again.
+    An image is considered "unchanged" when its file path, size, modification 
+    time and inode all match the ones stored in the cache.
+    
+    Main attributes:
+        self.cache_file_path (STR) : File path of the cache file on disk. This
+            should typically look like this: "worlds/porvenir/_jwm_cache/hash_cache.json"
+        self.hashes (DICT) : Dictionary that indexes the stored hashes by the 
+            file path of the image. The structure of this dictionary is as follows:
+                {'worlds/porvenir/art/wood-bg.jpg' : [size, mtime_ns, inode, 'md5_hash'],
+                 'worlds/porvenir/art/map.png'     : [size, mtime_ns, inode, 'md5_hash']}
+        self.cache_was_updated (BOOL) : Indicates whether or not the cache 
+            changed since it was last loaded from or saved to disk.
+    '''
+    
+    def __init__(self, cache_file_path=None):
+        '''
+        Function used to instantiate new objects from the `img_hash_cache` class.
+        The cache file is loaded from disk if it exists.
+        
+        INPUTS:
+        -------
+        cache_file_path (STR) : File path of the cache file on disk. 
+            Ex: "worlds/porvenir/_jwm_cache/hash_cache.json"
+        
+        RETURNS:
+        --------
+        img_hash_cache (OBJECT) : The newly created `img_hash_cache` object itself.
+        
+        EXAMPLE:
+        --------
+        # Input:
+        my_hash_cache = img_hash_cache("worlds/porvenir/_jwm_cache/hash_cache.json")
+        
+        # Output:
+        # None
+        '''
+        self.cache_file_path = cache_file_path
+        self.hashes = {}
+        self.cache_was_updated = False
+        
+        # The image conversion workers might use the cache at the same time
+        self.lock = threading.Lock()
+        
+        if self.cache_file_path and os.path.isfile(self.cache_file_path):
+            try:
+                with open(self.cache_file_path,'r',encoding="utf-8") as fp:
+                    self.hashes = json.load(fp)['hashes']
+            except (ValueError, KeyError, TypeError):
+                # A corrupted cache is simply rebuilt from scratch
+                self.hashes = {}
+    
+    def get_hash(self, img_path=None, img_signature=None):
+        '''
+        Returns the MD5 hash of an image file. The file is only read from disk 
+        if its hash is not in the cache yet or if the file changed since the 
+        hash was calculated.
+        
+        INPUTS:
+        -------
+        img_path (STR) : File path of the image. Ex: "worlds/porvenir/art/wood-bg.jpg"
+        img_signature (LIST or None) : The [size, mtime_ns, inode] of the image,
+            if it is already known (see `world_file_index.get_signature`). When
+            this input is left blank (equal to "None"), the file is checked 
+            using `os.stat`.
+        
+        RETURNS:
+        --------
+        img_hash (STR) : MD5 hash of the image file.
+        
+        EXAMPLE:
+        --------
+        # Input:
+        print(my_hash_cache.get_hash("worlds/porvenir/art/wood-bg.jpg"))
+        
+        # Output:
+        # 'b5d2f1ae1ecd3b9a2e1e2b5c8c4b3f0a'
+        '''
+        if img_signature is None:
+            img_stat = os.stat(img_path)
+            img_signature = [img_stat.st_size, img_stat.st_mtime_ns, img_stat.st_ino]
+        img_signature = list(img_signature)
+        
+        cached_entry = self.hashes.get(img_path)
+        if cached_entry and cached_entry[:3] == img_signature:
+            return cached_entry[3]
+        
+        img_hash = get_full_hash(img_path)
+        
+        with self.lock:
+            self.hashes[img_path] = img_signature + [img_hash]
+            self.cache_was_updated = True
+        
+        return img_hash
+    
+    def save(self, file_exists=os.path.isfile):
+        '''
+        Saves the cache to disk. Nothing is written if the cache did not change
+        since it was loaded.
+        
+        INPUTS:
+        -------
+        file_exists (FUNCTION) : Function used to check whether the images in 
+            the cache still exist. Ex: `world_file_index.isfile`
+        
+        RETURNS:
+        --------
+        None
+        '''
+        if not (self.cache_file_path and self.cache_was_updated):
+            return
+        
+        with self.lock:
+            # Forgetting about images that no longer exist on disk
+            for this_img_path in [this_path for this_path in self.hashes if not file_exists(this_path)]:
+                del self.hashes[this_img_path]
+            
+            os.makedirs(os.path.dirname(self.cache_file_path), exist_ok=True)
+            
+            # Writing to a temporary file first so that an interrupted run 
+            # can never leave a half-written cache behind
+            temp_cache_file_path = self.cache_file_path + '.tmp'
+            with open(temp_cache_file_path,'w',encoding="utf-8") as fout:
+                json.dump({'hashes':self.hashes}, fout, separators=(',', ':'), ensure_ascii=False)
+            os.replace(temp_cache_file_path, self.cache_file_path)
+            
+            self.cache_was_updated = False
+
+class ref_scan_cache:
+    '''
+    Class that keeps the references to images found in each DB and JSON file
+    of the world (see `load_and_scan_db_file`). The cache is saved to disk 
+    (inside the world folder), so the files that did not change since the 
+    last time the tool was run don't need to be parsed and walked again.
+    A file is considered "unchanged" when its size and either its modification
+    time or its MD5 hash match the ones stored in the cache. The hash is only 
+    calculated when the modification time changed, so files that were only 
+    "touched" (or restored from a backup) are not scanned again either.
+    The references also depend on which fields get walked (see 
+    `world_refs.get_image_field_tree`) and on how the HTML is parsed, so these
+    settings are stored as well, as a "scan key" (see `get_scan_key`).
+    
+    Main attributes:
+        self.cache_file_path (STR) : File path of the cache file on disk. This
+            should typically look like this: "worlds/porvenir/_jwm_cache/scan_cache.json"
+        self.files (DICT) : Dictionary that indexes the stored references by 
+            the file path of the DB or JSON file. The structure of this 
+            dictionary is as follows:
+                {'worlds/porvenir/data/actors.db' : [size, mtime_ns, 'md5_hash', 'scan_key', 
+                                                     [[ref_file_line, json_address, img_path_for_ref, img_ref_content_is_html],
+                                                      [ref_file_line, json_address, img_path_for_ref, img_ref_content_is_html]]]}
+        self.cache_was_updated (BOOL) : Indicates whether or not the cache 
+            changed since it was last loaded from or saved to disk.
+    '''
+    
+    # Bumped whenever the way references are found changes, so that old 
+    # caches are thrown away
+    cache_version = 1
+    
+    def __init__(self, cache_file_path=None):
+        '''
+        Function used to instantiate new objects from the `ref_scan_cache` class.
+        The cache file is loaded from disk if it exists.
+        
+        INPUTS:
+        -------
+        cache_file_path (STR) : File path of the cache file on disk. 
+            Ex: "worlds/porvenir/_jwm_cache/scan_cache.json"
+        
+        RETURNS:
+        --------
+        ref_scan_cache (OBJECT) : The newly created `ref_scan_cache` object itself.
+        
+        EXAMPLE:
+        --------
+        # Input:
+        my_scan_cache = ref_scan_cache("worlds/porvenir/_jwm_cache/scan_cache.json")
+        
+        # Output:
+        # None
+        '''
+        self.cache_file_path = cache_file_path
+        self.files = {}
+        self.cache_was_updated = False
+        
+        if self.cache_file_path and os.path.isfile(self.cache_file_path):
+            try:
+                with open(self.cache_file_path,'r',encoding="utf-8") as fp:
+                    cache_content = json_loads(fp.read())
+                if cache_content['version'] == self.cache_version:
+                    self.files = cache_content['files']
+            except (ValueError, KeyError, TypeError):
+                # A corrupted cache is simply rebuilt from scratch
+                self.files = {}
+    
+    @staticmethod
+    def get_scan_key(field_tree=None, strict_html=False):
+        '''
+        Returns a short string that identifies the settings used to scan a file
+        for references (see `find_img_refs_in_dict`).
+        '''
+        return hashlib.md5(repr((field_tree, strict_html)).encode('utf-8')).hexdigest()
+    
+    def get_records(self, file_path=None, file_signature=None, scan_key=None):
+        '''
+        Returns the references stored for a file, or None if the file changed 
+        since it was scanned (or if it was never scanned with these settings).
+        
+        INPUTS:
+        -------
+        file_path (STR) : Relative file path of the DB or JSON file.
+            Ex: 'worlds/porvenir/data/actors.db'
+        file_signature (LIST) : The [size, mtime_ns, inode] of the file (see
+            `world_file_index.get_signature`).
+        scan_key (STR) : Settings used to scan the file (see `get_scan_key`).
+        
+        RETURNS:
+        --------
+        img_ref_records (LIST or None) : One list per reference: 
+            [ref_file_line, json_address, img_path_for_ref, 
+            img_ref_content_is_html].
+        
+        EXAMPLE:
+        --------
+        # Input:
+        print(my_scan_cache.get_records('worlds/porvenir/data/actors.db', [1200, 1617000000000000000, 42], my_scan_key))
+        
+        # Output:
+        # [[0, ['img'], 'worlds/porvenir/art/hero.png', False]]
+        '''
+        cached_entry = self.files.get(file_path)
+        if not cached_entry or file_signature is None:
+            return None
+        if cached_entry[0] != file_signature[0] or cached_entry[3] != scan_key:
+            return None
+        
+        if cached_entry[1] != file_signature[1]:
+            # The file was written to, but it might still hold the same content
+            if get_full_hash(file_path) != cached_entry[2]:
+                return None
+            cached_entry[1] = file_signature[1]
+            self.cache_was_updated = True
+        
+        return cached_entry[4]
+    
+    def set_records(self, file_path=None, file_signature=None, scan_key=None, img_ref_records=None):
+        '''
+        Stores the references found in a file. The file is hashed here, so it
+        should not have changed since it was scanned.
+        
+        INPUTS:
+        -------
+        file_path (STR) : Relative file path of the DB or JSON file.
+            Ex: 'worlds/porvenir/data/actors.db'
+        file_signature (LIST) : The [size, mtime_ns, inode] of the file (see
+            `world_file_index.get_signature`).
+        scan_key (STR) : Settings used to scan the file (see `get_scan_key`).
+        img_ref_records (LIST) : References found in the file (see 
+            `get_records`).
+        
+        RETURNS:
+        --------
+        None
+        '''
+        if file_signature is None:
+            return
+        self.files[file_path] = [file_signature[0], file_signature[1], get_full_hash(file_path), 
+                                 scan_key, img_ref_records]
+        self.cache_was_updated = True
+    
+    def save(self, file_exists=os.path.isfile):
+        '''
+        Saves the cache to disk. Nothing is written if the cache did not change
+        since it was loaded.
+        
+        INPUTS:
+        -------
+        file_exists (FUNCTION) : Function used to check whether the files in 
+            the cache still exist. Ex: `world_file_index.isfile`
+        
+        RETURNS:
+        --------
+        None
+        '''
+        if not (self.cache_file_path and self.cache_was_updated):
+            return
+        
+        # Forgetting about files that no longer exist on disk
+        for this_file_path in [this_path for this_path in self.files if not file_exists(this_path)]:
+            del self.files[this_file_path]
+        
+        os.makedirs(os.path.dirname(self.cache_file_path), exist_ok=True)
+        
+        # Writing to a temporary file first so that an interrupted run 
+        # can never leave a half-written cache behind
+        temp_cache_file_path = self.cache_file_path + '.tmp'
+        with open(temp_cache_file_path,'w',encoding="utf-8") as fout:
+            fout.write(json_dumps({'version':self.cache_version, 'files':self.files}))
+        os.replace(temp_cache_file_path, self.cache_file_path)
+        
+        self.cache_was_updated = False
+
+class webp_output_cache:
+    '''
+    Class that keeps a copy of the ".webp" files created by the encoders, so 
+    that the same image is never encoded twice with the same settings. This 
+    happens, for example, when several worlds use the same art (ex: worlds 
+    built from the same adventure module), or when a world is converted 
+    again after its files were restored (see `world_refs.restore_bak_files`
+    and `world_refs.restore_trash_folder`).
+    The cache is shared by all worlds. Each ".webp" file is stored under a key
+    made from the MD5 hash of the original image and from the settings of the
+    encoder (see `webp_encoder.get_settings_key`), so the key only depends 
+    on the content of the image, not on its name or location. 
+    When the cache grows bigger than `self.max_cache_size`, the files that 
+    were used the longest time ago are deleted first.
+    
+    Main attributes:
+        self.cache_folder (STR) : Folder where the ".webp" files and the index 
+            of the cache are stored. Ex: "C:/tools/world-manager/_jwm_cache/webp_cache"
+        self.max_cache_size (INT) : Maximum size of the cache, in bytes.
+        self.files (DICT) : Index of the cached ".webp" files. Its structure 
+            is as follows:
+                {'key_a' : [size, last_used_time],
+                 'key_b' : [size, last_used_time]}
+        self.cache_was_updated (BOOL) : Indicates whether or not the index 
+            changed since it was last loaded from or saved to disk.
+    '''
+    
+    def __init__(self, cache_folder=None, max_cache_size=1024*1024*1024):
+        '''
+        Function used to instantiate new objects from the `webp_output_cache` 
+        class. The index of the cache is loaded from disk if it exists.
+        
+        INPUTS:
+        -------
+        cache_folder (STR) : Folder where the ".webp" files and the index of 
+            the cache are stored.
+        max_cache_size (INT) : Maximum size of the cache, in bytes.
+        
+        RETURNS:
+        --------
+        webp_output_cache (OBJECT) : The newly created `webp_output_cache` object itself.
+        
+        EXAMPLE:
+        --------
+        # Input:
+        my_webp_cache = webp_output_cache("C:/tools/world-manager/_jwm_cache/webp_cache")
+        
+        # Output:
+        # None
+        '''
+        self.cache_folder = cache_folder
+        self.max_cache_size = max_cache_size
+        self.index_file_path = os.path.join(cache_folder,'webp_cache.json').replace('\\','/')
+        self.files = {}
+        self.cache_was_updated = False
+        
+        if os.path.isfile(self.index_file_path):
+            try:
+                with open(self.index_file_path,'r',encoding="utf-8") as fp:
+                    self.files = json.load(fp)['files']
+            except (ValueError, KeyError, TypeError):
+                # A corrupted index is simply rebuilt from scratch
+                self.files = {}
+    
+    def get_key(self, img_hash=None, settings_key=None):
+        '''
+        Returns the key of a ".webp" file inside the cache, given the MD5 hash
+        of the original image and the settings of the encoder.
+        '''
+        return hashlib.md5(f'{img_hash}|{settings_key}'.encode('utf-8')).hexdigest()
+    
+    def get_cached_file_path(self, cache_key=None):
+        '''
+        Returns the file path of a ".webp" file inside the cache. The files are
+        spread over subfolders, so that no folder gets too crowded.
+        '''
+        return os.path.join(self.cache_folder, cache_key[:2], cache_key + '.webp').replace('\\','/')
+    
+    def fetch(self, img_hash=None, settings_key=None, webp_img_path=None):
+        '''
+        Puts the cached ".webp" copy of an image in place, if there is one. 
+        The file is copied (and not linked), so that the cache never changes 
+        if the ".webp" file inside the world gets edited in place later on.
+        
+        INPUTS:
+        -------
+        img_hash (STR) : MD5 hash of the original image.
+        settings_key (STR) : Settings of the encoder (see 
+            `webp_encoder.get_settings_key`).
+        webp_img_path (STR) : File path where the ".webp" copy should go.
+            Ex: "worlds/porvenir/art/wood-bg.webp"
+        
+        RETURNS:
+        --------
+        found_in_cache (BOOL) : Indicates whether or not the ".webp" copy was 
+            found in the cache (and put in place).
+        
+        EXAMPLE:
+        --------
+        # Input:
+        print(my_webp_cache.fetch('b5d2f1ae1ecd3b9a2e1e2b5c8c4b3f0a', 'ffmpeg:libwebp', 'worlds/porvenir/art/wood-bg.webp'))
+        
+        # Output:
+        # True
+        '''
+        cache_key = self.get_key(img_hash, settings_key)
+        if cache_key not in self.files:
+            return False
+        
+        cached_file_path = self.get_cached_file_path(cache_key)
+        if not os.path.isfile(cached_file_path):
+            # The file was deleted from the cache behind our back
+            del self.files[cache_key]
+            self.cache_was_updated = True
+            return False
+        
+        if os.path.lexists(webp_img_path):
+            os.remove(webp_img_path)
+        shutil.copyfile(cached_file_path, webp_img_path)
+        
+        self.files[cache_key][1] = time.time()
+        self.cache_was_updated = True
+        return True
+    
+    def store(self, img_hash=None, settings_key=None, webp_img_path=None):
+        '''
+        Stores a copy of a ".webp" file that was just created by an encoder.
+        
+        INPUTS:
+        -------
+        img_hash (STR) : MD5 hash of the original image.
+        settings_key (STR) : Settings of the encoder (see 
+            `webp_encoder.get_settings_key`).
+        webp_img_path (STR) : File path of the ".webp" file.
+            Ex: "worlds/porvenir/art/wood-bg.webp"
+        
+        RETURNS:
+        --------
+        None
+        '''
+        cache_key = self.get_key(img_hash, settings_key)
+        cached_file_path = self.get_cached_file_path(cache_key)
+        os.makedirs(os.path.dirname(cached_file_path), exist_ok=True)
+        
+        # The file is copied (and not linked), so that the cache never changes
+        # if the ".webp" file inside the world gets edited
+        temp_cached_file_path = cached_file_path + '.tmp'
+        shutil.copyfile(webp_img_path, temp_cached_file_path)
+        os.replace(temp_cached_file_path, cached_file_path)
+        
+        self.files[cache_key] = [os.path.getsize(cached_file_path), time.time()]
+        self.cache_was_updated = True
+    
+    def evict(self):
+        '''
+        Deletes the files that were used the longest time ago, until the cache
+        is no bigger than `self.max_cache_size`.
+        '''
+        cache_size = sum(this_entry[0] for this_entry in self.files.values())
+        for cache_key in sorted(self.files, key=lambda this_key: self.files[this_key][1]):
+            if cache_size <= self.max_cache_size:
+                break
+            cache_size -= self.files.pop(cache_key)[0]
+            self.cache_was_updated = True
+            cached_file_path = self.get_cached_file_path(cache_key)
+            if os.path.isfile(cached_file_path):
+                os.remove(cached_file_path)
+    
+    def save(self):
+        '''
+        Trims the cache down to its maximum size and saves its index to disk. 
+        Nothing is written if the index did not change since it was loaded.
+        '''
+        self.evict()
+        if not self.cache_was_updated:
+            return
+        
+        os.makedirs(self.cache_folder, exist_ok=True)
+        
+        # Writing to a temporary file first so that an interrupted run 
+        # can never leave a half-written index behind
+        temp_index_file_path = self.index_file_path + '.tmp'
+        with open(temp_index_file_path,'w',encoding="utf-8") as fout:
+            json.dump({'files':self.files}, fout, separators=(',', ':'))
+        os.replace(temp_index_file_path, self.index_file_path)
+        
+        self.cache_was_updated = False
+
+class webp_quality_cache:
+    '''
+    Class that keeps the quality picked for each image by the search on SSIM
+    (see `webp_encoder.create_webp_copy_for_target_ssim`), so that the search
+    doesn't need to run again for images that were already converted (in any
+    world). Once the quality is known, the image is converted like any other
+    one, and its ".webp" copy is usually taken from the `webp_output_cache`.
+    The qualities are indexed by the MD5 hash of the image, by the encoder's 
+    settings (see `webp_encoder.get_settings_key`) and by the target SSIM.
+    
+    Main attributes:
+        self.cache_file_path (STR) : File path of the cache file on disk. This 
+            should typically look like this: "C:/jwm/_jwm_cache/webp_quality_cache.json"
+        self.qualities (DICT) : Dictionary that indexes the quality and the 
+            SSIM picked for each image. The structure of this dictionary is 
+            as follows:
+                {'md5_hash|ffmpeg:libwebp|ssim0.98' : [62, 0.9803]}
+        self.cache_was_updated (BOOL) : Indicates whether or not the cache 
+            changed since it was last loaded from or saved to disk.
+    '''
+    
+    def __init__(self, cache_file_path=None):
+        '''
+        Function used to instantiate new objects from the `webp_quality_cache` class.
+        The cache file is loaded from disk if it exists.
+        
+        INPUTS:
+        -------
+        cache_file_path (STR) : File path of the cache file on disk. 
+            Ex: "C:/jwm/_jwm_cache/webp_quality_cache.json"
+        
+        RETURNS:
+        --------
+        webp_quality_cache (OBJECT) : The newly created `webp_quality_cache` object itself.
+        '''
+        self.cache_file_path = cache_file_path
+        self.qualities = {}
+        self.cache_was_updated = False
+        
+        if self.cache_file_path and os.path.isfile(self.cache_file_path):
+            try:
+                with open(self.cache_file_path,'r',encoding="utf-8") as fp:
+                    self.qualities = json.load(fp)['qualities']
+            except (ValueError, KeyError, TypeError):
+                # A corrupted cache is simply rebuilt from scratch
+                self.qualities = {}
+    
+    def get_webp_settings(self, img_hash=None, settings_key=None, target_ssim=None):
+        '''
+        Returns the settings picked for an image by a previous search, or None
+        if the image was never searched with these settings.
+        
+        INPUTS:
+        -------
+        img_hash (STR) : MD5 hash of the image.
+        settings_key (STR) : Settings of the encoder. Ex: "ffmpeg:libwebp"
+        target_ssim (FLOAT) : Target SSIM of the search. Ex: 0.98
+        
+        RETURNS:
+        --------
+        webp_settings (DICT or None) : Settings of the ".webp" copy.
+            Ex: {'lossless':False, 'quality':62, 'ssim':0.9803}
+        '''
+        cached_entry = self.qualities.get(f'{img_hash}|{settings_key}|ssim{target_ssim}')
+        if not cached_entry:
+            return None
+        return {'lossless':False, 'quality':cached_entry[0], 'ssim':cached_entry[1]}
+    
+    def set_webp_settings(self, img_hash=None, settings_key=None, target_ssim=None, webp_settings=None):
+        '''
+        Stores the settings picked for an image (see `get_webp_settings`).
+        '''
+        self.qualities[f'{img_hash}|{settings_key}|ssim{target_ssim}'] = [webp_settings['quality'], webp_settings['ssim']]
+        self.cache_was_updated = True
+    
+    def save(self):
+        '''
+        Saves the cache to disk. Nothing is written if the cache did not change
+        since it was loaded.
+        '''
+        if not (self.cache_file_path and self.cache_was_updated):
+            return
+        
+        os.makedirs(os.path.dirname(self.cache_file_path), exist_ok=True)
+        temp_cache_file_path = self.cache_file_path + '.tmp'
+        with open(temp_cache_file_path,'w',encoding="utf-8") as fout:
+            json.dump({'qualities':self.qualities}, fout, separators=(',', ':'))
+        os.replace(temp_cache_file_path, self.cache_file_path)
+        
+        self.cache_was_updated = False
+
+def get_webp_img_size(webp_img_path=None):
+    '''
+    Reads the width and height of a ".webp" image straight from its header, 
+    for the three kinds of WEBP files: lossy ("VP8 "), lossless ("VP8L") and
+    extended ("VP8X", used for transparency and animations).
+    
+    INPUTS:
+    -------
+    webp_img_path (STR) : File path of the ".webp" image. Ex: "worlds/porvenir/art/map.webp"
+    
+    RETURNS:
+    --------
+    img_size (TUPLE or None) : The (width, height) of the image. Equals None 
+        when the file is not a WEBP image, or when its header could not be read.
+    
+    EXAMPLE:
+    --------
+    # Input:
+    print(get_webp_img_size('worlds/porvenir/art/map.webp'))
+    
+    # Output:
+    # (2000, 1500)
+    '''
+    try:
+        with open(webp_img_path,'rb') as fin:
+            webp_header = fin.read(30)
+    except OSError:
+        return None
+    if len(webp_header) < 30 or webp_header[:4] != b'RIFF' or webp_header[8:12] != b'WEBP':
+        return None
+    
+    chunk_type = webp_header[12:16]
+    if chunk_type == b'VP8X':
+        return (1 + int.from_bytes(webp_header[24:27],'little'), 1 + int.from_bytes(webp_header[27:30],'little'))
+    if chunk_type == b'VP8L':
+        size_bits = int.from_bytes(webp_header[21:25],'little')
+        return (1 + (size_bits & 0x3fff), 1 + ((size_bits >> 14) & 0x3fff))
+    if chunk_type == b'VP8 ':
+        return (int.from_bytes(webp_header[26:28],'little') & 0x3fff, int.from_bytes(webp_header[28:30],'little') & 0x3fff)
+    return None
+
+def get_img_stats(img_path=None):
+    '''
+    Gathers a few cheap statistics about an image, which are used to pick the
+    settings of its ".webp" copy (see `choose_webp_settings`). The size, the 
+    transparency and the palette are read straight from the PNG or JPEG 
+    headers, so the image does not need to be decoded. When the `Pillow` 
+    library is installed, the colours of PNG images are also counted (on a 
+    sample of up to 512x512 pixels for big images), and images whose alpha 
+    channel is fully opaque are not considered transparent.
+    
+    INPUTS:
+    -------
+    img_path (STR) : File path of the image. Ex: "worlds/porvenir/art/map.png"
+    
+    RETURNS:
+    --------
+    img_stats (DICT or None) : Statistics of the image. The "color_count" is 
+        None when it is unknown, and 257 when there are more than 256 colours.
+        Equals None when the image is neither a PNG nor a JPEG, or when its 
+        headers could not be read. Structure of output:
+        img_stats = {'img_encoding':'png', 'width':4000, 'height':3000,
+                     'has_alpha':True, 'color_count':257}
+    
+    EXAMPLE:
+    --------
+    # Input:
+    print(get_img_stats('worlds/porvenir/tokens/goblin.png'))
+    
+    # Output:
+    # {'img_encoding': 'png', 'width': 280, 'height': 280, 'has_alpha': True, 'color_count': 257}
+    '''
+    try:
+        with open(img_path,'rb') as fin:
+            img_header = fin.read(8)
+            
+            if img_header == b'\x89PNG\r\n\x1a\n':
+                img_stats = {'img_encoding':'png', 'width':None, 'height':None, 
+                             'has_alpha':False, 'color_count':None}
+                # Going through the chunks that come before the pixel data
+                while True:
+                    chunk_header = fin.read(8)
+                    if len(chunk_header) < 8:
+                        break
+                    chunk_length = int.from_bytes(chunk_header[:4],'big')
+                    chunk_type = chunk_header[4:]
+                    if chunk_type == b'IHDR':
+                        chunk_data = fin.read(chunk_length)
+                        img_stats['width'] = int.from_bytes(chunk_data[0:4],'big')
+                        img_stats['height'] = int.from_bytes(chunk_data[4:8],'big')
+                        bit_depth, color_type = chunk_data[8], chunk_data[9]
+                        # Color types 4 and 6 have an alpha channel. Grayscale 
+                        # images can't have more than 256 shades.
+                        img_stats['has_alpha'] = color_type in (4, 6)
+                        if color_type in (0, 4) and bit_depth <= 8:
+                            img_stats['color_count'] = 2**bit_depth
+                        fin.seek(4, 1)
+                    elif chunk_type == b'PLTE':
+                        img_stats['color_count'] = chunk_length // 3
+                        fin.seek(chunk_length + 4, 1)
+                    elif chunk_type == b'tRNS':
+                        img_stats['has_alpha'] = True
+                        fin.seek(chunk_length + 4, 1)
+                    elif chunk_type in (b'IDAT', b'IEND'):
+                        break
+                    else:
+                        fin.seek(chunk_length + 4, 1)
+            
+            elif img_header[:2] == b'\xff\xd8':
+                img_stats = {'img_encoding':'jpeg', 'width':None, 'height':None, 
+                             'has_alpha':False, 'color_count':None}
+                fin.seek(2)
+                # Going through the markers until the "start of frame" one, 
+                # which has the size of the image
+                while True:
+                    marker = fin.read(4)
+                    if len(marker) < 4 or marker[0] != 0xFF:
+                        break
+                    marker_length = int.from_bytes(marker[2:4],'big')
+                    if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+                        marker_data = fin.read(5)
+                        img_stats['height'] = int.from_bytes(marker_data[1:3],'big')
+                        img_stats['width'] = int.from_bytes(marker_data[3:5],'big')
+                        break
+                    fin.seek(marker_length - 2, 1)
+            
+            else:
+                return None
+    except OSError:
+        return None
+    
+    if not (img_stats['width'] and img_stats['height']):
+        return None
+    
+    # Counting the colours of the PNGs that don't have a palette
+    if PIL_Image is not None and img_stats['img_encoding'] == 'png' and (img_stats['color_count'] is None or img_stats['has_alpha']):
+        try:
+            with PIL_Image.open(img_path) as this_img:
+                this_sample = this_img
+                if this_img.width * this_img.height > 512*512:
+                    # Picking pixels (instead of averaging them) keeps the 
+                    # colours of the sample the same as the original ones
+                    this_sample = this_img.resize((min(this_img.width, 512), min(this_img.height, 512)), 
+                                                  PIL_Image.NEAREST)
+                if this_sample.mode not in ('RGB','RGBA','L','LA'):
+                    this_sample = this_sample.convert('RGBA' if img_stats['has_alpha'] else 'RGB')
+                this_sample_rgb = this_sample.convert('RGB')
+                if 'A' in this_sample.getbands():
+                    this_sample_alpha = this_sample.getchannel('A')
+                    img_stats['has_alpha'] = this_sample_alpha.getextrema()[0] < 255
+                    # The alpha channel is compressed on its own by libwebp, 
+                    # so only the colours of the opaque pixels are counted. 
+                    # This way, the anti-aliased edges of line art don't count
+                    # as new colours.
+                    this_sample_rgb.paste((0,0,0), mask=this_sample_alpha.point(lambda alpha: 255 if alpha < 255 else 0))
+                if img_stats['color_count'] is None:
+                    this_sample_colors = this_sample_rgb.getcolors(256)
+                    img_stats['color_count'] = len(this_sample_colors) if this_sample_colors else 257
+        except (OSError, ValueError, SyntaxError):
+            pass
+    
+    return img_stats
+
+def choose_webp_settings(img_stats=None):
+    '''
+    Picks the settings of the ".webp" copy of an image, based on the image's
+    statistics (see `get_img_stats`):
+        - Images with up to 256 colours (line art, palette PNGs, grayscale 
+          maps) and tiny images (icons) are encoded losslessly. Lossy 
+          compression smears their sharp edges, and lossless is usually 
+          smaller anyway.
+        - JPEGs are photographs that were already compressed, so they are 
+          encoded with a lossy quality of 80 (75 above 16 megapixels, since 
+          huge maps are always displayed scaled down).
+        - Other transparent PNGs (tokens) use a quality of 85, since their
+          edges are displayed on top of the scene. The alpha channel itself 
+          is always kept losslessly by `libwebp`.
+        - Other PNGs (painted or photographic backgrounds) use a quality of 80.
+    
+    INPUTS:
+    -------
+    img_stats (DICT or None) : Statistics of the image (see `get_img_stats`).
+    
+    RETURNS:
+    --------
+    webp_settings (DICT or None) : Settings of the ".webp" copy. Equals None 
+        when there are no statistics, in which case the encoder's default 
+        settings are used. Structure of output:
+        webp_settings = {'lossless':False, 'quality':80}
+        The settings of a copy can also have a "width" and a "height", when 
+        the copy needs to be smaller than the original image (see 
+        `world_refs.downscale_scene_backgrounds`).
+    
+    EXAMPLE:
+    --------
+    # Input:
+    print(choose_webp_settings({'img_encoding':'png', 'width':4000, 'height':3000,
+                                'has_alpha':True, 'color_count':12}))
+    
+    # Output:
+    # {'lossless': True, 'quality': 100}
+    '''
+    if img_stats is None:
+        return None
+    
+    img_pixels = img_stats['width'] * img_stats['height']
+    
+    if img_stats['img_encoding'] == 'jpeg':
+        return {'lossless':False, 'quality':75 if img_pixels > 16*1000*1000 else 80}
+    if (img_stats['color_count'] is not None and img_stats['color_count'] <= 256) or img_pixels <= 64*64:
+        return {'lossless':True, 'quality':100}
+    if img_stats['has_alpha']:
+        return {'lossless':False, 'quality':85}
+    return {'lossless':False, 'quality':80}
+
+def eval_image_math(expression=None, **images):
+    '''
+    Evaluates an arithmetic expression on whole images, pixel by pixel (see 
+    `PIL.ImageMath`). Pillow 10.3 renamed `ImageMath.eval` to 
+    `ImageMath.unsafe_eval` (and Pillow 12 removed the old name), so the one
+    that exists is used. The expressions are always fixed strings written 
+    in this module, never user input.
+    
+    INPUTS:
+    -------
+    expression (STR) : Expression to evaluate. Ex: "x * y"
+    images (PIL.Image) : Images used in the expression, by name.
+    
+    RETURNS:
+    --------
+    result_img (PIL.Image) : Image with the result.
+    
+    EXAMPLE:
+    --------
+    # Input:
+    print(eval_image_math('x * y', x=my_img, y=my_other_img).mode)
+    
+    # Output:
+    # F
+    '''
+    if hasattr(PIL_ImageMath, 'unsafe_eval'):
+        return PIL_ImageMath.unsafe_eval(expression, **images)
+    return PIL_ImageMath.eval(expression, **images)
+
+def compute_ssim(img_path=None, webp_img_path=None, max_pixels=4*1000*1000):
+    '''
+    Measures how similar a ".webp" copy looks to its original image, using 
+    the Structural Similarity Index (SSIM) of their brightness. Just like 
+    FFMPEG's "ssim" filter, the index is calculated on 8x8 blocks of pixels, 
+    and then averaged. Transparent pixels are compared as if they were on top
+    of a black background, since libwebp is free to change the colour of 
+    pixels that can't be seen. When the copy was resized, the original image
+    is scaled to the same size first. Images bigger than `max_pixels` are 
+    scaled down as well, which keeps the memory use in check.
+    This function needs the `Pillow` library (version 7.0 or newer).
+    
+    INPUTS:
+    -------
+    img_path (STR) : File path of the original image. Ex: "worlds/porvenir/art/map.png"
+    webp_img_path (STR) : File path of the ".webp" copy. Ex: "worlds/porvenir/art/map.webp"
+    max_pixels (INT) : Maximum number of pixels compared.
+    
+    RETURNS:
+    --------
+    ssim (FLOAT) : SSIM between the two images. Equals 1 when they are 
+        identical, and gets lower as the ".webp" copy gets worse.
+    
+    EXAMPLE:
+    --------
+    # Input:
+    print(compute_ssim('worlds/porvenir/art/map.png', 'worlds/porvenir/art/map.webp'))
+    
+    # Output:
+    # 0.9871
+    '''
+    img_lumas = []
+    for this_path in (img_path, webp_img_path):
+        with PIL_Image.open(this_path) as this_img:
+            if ('A' in this_img.getbands()) or ('transparency' in this_img.info):
+                this_img = this_img.convert('RGBA')
+                this_background = PIL_Image.new('RGB', this_img.size)
+                this_background.paste(this_img, mask=this_img.getchannel('A'))
+                this_img = this_background
+            img_lumas.append(this_img.convert('L'))
+    
+    if img_lumas[0].size != img_lumas[1].size:
+        img_lumas[0] = img_lumas[0].resize(img_lumas[1].size, PIL_Image.LANCZOS)
+    
+    img_width, img_height = img_lumas[0].size
+    reduce_factor = int((img_width * img_height / max_pixels) ** 0.5) + 1
+    if reduce_factor > 1:
+        img_lumas = [this_luma.reduce(reduce_factor) for this_luma in img_lumas]
+    img_x, img_y = [this_luma.convert('F') for this_luma in img_lumas]
+    
+    # Averages of each 8x8 block: E[x], E[y], E[x*x], E[y*y] and E[x*y]
+    mean_x, mean_y = img_x.reduce(8), img_y.reduce(8)
+    mean_xx = eval_image_math('x * x', x=img_x).reduce(8)
+    mean_yy = eval_image_math('y * y', y=img_y).reduce(8)
+    mean_xy = eval_image_math('x * y', x=img_x, y=img_y).reduce(8)
+    
+    # SSIM of each block, with the usual constants for 8-bit images
+    ssim_map = eval_image_math('((2 * mx * my + 6.5025) * (2 * (mxy - mx * my) + 58.5225)) '
+                               '/ ((mx * mx + my * my + 6.5025) * (mxx - mx * mx + myy - my * my + 58.5225))',
+                               mx=mean_x, my=mean_y, mxx=mean_xx, myy=mean_yy, mxy=mean_xy)
+    
+    # Averaging all of the blocks at once (`ImageStat` only works on 8-bit images)
+    return ssim_map.reduce(ssim_map.size).getpixel((0,0))
+
+def get_webp_settings_suffix(webp_settings=None):
+    '''
+    Short string that describes the settings of a ".webp" copy (see 
+    `choose_webp_settings`), used inside the keys of the `webp_output_cache`.
+    Ex: ":lossless", ":q80" or ":q80:2000x1500". Equals "" when there are no 
+    settings.
+    '''
+    if webp_settings is None:
+        return ''
+    webp_settings_suffix = ''
+    if 'lossless' in webp_settings:
+        webp_settings_suffix += ':lossless' if webp_settings['lossless'] else f':q{webp_settings["quality"]}'
+    if 'width' in webp_settings:
+        webp_settings_suffix += f':{webp_settings["width"]}x{webp_settings["height"]}'
+    return webp_settings_suffix
+
+class webp_encoder:
+    '''
+    Base class of the encoders that create the ".webp" copies of the images 
+    (see `img_ref.create_webp_copy` and `world_refs.create_webp_copies`). 
+    Each encoder only needs to define `create_webp_copy`. Encoders that can 
+    convert several images at once more cheaply than one by one (like 
+    `ffmpeg_webp_encoder`) also redefine `create_webp_copies_in_batch`.
+    Every image can have its own settings (see `choose_webp_settings`). When
+    an image has no settings, the encoder's default settings are used. When
+    the settings have a "width" and a "height", the copy is resized.
+    The encoders are listed in the `webp_encoders` dictionary, and they are 
+    picked by name (see `get_webp_encoder`).
+    
+    Main attributes:
+        self.encoder_name (STR) : Name of the encoder. Ex: "ffmpeg" or "pillow".
+    '''
+    
+    encoder_name = None
+    
+    def create_webp_copy(self, img_path=None, webp_img_path=None, webp_settings=None):
+        '''
+        Creates a compressed ".webp" copy of one image.
+        
+        INPUTS:
+        -------
+        img_path (STR) : File path of the image. Ex: "worlds/porvenir/art/wood-bg.jpg"
+        webp_img_path (STR) : File path of the ".webp" copy. 
+            Ex: "worlds/porvenir/art/wood-bg.webp"
+        webp_settings (DICT or None) : Settings of the ".webp" copy (see 
+            `choose_webp_settings`). Ex: {'lossless':False, 'quality':80}
+        
+        RETURNS:
+        --------
+        return_code (INT) : Indicates whether or not the conversion terminated
+            successfully. This value takes 0 if the conversion was successful. 
+            All other values indicate some sort of problem.
+        '''
+        raise NotImplementedError
+    
+    def create_webp_copies_in_batch(self, img_paths=None, webp_img_paths=None, webp_settings_list=None):
+        '''
+        Creates the compressed ".webp" copies of several images. By default, 
+        the images are simply converted one after the other.
+        
+        INPUTS:
+        -------
+        img_paths (LIST) : File paths of the images.
+        webp_img_paths (LIST) : File paths of the ".webp" copies, in the same 
+            order as `img_paths`.
+        webp_settings_list (LIST or None) : Settings of each ".webp" copy (see
+            `choose_webp_settings`), in the same order as `img_paths`.
+        
+        RETURNS:
+        --------
+        return_codes (LIST) : Return code of each conversion, in the same 
+            order as `img_paths` (see `create_webp_copy`).
+        '''
+        if webp_settings_list is None:
+            webp_settings_list = [None] * len(img_paths)
+        return [self.create_webp_copy(this_img_path, this_webp_img_path, this_webp_settings) 
+                for this_img_path, this_webp_img_path, this_webp_settings 
+                in zip(img_paths, webp_img_paths, webp_settings_list)]
+    
+    def get_settings_key(self, webp_settings=None):
+        '''
+        Returns a short string that identifies the encoder and the settings
+        that change its output (see `webp_output_cache`). 
+        Ex: "pillow:q75:m4" or "pillow:q75:m4:lossless"
+        '''
+        return self.encoder_name + get_webp_settings_suffix(webp_settings)
+    
+    def get_ssim(self, img_path=None, webp_img_path=None):
+        '''
+        Measures how similar a ".webp" copy looks to its original image. By 
+        default, the SSIM is calculated inside Python (see `compute_ssim`).
+        
+        INPUTS:
+        -------
+        img_path (STR) : File path of the original image.
+        webp_img_path (STR) : File path of the ".webp" copy.
+        
+        RETURNS:
+        --------
+        ssim (FLOAT or None) : SSIM between the two images (1 means identical).
+            Equals None when it could not be measured.
+        '''
+        if PIL_Image is None:
+            raise ImportError('Measuring the SSIM of the images needs the `Pillow` library, which is not installed.')
+        return compute_ssim(img_path, webp_img_path)
+    
+    def create_webp_copy_for_target_ssim(self, img_path=None, webp_img_path=None, target_ssim=0.98,
+                                         min_quality=10, max_quality=100, webp_settings=None):
+        '''
+        Creates the smallest lossy ".webp" copy of one image that still looks
+        close enough to the original. The quality is picked with a binary 
+        search between `min_quality` and `max_quality`: each candidate copy is
+        scored with `get_ssim`, and the lowest quality whose SSIM is at least 
+        `target_ssim` is kept. This takes about 7 encodes per image. When not
+        even `max_quality` reaches the target (or when the SSIM can't be 
+        measured), the copy is made with `max_quality`. The candidates are written to a temporary folder, so 
+        only the chosen copy ever reaches `webp_img_path`.
+        
+        INPUTS:
+        -------
+        img_path (STR) : File path of the image. Ex: "worlds/porvenir/art/wood-bg.jpg"
+        webp_img_path (STR) : File path of the ".webp" copy. 
+            Ex: "worlds/porvenir/art/wood-bg.webp"
+        target_ssim (FLOAT) : Lowest SSIM the copy can have. Ex: 0.98
+        min_quality (INT) : Lowest quality that is tried.
+        max_quality (INT) : Highest quality that is tried.
+        webp_settings (DICT or None) : Other settings of the copy, which are 
+            used for every candidate (ex: its "width" and "height").
+        
+        RETURNS:
+        --------
+        return_code (INT) : Indicates whether or not the conversion terminated
+            successfully (see `create_webp_copy`).
+        webp_settings (DICT or None) : Settings of the chosen copy, including
+            its SSIM (None if it could not be measured). Equals None when the 
+            conversion failed.
+            Ex: {'lossless':False, 'quality':62, 'ssim':0.9803}
+        
+        EXAMPLE:
+        --------
+        # Input:
+        print(my_encoder.create_webp_copy_for_target_ssim('worlds/porvenir/art/wood-bg.jpg', 
+                                                          'worlds/porvenir/art/wood-bg.webp', 0.98))
+        
+        # Output:
+        # (0, {'lossless': False, 'quality': 62, 'ssim': 0.9803})
+        '''
+        best_webp_settings = None
+        with tempfile.TemporaryDirectory() as temp_folder:
+            candidate_webp_path = os.path.join(temp_folder, 'candidate.webp')
+            best_webp_path = os.path.join(temp_folder, 'best.webp')
+            
+            low_quality, high_quality = min_quality, max_quality
+            while low_quality <= high_quality:
+                this_quality = (low_quality + high_quality) // 2
+                this_webp_settings = dict(webp_settings or {}, lossless=False, quality=this_quality)
+                return_code = self.create_webp_copy(img_path, candidate_webp_path, this_webp_settings)
+                if return_code != 0:
+                    return return_code, None
+                this_ssim = self.get_ssim(img_path, candidate_webp_path)
+                
+                if (this_ssim is not None) and (this_ssim >= target_ssim):
+                    # Good enough, so trying lower qualities
+                    os.replace(candidate_webp_path, best_webp_path)
+                    best_webp_settings = dict(this_webp_settings, ssim=round(this_ssim, 4))
+                    high_quality = this_quality - 1
+                else:
+                    low_quality = this_quality + 1
+            
+            # When no candidate reached the target, the last one tried was 
+            # the one with `max_quality`
+            if best_webp_settings is None:
+                os.replace(candidate_webp_path, best_webp_path)
+                best_webp_settings = dict(this_webp_settings, ssim=round(this_ssim, 4) if this_ssim is not None else None)
+            
+            shutil.copyfile(best_webp_path, webp_img_path)
+        
+        return 0, best_webp_settings
+
+class ffmpeg_webp_encoder(webp_encoder):
     '''
-    Function that walks through an indefinitely complex dictionary (can contain
-    lists, tuples or other dictionaries), and iterates through all of the 
-    dictionary's "leaves". This works as an iterator that returns a big list 
-    that contains the full "address" of a leaf. 
+    Encoder that creates the ".webp" copies by calling the FFMPEG executable.
     
-    Modified from https://stackoverflow.com/a/12507546/8667016
+    Main attributes:
+        self.ffmpeg_location (STR) : String that describes the absolute path to 
+            the ffmpeg executable. This attribute should typically look like this:
+            "C:/Program Files (x86)/Audacity/libraries/ffmpeg.exe".
+    '''
     
-    INPUTS:
-    -------
-    in_dict (DICT) : A dictionary of arbitrary depth/complexity.
+    encoder_name = 'ffmpeg'
+    
+    def __init__(self, ffmpeg_location=None):
+        self.ffmpeg_location = ffmpeg_location
+    
+    def get_settings_key(self, webp_settings=None):
+        return 'ffmpeg:libwebp' + get_webp_settings_suffix(webp_settings)
+    
+    def get_output_args(self, webp_settings=None):
+        '''
+        Returns the FFMPEG options that apply the settings of one ".webp" copy
+        (see `choose_webp_settings`): the options of the `libwebp` encoder, 
+        and a "scale" filter when the copy is resized. 
+        Ex: ['-vf', 'scale=2000:1500:flags=lanczos', '-lossless', '0', '-quality', '80']
+        '''
+        output_args = []
+        if webp_settings is None:
+            return output_args
+        if 'width' in webp_settings:
+            output_args += ['-vf', f'scale={webp_settings["width"]}:{webp_settings["height"]}:flags=lanczos']
+        if 'lossless' in webp_settings:
+            if webp_settings['lossless']:
+                output_args += ['-lossless', '1']
+            else:
+                output_args += ['-lossless', '0', '-quality', str(webp_settings['quality'])]
+        return output_args
+    
+    def get_ssim(self, img_path=None, webp_img_path=None):
+        '''
+        Measures how similar a ".webp" copy looks to its original image with 
+        FFMPEG's "ssim" filter. When the copy was resized, the original image 
+        is scaled to the same size first. Returns None when FFMPEG could not 
+        measure it.
+        '''
+        # The original image is scaled to the size of the copy. The "scale2ref"
+        # filter did this on its own, but it is deprecated, and FFMPEG 7.0 
+        # outputs no frames with it when the inputs are single images.
+        webp_img_size = get_webp_img_size(webp_img_path)
+        if webp_img_size is not None:
+            filter_graph = f'[1:v]scale={webp_img_size[0]}:{webp_img_size[1]}:flags=lanczos[original];[0:v][original]ssim'
+        else:
+            # Scaling to the size of a reference input needs FFMPEG 7.1
+            filter_graph = '[0:v]split[copy][ref];[1:v][ref]scale=rw:rh:flags=lanczos[original];[copy][original]ssim'
+        cmd_call_args = [self.ffmpeg_location, '-hide_banner', '-i', webp_img_path, '-i', img_path,
+                         '-lavfi', filter_graph, '-f', 'null', '-']
+        subprocess_output = subprocess.run(cmd_call_args, capture_output=True, text=True)
+        
+        # The filter prints something like this at the end:
+        # "[Parsed_ssim_1 @ 0x...] SSIM Y:0.987 (18.9) U:0.991 (20.5) V:0.990 (20.1) All:0.988 (19.4)"
+        ssim_match = re.search(r'All:([0-9.]+)', subprocess_output.stderr)
+        return float(ssim_match.group(1)) if ssim_match else None
+    
+    def create_webp_copy(self, img_path=None, webp_img_path=None, webp_settings=None):
+        # The arguments are passed as a list, so the file paths don't need to 
+        # be quoted (and they can hold any character)
+        cmd_call_args = ([self.ffmpeg_location, '-y', '-i', img_path, '-c:v', 'libwebp'] 
+                         + self.get_output_args(webp_settings) 
+                         + [webp_img_path, '-hide_banner', '-loglevel', 'error'])
         
-    RETURNS:
-    --------
-    iterated_output (LIST) : A list that contains the full address of the leaf 
-        in the dictionary.
+        # Running terminal command (https://stackoverflow.com/a/48857230/8667016)
+        # The exit code here is 0 if the conversion succeeded. If it is anything
+        # else, it means the conversion process failed.
+        # Images with the wrong extension (ex: a JPEG image saved as ".png")
+        # are renamed before they get here (see `world_refs.fix_incorrect_file_extensions`).
+        subprocess_output = subprocess.run(cmd_call_args)
         
-    EXAMPLE:
-    --------
-    # Input:
-    my_dict = {'part_1':[5,6,7],
-               'part_2':[3,6,{'a':999,
-                              'b':777,
-                              'c':123}]}
+        return subprocess_output.returncode
     
-    for this_full_address in dict_walker(in_dict=my_dict):
-        print(this_full_address)
+    def create_webp_copies_in_batch(self, img_paths=None, webp_img_paths=None, webp_settings_list=None):
+        '''
+        Creates the ".webp" copies of several images with one single FFMPEG 
+        call, which saves the time it takes to start FFMPEG (and its encoder) 
+        for every image. This makes a big difference for small images, like 
+        tokens and icons.
+        Each image is a separate input of the FFMPEG call, and each one is 
+        mapped to its own output, with its own settings. When the call fails (or when one of the 
+        outputs is missing), the batch is split in two halves, and each half 
+        is converted again. This way, one broken image never fails the whole
+        batch, and each image gets its own return code. 
+        A batch with one single image is simply converted by `create_webp_copy`.
+        
+        INPUTS:
+        -------
+        img_paths (LIST) : File paths of the images.
+        webp_img_paths (LIST) : File paths of the ".webp" copies, in the same 
+            order as `img_paths`.
+        webp_settings_list (LIST or None) : Settings of each ".webp" copy (see
+            `choose_webp_settings`), in the same order as `img_paths`.
+        
+        RETURNS:
+        --------
+        return_codes (LIST) : Return code of each conversion, in the same 
+            order as `img_paths` (see `create_webp_copy`).
+        
+        EXAMPLE:
+        --------
+        # Input:
+        print(my_encoder.create_webp_copies_in_batch(['worlds/porvenir/tokens/goblin.png', 'worlds/porvenir/tokens/orc.png'],
+                                                     ['worlds/porvenir/tokens/goblin.webp', 'worlds/porvenir/tokens/orc.webp']))
+        
+        # Output:
+        # [0, 1]
+        '''
+        if webp_settings_list is None:
+            webp_settings_list = [None] * len(img_paths)
+        if len(img_paths) == 1:
+            return [self.create_webp_copy(img_paths[0], webp_img_paths[0], webp_settings_list[0])]
+        
+        # The arguments are passed as a list, so the file paths don't need to 
+        # be quoted. The options of each output need to come right before it.
+        cmd_call_args = [self.ffmpeg_location, '-y', '-hide_banner', '-loglevel', 'error']
+        for this_img_path in img_paths:
+            cmd_call_args += ['-i', this_img_path]
+        for input_number, this_webp_img_path in enumerate(webp_img_paths):
+            cmd_call_args += ['-map', f'{input_number}:v:0', '-c:v', 'libwebp']
+            cmd_call_args += self.get_output_args(webp_settings_list[input_number]) + [this_webp_img_path]
+        
+        subprocess_output = subprocess.run(cmd_call_args)
+        
+        # FFMPEG's exit code only says that something went wrong, not which
+        # image caused it. So every output is checked as well.
+        if (subprocess_output.returncode == 0) and all(os.path.isfile(this_webp_img_path) 
+                                                       and os.path.getsize(this_webp_img_path) > 0
+                                                       for this_webp_img_path in webp_img_paths):
+            return [0] * len(img_paths)
+        
+        # Finding out which images failed by converting each half on its own
+        half_batch_size = len(img_paths) // 2
+        return (self.create_webp_copies_in_batch(img_paths[:half_batch_size], webp_img_paths[:half_batch_size],
+                                                 webp_settings_list[:half_batch_size])
+                + self.create_webp_copies_in_batch(img_paths[half_batch_size:], webp_img_paths[half_batch_size:],
+                                                   webp_settings_list[half_batch_size:]))
+
+class pillow_webp_encoder(webp_encoder):
+    '''
+    Encoder that creates the ".webp" copies inside the Python process itself,
+    using the `Pillow` library (and its bindings to `libwebp`). This avoids 
+    starting a new process for every image, and it does not need FFMPEG at 
+    all. The default settings are the same ones FFMPEG uses for `libwebp`.
     
-    # Output:
-    # ['part_1', 0, 5]
-    # ['part_1', 1, 6]
-    # ['part_1', 2, 7]
-    # ['part_2', 0, 3]
-    # ['part_2', 1, 6]
-    # ['part_2', 2, 'a', 999]
-    # ['part_2', 2, 'b', 777]
-    # ['part_2', 2, 'c', 123]
+    Main attributes:
+        self.quality (INT) : Quality of the lossy compression (0 to 100), 
+            used for the images that don't have their own settings.
+        self.method (INT) : Compression effort (0 = fastest, 6 = smallest).
     '''
     
-    pre = pre[:] if pre else []
-    if isinstance(in_dict, dict):
-        for key, value in in_dict.items():
-            if isinstance(value, dict):
-                for d in dict_walker(value, pre + [key]):
-                    yield d
-            elif isinstance(value, list) or isinstance(value, tuple):
-                for i,v in enumerate(value):
-                    for d in dict_walker(v, pre + [key,i]):
-                        yield d
-            else:
-                yield pre + [key, value]
-    else:
-        yield pre + [in_dict]
+    encoder_name = 'pillow'
+    
+    def __init__(self, quality=75, method=4):
+        if PIL_Image is None:
+            raise ImportError('The "pillow" encoder needs the `Pillow` library, which is not installed.')
+        self.quality = quality
+        self.method = method
+    
+    def get_settings_key(self, webp_settings=None):
+        return f'pillow:q{self.quality}:m{self.method}' + get_webp_settings_suffix(webp_settings)
+    
+    def create_webp_copy(self, img_path=None, webp_img_path=None, webp_settings=None):
+        try:
+            with PIL_Image.open(img_path) as this_img:
+                # WEBP files are either RGB or RGBA, so palettes, grayscale 
+                # and CMYK images are converted first
+                if this_img.mode not in ('RGB','RGBA'):
+                    this_img_has_alpha = ('A' in this_img.getbands()) or ('transparency' in this_img.info)
+                    this_img = this_img.convert('RGBA' if this_img_has_alpha else 'RGB')
+                save_options = {'quality':self.quality, 'method':self.method}
+                if webp_settings is not None:
+                    if 'width' in webp_settings:
+                        this_img = this_img.resize((webp_settings['width'], webp_settings['height']), PIL_Image.LANCZOS)
+                    if 'lossless' in webp_settings:
+                        # For lossless images, the "quality" is how hard 
+                        # libwebp tries to make the file smaller
+                        save_options['lossless'] = webp_settings['lossless']
+                        save_options['quality'] = webp_settings['quality']
+                this_img.save(webp_img_path, 'WEBP', **save_options)
+        except (OSError, ValueError, SyntaxError) as this_error:
+            print(f'Pillow could not convert {img_path}: {this_error}')
+            # Not leaving a half-written file behind
+            if os.path.isfile(webp_img_path):
+                os.remove(webp_img_path)
+            return 1
+        return 0
 
+# Encoders that can be picked by name (see `get_webp_encoder`)
+webp_encoders = {'ffmpeg':ffmpeg_webp_encoder, 'pillow':pillow_webp_encoder}
 
-def get_nested_dict_recursive(in_dict, dict_address):
+def get_webp_encoder(encoder_name='ffmpeg', ffmpeg_location=None):
     '''
-    Function that allows you to access a specific "address" inside an 
-    arbitrarily-complex dictionary.
+    Creates the encoder used to create the ".webp" copies of the images.
     
     INPUTS:
     -------
-    in_dict (DICT) : Dictionary to be read.
-    dict_address (LIST) : Address of the object being requested.
+    encoder_name (STR) : Name of the encoder (see `webp_encoders`). 
+        Ex: "ffmpeg" or "pillow".
+    ffmpeg_location (STR or None) : Location of the FFMPEG executable. This
+        input is only used by the "ffmpeg" encoder.
     
     RETURNS:
     --------
-    output (any) : The output of this function is the actual item at the 
-        "address" inside the input dictionary. 
-
-        
+    encoder (webp_encoder) : The encoder.
+    
     EXAMPLE:
     --------
     # Input:
-    my_dict = {'part_1':[5,6,7],
-               'part_2':[3,6,{'a':999,
-                              'b':777,
-                              'c':123}]}
-    
-    address_1 = ['part_1', 2]
-    address_2 = ['part_2', 2]
-    
-    print(get_nested_dict_recursive(in_dict=my_dict, dict_address=address_1))
-    print(get_nested_dict_recursive(in_dict=my_dict, dict_address=address_2))
+    print(get_webp_encoder('pillow').encoder_name)
     
     # Output:
-    # 7
-    # {'a': 999, 'b': 777, 'c': 123}
+    # 'pillow'
     '''
-    if len(dict_address) == 1:
-        return in_dict[dict_address[0]]
-    else:
-        return get_nested_dict_recursive(in_dict[dict_address[0]], dict_address[1:])
+    if encoder_name not in webp_encoders:
+        raise ValueError(f'Unknown encoder: {encoder_name}. Please use one of these: {", ".join(webp_encoders)}.')
+    if encoder_name == 'ffmpeg':
+        return ffmpeg_webp_encoder(ffmpeg_location)
+    return webp_encoders[encoder_name]()
 
-def edit_nested_dict_recursive(in_dict, dict_address, new_value):
+class lazy_attribute:
     '''
-    Function that allows you to edit a specific "address" inside an 
-    arbitrarily-complex dictionary and assign a new value/object to it.
-    
-    INPUTS:
-    -------
-    in_dict (DICT) : Dictionary to be read.
-    dict_address (LIST) : Address of the object that will receive `new_value`.
-    new_value (any) : New value to be stored in the input dictionary's "address".
+    Descriptor used to define attributes that are only calculated the first 
+    time they are read. The calculated value is stored in the object's 
+    `lazy_values` dictionary (created when the first value is stored, which
+    saves memory), so it is never calculated twice. Deleting the entry from
+    `lazy_values` forces the value to be calculated again the next time it 
+    is read. Assigning a value to the attribute simply stores it.
     
-    RETURNS:
-    --------
-    None
-        
     EXAMPLE:
     --------
     # Input:
-    my_dict = {'part_1':[5,6,7],
-               'part_2':[3,6,{'a':999,
-                              'b':777,
-                              'c':123}]}
-    
-    my_address = ['part_1', 2]
-    my_new_value = 'DOG'
-    
-    edit_nested_dict_recursive(my_dict, my_address, my_new_value)
+    class my_class:
+        def __init__(self):
+            self.lazy_values = None
+        
+        @lazy_attribute
+        def my_attribute(self):
+            print('Calculating...')
+            return 42
     
-    print(my_dict)
+    my_obj = my_class()
+    print(my_obj.my_attribute)
+    print(my_obj.my_attribute)
     
     # Output:
-    # {'part_1': [5, 6, 'DOG'], 
-    #  'part_2': [3, 6, {'a': 999, 
-    #                    'b': 777, 
-    #                    'c': 123}]}
+    # Calculating...
+    # 42
+    # 42
     '''
-    if len(dict_address) == 1:
-        in_dict[dict_address[0]] = new_value
-    else:
-        edit_nested_dict_recursive(in_dict[dict_address[0]], dict_address[1:],new_value)
+    
+    def __init__(self, compute_function):
+        self.compute_function = compute_function
+        self.name = compute_function.__name__
+        self.__doc__ = compute_function.__doc__
+    
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        lazy_values = instance.lazy_values
+        if lazy_values is None:
+            lazy_values = instance.lazy_values = {}
+        if self.name not in lazy_values:
+            lazy_values[self.name] = self.compute_function(instance)
+        return lazy_values[self.name]
+    
+    def __set__(self, instance, value):
+        if instance.lazy_values is None:
+            instance.lazy_values = {}
+        instance.lazy_values[self.name] = value
 
 class img_ref:
     '''
@@ -178,6 +2913,15 @@ class img_ref:
     the image's filetype/extension (JPG, PNG, WEBP), and an attribute that helps 
     determine whether the image was actually encoded using its filename's 
     extension's protocols. 
+    Most of the attributes below are only calculated the first time they are
+    read (see the `lazy_attribute` class), so creating an `img_ref` is cheap. 
+    When the reference is pointed to another image (see `set_editable_attributes`),
+    the attributes that depend on the image are calculated again.
+    Worlds can have hundreds of thousands of references, so `img_ref` objects 
+    are kept as small as possible: they use `__slots__` instead of a `__dict__`,
+    the image paths are interned, the "addresses" are tuples shared by all the
+    references that have the same address, and the world and core folders are
+    read from the `world_refs` object instead of being copied into each reference.
     
     Main attributes:
         Attributes that never change:
@@ -198,8 +2942,11 @@ class img_ref:
             the reference was found in a ".json" file, this attribute is instead 
             set to None.
             NOTE: As with everything else in Python, this line number is zero-indexed.
-        self.json_address (LIST) : Full "address" of the reference inside the "db" 
+        self.json_address (TUPLE) : Full "address" of the reference inside the "db" 
             or "json" file.
+        self.ref_number (INT) : Position of this reference in the `world_refs` 
+            object's `all_img_refs` list. This is a compact alternative to the 
+            `ref_id` string.
         self.world_references_owner_obj (world_refs) : Object that "owns"
             this reference. This is a collection of `img_ref`s.
         self.img_ref_content_is_html (BOOL) : Indicates whether this reference is 
@@ -238,12 +2985,15 @@ class img_ref:
             the web.
         self.trash_folder_location (STR) : Indicates the folder location of where
             this file needs to go if it needs to be moved to the trash
+        self.webp_settings (DICT or None) : Settings used for the ".webp" copy 
+            of this image (see `choose_webp_settings`). They only depend on 
+            the image itself, so the same image always gets the same settings.
 
     '''
     
     def __init__(self, ref_file_type=None, ref_file_path=None, ref_file_line=None, 
                  full_json_address=None, img_path_for_ref=None,
-                 world_refs_obj=None):
+                 world_refs_obj=None, img_ref_content_is_html=None):
         '''
         Function used to instantiate new objects from the `img_ref` class.
         
@@ -271,8 +3021,11 @@ class img_ref:
             (defined below). The `world_refs_obj` attribute points to the `world_refs`
             object to which this `img_ref` belongs, and inside of which all other 
             image references can be found.
-        ref_id (STR) : Unique string that can be used to identify each individual
-            `img_ref` object
+        img_ref_content_is_html (BOOL or None) : Indicates whether the content of
+            the reference is an HTML chunk. When the caller already parsed the 
+            content, passing this flag avoids parsing it a second time. When 
+            this input is left blank (equal to "None"), the content is parsed 
+            here.
         
         RETURNS:
         --------
@@ -293,32 +3046,198 @@ class img_ref:
         '''
         
         # Setting attributes that will never be updated
-        self.world_folder = world_refs_obj.world_folder 
-        self.core_data_folder = world_refs_obj.core_data_folder 
-        self.ref_file_path = ref_file_path
-        self.ref_file_type = ref_file_type
+        self.ref_file_path = sys.intern(ref_file_path)
+        self.ref_file_type = sys.intern(ref_file_type)
         self.ref_file_line = ref_file_line
-        self.json_address  = full_json_address[:-1] 
         self.world_references_owner_obj = world_refs_obj
+        self.ref_number = len(world_refs_obj.all_img_refs)
         
-        # Setting the unique ID for this `ref_img`
+        # Many references share the same address (ex: ('img',)), so only one
+        # copy of each address is kept in memory.
+        json_address = tuple(full_json_address[:-1])
+        self.json_address = world_refs_obj.json_address_pool.setdefault(json_address, json_address)
+        
+        # Cache of the attributes that are only calculated when needed
+        self.lazy_values = None
+        
+        # Checking if the content of the reference is an HTML chunk. The scan
+        # already knows the answer, so the content is only parsed here when 
+        # the `img_ref` is created by hand.
+        if img_ref_content_is_html is None:
+            img_ref_content_is_html = parse_img_ref_content(full_json_address[-1], world_refs_obj.strict_html)[0]
+        self.img_ref_content_is_html = img_ref_content_is_html
+        
+        # Setting the attributes that might be edited later.
+        self.img_path_for_ref = None
+        self.set_editable_attributes(img_path_for_ref)
+    
+    # Only these attributes are stored in each object (no `__dict__`)
+    __slots__ = ('ref_file_path', 'ref_file_type', 'ref_file_line', 'json_address',
+                 'world_references_owner_obj', 'ref_number', 'img_ref_content_is_html',
+                 'img_path_for_ref', 'ref_img_in_world_folder', 'lazy_values')
+    
+    # Attributes that don't depend on the image being referenced, and which 
+    # therefore survive a call to `set_editable_attributes`
+    attributes_kept_when_repointed = ('ref_id',)
+    
+    @property
+    def world_folder(self):
+        '''
+        Folder path of the current world
+        '''
+        return self.world_references_owner_obj.world_folder
+    
+    @property
+    def core_data_folder(self):
+        '''
+        Folder path of the Foundry installation
+        '''
+        return self.world_references_owner_obj.core_data_folder
+    
+    @lazy_attribute
+    def ref_id(self):
+        '''
+        Unique string that can be used to identify each individual `img_ref` object
+        '''
         string_to_hash = (self.world_folder + self.core_data_folder + self.ref_file_path +
-                          self.ref_file_type + str(self.ref_file_line) + str(self.json_address)
+                          self.ref_file_type + str(self.ref_file_line) + str(list(self.json_address))
                           + 'img_ref')
         
-        self.ref_id = hashlib.sha256(string_to_hash.encode()).hexdigest()
+        return hashlib.sha256(string_to_hash.encode()).hexdigest()
+    
+    def find_img_on_disk(self):
+        '''
+        Looks for the image being referenced, first relative to the user data 
+        folder and then inside the Foundry Core folder.
+        
+        INPUTS:
+        -------
+        None
+        
+        RETURNS:
+        --------
+        img_path_on_disk (STR) : File path of the image on disk, or an error 
+            value if the image does not exist.
+        img_exists (BOOL) : Indicates whether or not the image exists on disk.
+        '''
+        if self.world_references_owner_obj.file_exists(self.img_path_for_ref):
+            return self.img_path_for_ref, True
+        elif self.world_references_owner_obj.core_data_index.isfile(self.img_path_for_ref):
+            return os.path.join(self.core_data_folder,self.img_path_for_ref).replace('\\','/'), True
+        else:
+            return 'ERROR!!! IMG REFERENCE NOT ON DISK!!!', False
+    
+    @lazy_attribute
+    def img_path_on_disk(self):
+        '''
+        File path on disk to which this reference points.
+        '''
+        return self.find_img_on_disk()[0]
+    
+    @lazy_attribute
+    def img_exists(self):
+        '''
+        Indicates whether or not this file actually exists on disk
+        '''
+        return self.find_img_on_disk()[1]
+    
+    @lazy_attribute
+    def img_encoding(self):
+        '''
+        Type of encoding used for the image. Expected values can be "png", 
+        "jpeg" or "webp".
+        '''
+        if not self.img_exists:
+            return None
+        
+        img_encoding_imghdr = imghdr.what(self.img_path_on_disk)
         
-        # Looks into the actual content of the reference. Sometimes it is just
-        # a string with the filepath to the image. Other times it is a chunk of 
-        # HTML that links to an embedded image. In any case, this content needs 
-        # to be investigated to generate a bunch of the `img_ref`'s attributes.
-        img_ref_content = full_json_address[-1]
+        img_encoding_mime_temp = mimetypes.guess_type(self.img_path_on_disk)[0]
+        img_encoding_mime      = img_encoding_mime_temp.split('/')[1].lower() if img_encoding_mime_temp != None else None
         
-        # Checking if the content of the reference is an HTML chunk.
-        self.img_ref_content_is_html = True if BeautifulSoup(img_ref_content, 'html.parser').find() else False
+        if img_encoding_imghdr:
+            return img_encoding_imghdr.lower()
+        elif img_encoding_mime:
+            return img_encoding_mime.lower()
+        else:
+            return None
+    
+    @lazy_attribute
+    def correct_extension(self):
+        '''
+        Indicates whether or not the encoding actually matches the file extension.
+        '''
+        if not self.img_encoding:
+            return None
         
-        # Setting the attributes that might be edited later.
-        self.set_editable_attributes(img_path_for_ref)
+        img_extension = pathlib.Path(self.img_path_on_disk).suffix[1:].lower()
+        if self.img_encoding == 'jpeg':
+            return img_extension == 'jpeg' or img_extension == 'jpg'
+        else:
+            return img_extension == self.img_encoding
+    
+    @lazy_attribute
+    def img_hash(self):
+        '''
+        Hash of the image file on disk. Used for de-duplication.
+        '''
+        if self.img_exists and self.ref_img_in_world_folder:
+            return self.world_references_owner_obj.get_img_hash(self.img_path_on_disk)
+        return None
+    
+    @lazy_attribute
+    def is_webp(self):
+        '''
+        Indicates whether or not the file extension is ".webp"
+        '''
+        return pathlib.Path(self.img_path_for_ref).suffix.lower() == '.webp'
+    
+    @lazy_attribute
+    def webp_img_path_for_ref(self):
+        '''
+        File path for the ".webp" version of this image (regardless of whether 
+        or not the ".webp" version exists).
+        '''
+        return (os.path.join(pathlib.Path(self.img_path_for_ref).parent,pathlib.Path(self.img_path_for_ref).stem) + '.webp').replace('\\','/')
+    
+    @lazy_attribute
+    def webp_copy_exists(self):
+        '''
+        Indicates whether or not the ".webp" version of this image exists on disk
+        '''
+        return None if self.is_webp else self.world_references_owner_obj.file_exists(self.webp_img_path_for_ref)
+    
+    @lazy_attribute
+    def img_ref_external_web_link(self):
+        '''
+        Indicates whether or not this image reference is actually a hyperlink 
+        to an external file on the web.
+        '''
+        return True if (self.img_path_for_ref.find('http:') >= 0 or self.img_path_for_ref.find('https:') >= 0) else False
+    
+    @lazy_attribute
+    def trash_folder_location(self):
+        '''
+        Indicates the folder location of where this file needs to go if it 
+        needs to be moved to the trash
+        '''
+        if self.world_references_owner_obj.file_exists(self.img_path_for_ref) and self.ref_img_in_world_folder:
+            trash_folder_location = re.split('\\\\|/',self.img_path_on_disk)
+            trash_folder_location.insert(2,'_trash')
+            return str(os.path.join(*trash_folder_location).replace('\\','/'))
+        else:
+            return 'ERROR!!! IMG REFERENCE NOT ON DISK!!!'
+    
+    @lazy_attribute
+    def webp_settings(self):
+        '''
+        Settings used for the ".webp" copy of this image (lossless or lossy, 
+        and the quality). Equals None when the encoder's default settings are 
+        used instead.
+        '''
+        if not (self.img_exists and self.world_references_owner_obj.auto_webp_settings):
+            return None
+        return choose_webp_settings(get_img_stats(self.img_path_on_disk))
     
     def get_img_ref_content(self):
         '''
@@ -362,6 +3281,12 @@ class img_ref:
         This is where several of the `img_ref`'s helper attributes get initially 
         set, such as the attribute that determines whether the image was actually 
         encoded using its filename's extension's protocols.
+        Only the cheap attributes are set right away. All the attributes that 
+        depend on the image are forgotten here and are calculated again (see 
+        the `lazy_attribute` class) the next time they are read.
+        If the `img_ref` is already in the indexes of its `world_refs` object
+        (see `world_refs.add_ref_to_indexes`), it is moved to the entry of the
+        new image.
         
         INPUTS:
         -------
@@ -381,59 +3306,22 @@ class img_ref:
         
         '''
         
-        self.img_path_for_ref = img_path_for_ref
+        # Taking the reference out of the indexes of the image it used to point to
+        ref_was_indexed = self.world_references_owner_obj.remove_ref_from_indexes(self)
+        
+        self.img_path_for_ref = sys.intern(img_path_for_ref)
         
         self.ref_img_in_world_folder = True if img_path_for_ref[:len(self.world_folder)] == self.world_folder else False
         
-        if os.path.isfile(self.img_path_for_ref):
-            self.img_path_on_disk = self.img_path_for_ref
-            self.img_exists = True
-        elif os.path.isfile(os.path.join(self.core_data_folder,self.img_path_for_ref)):
-            self.img_path_on_disk = os.path.join(self.core_data_folder,self.img_path_for_ref).replace('\\','/')
-            self.img_exists = True
-        else:
-            self.img_path_on_disk = 'ERROR!!! IMG REFERENCE NOT ON DISK!!!'
-            self.img_exists = False
-            self.img_encoding = None
+        # Forgetting everything that was calculated for the previous image
+        if self.lazy_values:
+            self.lazy_values = {this_name:self.lazy_values[this_name] 
+                                for this_name in self.attributes_kept_when_repointed 
+                                if this_name in self.lazy_values} or None
         
-        if self.img_exists:
-            img_encoding_imghdr = imghdr.what(self.img_path_on_disk)
-            
-            img_encoding_mime_temp = mimetypes.guess_type(self.img_path_on_disk)[0]
-            img_encoding_mime      = img_encoding_mime_temp.split('/')[1].lower() if img_encoding_mime_temp != None else None
-            
-            if img_encoding_imghdr:
-                self.img_encoding = img_encoding_imghdr
-            elif img_encoding_mime:
-                self.img_encoding = img_encoding_mime
-            else:
-                self.img_encoding = None
-            
-        if self.img_encoding:
-            
-            self.img_encoding = self.img_encoding.lower()
-            if self.img_encoding == 'jpeg':
-                if pathlib.Path(self.img_path_on_disk).suffix[1:].lower() == 'jpeg' or pathlib.Path(self.img_path_on_disk).suffix[1:].lower() == 'jpg':
-                    self.correct_extension = True
-                else:
-                    self.correct_extension = False
-            else:
-                self.correct_extension = pathlib.Path(self.img_path_on_disk).suffix[1:].lower() == self.img_encoding.lower()
-        else:
-            self.correct_extension = None
-        self.img_hash = hashlib.md5(open(self.img_path_on_disk,'rb').read()).hexdigest() if (self.img_exists and self.ref_img_in_world_folder) else None
-        self.is_webp = pathlib.Path(self.img_path_for_ref).suffix.lower() == '.webp'
-        self.webp_img_path_for_ref =  (os.path.join(pathlib.Path(self.img_path_for_ref).parent,pathlib.Path(self.img_path_for_ref).stem) + '.webp').replace('\\','/')
-        self.webp_copy_exists = None if self.is_webp else os.path.isfile(self.webp_img_path_for_ref)
-        self.img_ref_external_web_link = True if (self.img_path_for_ref.find('http:') >= 0 or self.img_path_for_ref.find('https:') >= 0) else False
-        
-        if os.path.isfile(self.img_path_for_ref) and self.ref_img_in_world_folder:
-            trash_folder_location = re.split('\\\\|/',self.img_path_on_disk)
-            trash_folder_location.insert(2,'_trash')
-            trash_folder_location = str(os.path.join(*trash_folder_location).replace('\\','/'))
-            self.trash_folder_location = trash_folder_location
-        else:
-            self.trash_folder_location = 'ERROR!!! IMG REFERENCE NOT ON DISK!!!'
+        # Adding the reference to the indexes of the new image
+        if ref_was_indexed:
+            self.world_references_owner_obj.add_ref_to_indexes(self)
         
     def print_ref(self):
         '''
@@ -470,14 +3358,15 @@ class img_ref:
         print_str = f'{self.img_path_for_ref} | '
         print_str = print_str + f'{self.img_encoding if self.img_encoding else "404 IMG NOT FOUND"} | '
         print_str = print_str + f'{self.ref_file_path} {self.ref_file_line if self.ref_file_type == "db" else "-1"} | '
-        print_str = print_str + f'{self.json_address} | '
+        print_str = print_str + f'{list(self.json_address)} | '
         print_str = print_str + f'{self.get_img_ref_content()[:255]} | '
         print(print_str)
         
     def create_webp_copy(self):
         '''
         Creates a compressed ".webp" copy of the image being referenced in the 
-        `img_ref` object. 
+        `img_ref` object, using the encoder picked by the `world_refs` object
+        (see `webp_encoder`). 
         
         INPUTS:
         -------
@@ -485,7 +3374,7 @@ class img_ref:
         
         RETURNS:
         --------
-        subprocess_output.returncode (INT) : Indicates whether or not the conversion
+        return_code (INT) : Indicates whether or not the conversion
             process terminated successfully. This value takes 0 if the conversion 
             was successful. All other values indicate some sort of problem.
             
@@ -494,50 +3383,12 @@ class img_ref:
         # Input:
         my_ref.create_webp_copy()
         
-        # Output:
-        # None
-        '''
-        # The actual string that needs to be sent to the command line
-        cmd_call_str = f'"{self.world_references_owner_obj.ffmpeg_location}" -y -i "{self.img_path_for_ref}" -c:v libwebp "{self.webp_img_path_for_ref}" -hide_banner -loglevel error'
-        
-        # Running terminal command (https://stackoverflow.com/a/48857230/8667016)
-        # The exit code here is 0 if the conversion succeeded. If it is anything
-        # else, it means the conversion process failed.
-        subprocess_output = subprocess.run(shlex.split(cmd_call_str))
-        
-        # Some files have the incorrect extention. For example, an image that 
-        # was compressed using a JPEG protocol but had a PNG extension.
-        # To fix this, I need to check if FFMPEG's conversion succeeds or not. 
-        # When FFMPEG fails to convert, I need to try converting it using another 
-        # protocol (jpeg or png - the opposite of what was used in the first call)
-        # Note: The section below is commented out because I created a method 
-        # that tries to fix the jpeg/png file extension beforehand. Therefore, 
-        # this part of the code should be unnecessary.
-        '''
-        if subprocess_output.returncode != 0:
-            # Check the extension/suffix of the current file and generates a 
-            # temporary copy of the file with the "opposite" extension
-            original_suffix = str(pathlib.Path(self.img_path_for_ref).suffix)
-            if original_suffix == '.jpg' or original_suffix == '.jpeg':
-                new_suffix = '.png'
-            else:
-                new_suffix = '.jpg'
-            temp_img_path = os.path.join(pathlib.Path(self.img_path_for_ref).parent,pathlib.Path(self.img_path_for_ref).stem).replace('\\','/') + new_suffix
-            shutil.copyfile(self.img_path_for_ref, temp_img_path)
-            
-            # Run the FFMPEG call using the new filename
-            new_cmd_call_str = f'"{self.ffmpeg_location}" -y -i "{temp_img_path}" -c:v libwebp "{self.webp_img_path_for_ref}"'
-            new_subprocess_output = subprocess.run(shlex.split(new_cmd_call_str))
-            
-            # Delete the temporary file created
-            os.remove(temp_img_path)
-            
-            # Checking if the new conversion process was successful
-            if new_subprocess_output.returncode == 0:
-                subprocess_output = new_subprocess_output
-        '''
-        return subprocess_output.returncode
-        
+        # Output:
+        # None
+        '''
+        return self.world_references_owner_obj.webp_encoder.create_webp_copy(self.img_path_for_ref, 
+                                                                            self.webp_img_path_for_ref,
+                                                                            self.webp_settings)
     
     def push_updated_content_to_world(self, updated_content):
         ''''
@@ -569,9 +3420,17 @@ class img_ref:
                                        self.json_address,
                                        updated_content)
         elif self.ref_file_type == 'db':
-            edit_nested_dict_recursive(self.world_references_owner_obj.db_files[self.ref_file_path][self.ref_file_line],
+            # The document is assigned back, since it might have been parsed 
+            # on demand (see `streamed_db_file`)
+            this_db_file = self.world_references_owner_obj.db_files[self.ref_file_path]
+            this_db_file_line_content = this_db_file[self.ref_file_line]
+            edit_nested_dict_recursive(this_db_file_line_content,
                                        self.json_address,
                                        updated_content)
+            this_db_file[self.ref_file_line] = this_db_file_line_content
+        
+        # Letting the `world_refs` object know that this file needs to be exported
+        self.world_references_owner_obj.mark_as_dirty(self.ref_file_path, self.ref_file_line)
 
 
 
@@ -598,23 +3457,121 @@ class world_refs:
         self.ffmpeg_location (STR) : String that describes the absolute path to 
             the ffmpeg executable. This attribute should typically look like this:
             "C:/Program Files (x86)/Audacity/libraries/ffmpeg.exe".
+        self.webp_encoder (webp_encoder) : Encoder used to create the ".webp" 
+            copies of the images (see `get_webp_encoder`).
+        self.webp_cache (webp_output_cache or None) : Cache of the ".webp" 
+            files created by the encoders, shared by all worlds. Equals None
+            when the cache is turned off.
+        self.auto_webp_settings (BOOL) : Indicates whether the settings of each
+            ".webp" copy are picked based on the image itself (see 
+            `img_ref.webp_settings`).
+        self.min_webp_savings (FLOAT) : Fraction of the size of an image that
+            its ".webp" copy needs to save for the image to be replaced.
+        self.target_ssim (FLOAT or None) : Lowest SSIM of the lossy ".webp" 
+            copies, when their quality is searched for (see 
+            `create_webp_copy_for_target_ssim`).
+        self.quality_cache (webp_quality_cache or None) : Cache of the 
+            qualities picked by the search on SSIM, shared by all worlds. 
+            Equals None when the quality is not searched.
+        self.conversion_report (DICT) : Sizes of each converted image and of 
+            its ".webp" copy, and which one was kept (see 
+            `convert_all_images_to_webp_and_update_refs`).
+        self.scene_background_sizes (DICT) : New size of each scene background
+            that gets downscaled (see `downscale_scene_backgrounds`).
+        self.jobs (INT) : Maximum number of images that get converted at the 
+            same time (i.e., the size of the conversion worker pool).
+        self.ffmpeg_batch_size (INT) : Maximum number of images converted by 
+            one single FFMPEG call.
+        self.strict_html (BOOL) : Indicates whether the HTML chunks inside the
+            world are parsed with BeautifulSoup instead of the `img_src_extractor`.
+        self.deep_scan (BOOL) : Indicates whether every field of every document
+            is searched for images, instead of only the fields that Foundry uses
+            for images.
         self.trash_folder (STR): String that describes the relative path to the 
             trash folder for this world. This path is relative to the path in the
             `user_data_folder` attribute. This attribute should typically look 
             like this: "worlds/porvenir/_trash", or "worlds/kobold-cauldron_trash".
         self.trash_queue (SET) : Set of filenames that need to be moved to the 
             trash folder.
+        self.cache_folder (STR) : String that describes the relative path to the
+            folder where the tool stores its caches for this world. This 
+            attribute should typically look like this: "worlds/porvenir/_jwm_cache".
+        self.hash_cache (img_hash_cache) : Cache of the MD5 hashes of the images
+            inside the world folder. This cache is shared by all `img_ref`s.
+        self.scan_cache (ref_scan_cache or None) : Cache of the references 
+            found in each DB and JSON file, so that unchanged files don't get
+            scanned again. Equals None when the cache is turned off.
+        self.file_index (world_file_index) : In-memory table of all the files
+            inside the world folder. All checks for files inside the world 
+            folder go through this table instead of the disk.
+        self.core_data_index (core_data_index) : Index of all the files inside
+            the Foundry Core Data folder. It is saved inside the tool's own 
+            `_jwm_cache` folder and reused for as long as the Foundry version 
+            stays the same.
         self.all_img_refs (LIST) : List of all the `img_ref` objects found in 
             the world's JSON and DB files.
         self.all_img_refs_by_id (DICT) : Dictionary of all `img_ref` objects 
-            indexed by `ref_id`
+            indexed by `ref_id`. This dictionary is only built the first time 
+            it is read.
+        self.refs_by_img (DICT) : Index of all the `img_ref` objects by the 
+            file path of the image they point to. The index is kept up to date
+            every time a reference is pointed to another image (see 
+            `add_ref_to_indexes`). Each image has a dictionary of its `img_ref`s
+            indexed by `ref_number`, so references can be removed in O(1).
+            Structure: {'img_1':{0:ref_i, 3:ref_ii}, 'img_2':{1:ref_iii}}
+        self.img_hash_by_path (DICT or None) : Hash of every image in 
+            `self.refs_by_img`. Hashing images is expensive, so this index is 
+            only built the first time it is needed (see 
+            `get_refs_indexed_by_hash_by_img`). Until then, it equals None.
+        self.img_paths_by_hash (DICT) : Image paths indexed by hash. This is the
+            other half of the `self.img_hash_by_path` index.
+        self.broken_img_paths (SET) : Images that are referenced in the world 
+            but that do not exist on disk (see `get_broken_refs`).
+        self.dirty_json_files (SET) : JSON files whose content was changed by 
+            an `img_ref` and that need to be exported.
+        self.dirty_db_lines (DICT) : Lines of the DB files whose content was 
+            changed by an `img_ref`, indexed by DB file. Ex:
+                {'worlds/porvenir/data/actors.db' : {0, 17, 256}}
+        self.append_db (BOOL) : Indicates whether the changed documents are 
+            appended to the end of the DB files on export, instead of the 
+            files being rewritten in full.
+        self.max_db_bloat (FLOAT) : Maximum number of outdated lines per live 
+            document that appending is allowed to leave in a DB file.
+        self.db_lines_appended (DICT) : Number of lines appended to each DB 
+            file since it was loaded.
+        self.compact_db (BOOL) : Indicates whether the DB files that have 
+            outdated lines should be rewritten on export, even when nothing 
+            else in them changed. A DB file that is rewritten in full for any
+            other reason loses its outdated lines either way.
+        self.stream_db (BOOL) : Indicates whether the documents of the DB files 
+            are read from disk when needed, instead of being kept in memory. 
+            In that case, each entry of `self.db_files` is a `streamed_db_file`
+            object instead of a list. The DB files whose references were taken
+            from the scan cache are always loaded this way.
+        self.parallel_scan (BOOL) : Indicates whether the DB files are loaded
+            and scanned by a pool of worker processes.
+        self.img_ref_records (DICT) : References found when the files were 
+            loaded (by the parallel scan or taken from the scan cache) that 
+            were not yet turned into `img_ref` objects, indexed by DB or JSON
+            file. Each reference is a tuple: (ref_file_line, json_address, 
+            img_path_for_ref, img_ref_content_is_html).
+        self.db_outdated_lines_on_disk (DICT) : Number of outdated lines that 
+            were left out when each DB file was loaded, and that are still on
+            disk.
+        self.db_files_to_rewrite (SET) : DB files that need to be rewritten in 
+            full on export, even if no `img_ref` changed them.
+        self.compaction_stats (DICT) : Number of outdated lines and bytes left 
+            out of the DB files when they were loaded. Ex:
+                {'files_compacted':3, 'lines_removed':1200, 'bytes_removed':5400000}
         self.json_files (DICT) : Dictionary that holds the contents of all the 
             JSON files inside the World folder. The structure of this dictionary
             is as follows: 
                 {'worlds/porvenir/world.json' : {json_dict_content},
                  'worlds/porvenir/descr.json' : {json_dict_content}}
         self.db_files (DICT) : Dictionary that holds the contents of all the 
-            DB files inside the World folder. The structure of this dictionary
+            DB files inside the World folder. Lines that don't mention any 
+            image are kept as raw text (STR) instead of being parsed (see 
+            `compact_db_file_lines`). The structure of this dictionary
             is as follows: 
                 {'worlds/porvenir/data/actors.db   : [{json_dict_content},
                                                       {json_dict_content},
@@ -628,7 +3585,11 @@ class world_refs:
         
     '''
     
-    def __init__(self,user_data_folder,world_folder,core_data_folder,ffmpeg_location):
+    def __init__(self,user_data_folder,world_folder,core_data_folder,ffmpeg_location,
+                 jobs=None, strict_html=False, deep_scan=False, append_db=False, 
+                 max_db_bloat=0.5, compact_db=False, stream_db=False, parallel_scan=False,
+                 scan_cache=True, ffmpeg_batch_size=16, encoder='ffmpeg', webp_cache_size=1024,
+                 min_webp_savings=0.0, auto_webp_settings=True, target_ssim=None):
         '''
         Function used to instantiate new objects from the `world_refs` class.
         
@@ -646,9 +3607,61 @@ class world_refs:
         core_data_folder (STR) : String that describes the absolute path to the 
             Foundry Core Data folder. This attribute should typically look like 
             this: "C:/Program Files/FoundryVTT/resources/app/public"
-        ffmpeg_location (STR) : String that describes the absolute path to 
+        ffmpeg_location (STR or None) : String that describes the absolute path to 
             the ffmpeg executable. This attribute should typically look like this:
-            "C:/Program Files (x86)/Audacity/libraries/ffmpeg.exe".
+            "C:/Program Files (x86)/Audacity/libraries/ffmpeg.exe". It can be 
+            left blank (equal to "None") when the "pillow" encoder is used.
+        jobs (INT or None) : Maximum number of images that get converted at the 
+            same time (and of ".db" files scanned at the same time, when 
+            `parallel_scan` is True). When this input is left blank (equal to 
+            "None"), the number of CPUs on the machine is used.
+        strict_html (BOOL) : Indicates whether the HTML chunks inside the world
+            should be parsed with BeautifulSoup instead of the faster (and 
+            equivalent) `img_src_extractor`.
+        deep_scan (BOOL) : Indicates whether every field of every document 
+            should be searched for images, instead of only the fields that 
+            Foundry uses for images (see `foundry_image_fields`).
+        append_db (BOOL) : Indicates whether the changed documents should be
+            appended to the end of the ".db" files instead of rewriting the 
+            whole files (see `append_changed_db_lines`).
+        max_db_bloat (FLOAT) : When appending to a ".db" file would leave it 
+            with more than this many outdated lines per live document, the 
+            file is rewritten in full instead. Ex: 0.5
+        compact_db (BOOL) : Indicates whether the ".db" files that have 
+            outdated lines should be rewritten, which removes those lines from
+            disk (see `load_db_and_json_files`). They are always ignored in 
+            memory, so a file that is rewritten in full for any other reason
+            loses them either way.
+        stream_db (BOOL) : Indicates whether the documents of the ".db" files 
+            should be read from disk when needed, instead of being kept in 
+            memory (see `streamed_db_file`).
+        parallel_scan (BOOL) : Indicates whether the ".db" files should be 
+            loaded and scanned by a pool of `jobs` worker processes, instead 
+            of one after the other.
+        scan_cache (BOOL) : Indicates whether the references found in each 
+            ".db" and ".json" file should be cached, so that only the files 
+            that changed since the last run get scanned (see `ref_scan_cache`).
+        ffmpeg_batch_size (INT) : Maximum number of images converted by one 
+            single FFMPEG call (see `create_webp_copies_in_batch`). When this
+            input equals 1, each image gets its own FFMPEG call.
+        encoder (STR) : Name of the encoder used to create the ".webp" copies
+            (see `webp_encoders`). The "pillow" encoder runs inside Python 
+            and does not need the `ffmpeg_location` input.
+        webp_cache_size (FLOAT) : Maximum size (in MB) of the cache of ".webp" 
+            files shared by all worlds (see `webp_output_cache`). When this 
+            input equals 0, the cache is not used.
+        min_webp_savings (FLOAT) : Fraction of the size of an image that its 
+            ".webp" copy needs to save for the image to be replaced. Ex: 0.1 
+            means that the ".webp" copy needs to be at least 10% smaller. 
+            When this input equals 0, any copy that is smaller is used.
+        auto_webp_settings (BOOL) : Indicates whether the settings of each 
+            ".webp" copy (lossless or lossy, and the quality) should be picked
+            based on the image itself (see `choose_webp_settings`), instead 
+            of using the encoder's default settings for every image.
+        target_ssim (FLOAT or None) : When this input is set, the quality of 
+            each lossy ".webp" copy is the lowest one that keeps the copy's 
+            SSIM above this value (see `create_webp_copy_for_target_ssim`). 
+            Ex: 0.98. When this input equals None, the quality is not searched.
 
         
         RETURNS:
@@ -670,7 +3683,7 @@ class world_refs:
         
         # Checking inputs
         checked_inputs = input_checker(user_data_folder,world_folder,
-                                       core_data_folder,ffmpeg_location,'n')
+                                       core_data_folder,ffmpeg_location,'n',encoder)
         
         user_data_folder = checked_inputs['user_data_folder']
         world_folder = checked_inputs['world_folder']
@@ -681,7 +3694,62 @@ class world_refs:
         self.user_data_folder = user_data_folder.replace('\\','/')
         self.world_folder     = world_folder.replace('\\','/')
         self.core_data_folder = core_data_folder.replace('\\','/')
-        self.ffmpeg_location  = ffmpeg_location.replace('\\','/')
+        self.ffmpeg_location  = ffmpeg_location.replace('\\','/') if ffmpeg_location else None
+        
+        # Encoder used to create the ".webp" copies of the images, and cache
+        # of the ".webp" files it created (shared by all worlds)
+        self.webp_encoder = get_webp_encoder(encoder, self.ffmpeg_location)
+        self.auto_webp_settings = auto_webp_settings
+        self.min_webp_savings = check_min_webp_savings(min_webp_savings)
+        self.target_ssim = check_target_ssim(target_ssim)
+        if self.target_ssim is not None:
+            self.quality_cache = webp_quality_cache(os.path.join(tool_cache_folder,'webp_quality_cache.json').replace('\\','/'))
+        else:
+            self.quality_cache = None
+        webp_cache_size = check_webp_cache_size(webp_cache_size)
+        if webp_cache_size > 0:
+            self.webp_cache = webp_output_cache(os.path.join(tool_cache_folder,'webp_cache').replace('\\','/'),
+                                                int(webp_cache_size*1024*1024))
+        else:
+            self.webp_cache = None
+        
+        # Size of the worker pool used in the image conversion process, and 
+        # number of images converted by each FFMPEG call
+        self.jobs = check_number_of_jobs(jobs)
+        self.ffmpeg_batch_size = check_ffmpeg_batch_size(ffmpeg_batch_size)
+        
+        # Parser used for the HTML chunks inside the world
+        if strict_html and BeautifulSoup is None:
+            raise ImportError('The "strict HTML" mode needs the `beautifulsoup4` library, which is not installed.')
+        self.strict_html = strict_html
+        
+        # Indicates whether the documents are walked in full or only through
+        # the fields that can hold images
+        self.deep_scan = deep_scan
+        self.image_field_trees = {}
+        
+        # How the ".db" files get exported
+        self.append_db = append_db
+        self.max_db_bloat = check_max_db_bloat(max_db_bloat)
+        self.db_lines_appended = {}
+        self.compact_db = compact_db
+        self.stream_db = stream_db
+        self.parallel_scan = parallel_scan
+        
+        # Indexing all of the files inside the world folder in one single pass
+        self.file_index = world_file_index(self.world_folder)
+        
+        # Loading (or building) the index of the Foundry Core Data folder
+        self.core_data_index = core_data_index(self.core_data_folder, tool_cache_folder)
+        
+        # Folder used by the tool to store its caches inside the world folder
+        self.cache_folder = str(os.path.join(self.world_folder,'_jwm_cache')).replace('\\','/')
+        
+        # Cache of the references found in each DB and JSON file
+        if scan_cache:
+            self.scan_cache = ref_scan_cache(os.path.join(self.cache_folder,'scan_cache.json').replace('\\','/'))
+        else:
+            self.scan_cache = None
         
         # Reading in the DB and JSON files inside the world
         self.load_db_and_json_files()
@@ -695,14 +3763,177 @@ class world_refs:
         # Set of images that need to be moved to the trash
         self.trash_queue = set()
         
+        # Files (and lines of ".db" files) that were changed since they were 
+        # loaded. Only these files get exported (see `mark_as_dirty`).
+        self.dirty_json_files = set()
+        self.dirty_db_lines = {}
+        
+        # Cache of the MD5 hashes of the images, shared by all `img_ref`s
+        self.hash_cache = img_hash_cache(os.path.join(self.cache_folder,'hash_cache.json').replace('\\','/'))
+        
         # Finds all the `img_ref` objects inthe world
         self.find_all_img_references_in_world()
+        
+        # Saving the hashes calculated during the scan
+        self.hash_cache.save(self.file_exists)
+        self.file_index.refresh(self.hash_cache.cache_file_path)
+    
+    @property
+    def all_img_refs_by_id(self):
+        '''
+        Dictionary of all `img_ref` objects indexed by `ref_id`. Calculating 
+        the `ref_id`s is not free, so this dictionary is only built the first 
+        time it is needed.
+        '''
+        if self.all_img_refs_by_id_cache is None:
+            self.all_img_refs_by_id_cache = {this_ref.ref_id:this_ref for this_ref in self.all_img_refs}
+        return self.all_img_refs_by_id_cache
+    
+    def mark_as_dirty(self, ref_file_path=None, ref_file_line=None):
+        '''
+        Records that the content of a JSON file, or of one line of a DB file, 
+        was changed and needs to be exported (see `export_all_json_and_db_files`).
+        
+        INPUTS:
+        -------
+        ref_file_path (STR) : Relative file path of the changed file. 
+            Ex: 'worlds/porvenir/data/actors.db'
+        ref_file_line (INT or None) : Line of the DB file that was changed. 
+            For JSON files, this input is None.
+        
+        RETURNS:
+        --------
+        None
+        '''
+        if ref_file_path in self.db_files:
+            self.dirty_db_lines.setdefault(ref_file_path, set()).add(ref_file_line)
+        else:
+            self.dirty_json_files.add(ref_file_path)
+    
+    def add_ref_to_indexes(self, ref_to_add=None):
+        '''
+        Adds one `img_ref` to the indexes of the `world_refs` object (by image,
+        by hash and by "brokenness"). This is called when the reference is 
+        found in the world and every time it is pointed to another image (see
+        `img_ref.set_editable_attributes`).
+        
+        INPUTS:
+        -------
+        ref_to_add (OBJECT) : `img_ref` object to be added to the indexes.
+        
+        RETURNS:
+        --------
+        None
+        '''
+        this_img_path = ref_to_add.img_path_for_ref
+        
+        # The indexes by hash and by "brokenness" are kept by image, so they 
+        # only need to be updated when an image gets its first reference.
+        if this_img_path not in self.refs_by_img:
+            self.refs_by_img[this_img_path] = {}
+            
+            if ((ref_to_add.img_path_on_disk == 'ERROR!!! IMG REFERENCE NOT ON DISK!!!') 
+                and (not ref_to_add.img_ref_external_web_link)):
+                self.broken_img_paths.add(this_img_path)
+            
+            # The image is only hashed the next time the hash index is read
+            if self.img_hash_by_path is not None:
+                self.img_paths_to_hash.add(this_img_path)
+        
+        self.refs_by_img[this_img_path][ref_to_add.ref_number] = ref_to_add
+    
+    def remove_ref_from_indexes(self, ref_to_remove=None):
+        '''
+        Removes one `img_ref` from the indexes of the `world_refs` object. 
+        References that are not in the indexes (ex: an `img_ref` that was 
+        created by hand) are left alone.
+        
+        INPUTS:
+        -------
+        ref_to_remove (OBJECT) : `img_ref` object to be removed from the indexes.
+        
+        RETURNS:
+        --------
+        ref_was_indexed (BOOL) : Indicates whether or not the reference was in
+            the indexes.
+        '''
+        this_img_path = ref_to_remove.img_path_for_ref
+        this_img_refs = self.refs_by_img.get(this_img_path)
+        if (this_img_refs is None) or (this_img_refs.get(ref_to_remove.ref_number) is not ref_to_remove):
+            return False
+        
+        del this_img_refs[ref_to_remove.ref_number]
+        
+        # Images without references are dropped from all of the indexes
+        if not this_img_refs:
+            del self.refs_by_img[this_img_path]
+            self.broken_img_paths.discard(this_img_path)
+            self.img_paths_to_hash.discard(this_img_path)
+            if (self.img_hash_by_path is not None) and (this_img_path in self.img_hash_by_path):
+                this_hash = self.img_hash_by_path.pop(this_img_path)
+                del self.img_paths_by_hash[this_hash][this_img_path]
+                if not self.img_paths_by_hash[this_hash]:
+                    del self.img_paths_by_hash[this_hash]
+        return True
+    
+    def file_exists(self, file_path=None):
+        '''
+        Checks whether or not a file exists. Files inside the world folder are 
+        looked up in the `self.file_index` table. Any other file is checked on
+        disk.
+        
+        INPUTS:
+        -------
+        file_path (STR) : File path to be checked. Ex: "worlds/porvenir/art/wood-bg.jpg"
+        
+        RETURNS:
+        --------
+        file_exists (BOOL) : Indicates whether or not the file exists.
+        '''
+        if self.file_index.is_inside(file_path):
+            return self.file_index.isfile(file_path)
+        return os.path.isfile(file_path)
+    
+    def get_img_hash(self, img_path=None):
+        '''
+        Returns the MD5 hash of an image file through the shared hash cache, 
+        using the file index to tell whether the file changed.
+        
+        INPUTS:
+        -------
+        img_path (STR) : File path of the image. Ex: "worlds/porvenir/art/wood-bg.jpg"
+        
+        RETURNS:
+        --------
+        img_hash (STR) : MD5 hash of the image file.
+        '''
+        return self.hash_cache.get_hash(img_path, self.file_index.get_signature(img_path))
     
     def load_db_and_json_files(self):
         '''
         Function that scans the world folder and loads in the contents of the 
         DB and JSON files. This function defines two important attributes from the
         `world_refs` object: self.json_files and self.db_files.
+        Only the live version of each document in the DB files is kept (see 
+        `compact_db_file_lines`), so outdated copies of documents and deleted
+        documents are never scanned. When `self.compact_db` is True, the DB 
+        files that had outdated lines are also rewritten on export, which 
+        removes those lines from disk. When it is False, these files are only
+        rewritten if their images changed and the changes can't be appended 
+        (see `export_all_json_and_db_files`), and then only the live lines 
+        are written back.
+        When `self.stream_db` is True, only the position of each line is kept
+        in memory (see `streamed_db_file`).
+        When `self.parallel_scan` is True, the DB files are loaded and scanned
+        for references by a pool of worker processes (see 
+        `load_and_scan_db_file`). The references they find are kept in 
+        `self.img_ref_records` until `find_all_img_references_in_world` 
+        turns them into `img_ref` objects.
+        When the scan cache is on (see `ref_scan_cache`), the references of 
+        the files that did not change since the last run are taken from the 
+        cache instead. Those DB files are still loaded (as a list or as a
+        `streamed_db_file`, depending on `self.stream_db`), but they are not
+        scanned again.
         
         Attributes set by this function:
             self.json_files (DICT) : Dictionary that holds the contents of all the 
@@ -734,43 +3965,109 @@ class world_refs:
         '''
         world_folder = self.world_folder
         
-        list_of_db_files   = [str(this_path).replace('\\','/') for this_path in pathlib.Path(world_folder).rglob('*.db')]
-        list_of_json_files = [str(this_path).replace('\\','/') for this_path in pathlib.Path(world_folder).rglob('*.json')]
+        # The tool's own cache files are not part of the world
+        cache_folder = os.path.join(world_folder,'_jwm_cache')
         
-        
-        self.db_files = {}
-        for this_db_file  in list_of_db_files:
-            
-            # Need to avoid the `settings.db` file
-            if this_db_file != str(pathlib.Path(os.path.join(world_folder,'data/settings.db'))).replace('\\','/'):
-                pass
-                this_db_file_lines = []
-                # Reading the DB file
-                with open(this_db_file,'r',encoding="utf-8") as fp:
-            
-                    # Initializing process to scan all lines in DB file
-                    line_count = 0
-                    line = fp.readline()
-                    
-                    # Scanning all lines in DB file
-                    while line:
-                        
-                        # Transforming JSON-like string into a python dict
-                        #line_dict = json.loads(line)
-                        this_db_file_lines.append(json.loads(line))
-                        
-                        # Preparing for next row
-                        line_count += 1
-                        line = fp.readline()
-                
-                # Adding this DB file's list of dictionaries into the main object
-                self.db_files[this_db_file] = this_db_file_lines
+        list_of_db_files   = self.file_index.find_files(('.db',), excluded_folders=(cache_folder,))
+        list_of_json_files = self.file_index.find_files(('.json',), excluded_folders=(cache_folder,))
         
         
+        # The JSON files are read first, since the "world.json" file tells 
+        # which type of document is stored in each compendium pack
         self.json_files = {}
         for this_json_file in list_of_json_files:
             with open(this_json_file,'r',encoding="utf-8") as fp:
-                self.json_files[this_json_file] = json.load(fp)
+                self.json_files[this_json_file] = json_loads(fp.read())
+        
+        self.img_ref_records = {}
+        scan_keys = {}
+        if self.scan_cache is not None:
+            for this_json_file in list_of_json_files:
+                this_field_tree = self.get_image_field_tree(this_json_file)
+                scan_keys[this_json_file] = self.scan_cache.get_scan_key(this_field_tree, self.strict_html)
+                this_file_signature = self.file_index.get_signature(this_json_file)
+                img_ref_records = self.scan_cache.get_records(this_json_file, this_file_signature, 
+                                                              scan_keys[this_json_file])
+                if img_ref_records is None:
+                    img_ref_records = [(None, tuple(this_json_address), this_img_ref, this_is_html)
+                                       for this_json_address, this_img_ref, this_is_html 
+                                       in find_img_refs_in_dict(self.json_files[this_json_file], 
+                                                                this_field_tree, self.strict_html)]
+                    self.scan_cache.set_records(this_json_file, this_file_signature, 
+                                                scan_keys[this_json_file], img_ref_records)
+                self.img_ref_records[this_json_file] = img_ref_records
+        
+        # Need to avoid the `settings.db` file
+        settings_db_file = str(pathlib.Path(os.path.join(world_folder,'data/settings.db'))).replace('\\','/')
+        list_of_db_files = [this_db_file for this_db_file in list_of_db_files if this_db_file != settings_db_file]
+        
+        # The DB files that did not change since the last run don't need to 
+        # be parsed, since their references are already known
+        loaded_db_files = {}
+        if self.scan_cache is not None:
+            for this_db_file in list_of_db_files:
+                scan_keys[this_db_file] = self.scan_cache.get_scan_key(self.get_image_field_tree(this_db_file), 
+                                                                       self.strict_html)
+                img_ref_records = self.scan_cache.get_records(this_db_file, 
+                                                              self.file_index.get_signature(this_db_file), 
+                                                              scan_keys[this_db_file])
+                if img_ref_records is not None:
+                    loaded_db_files[this_db_file] = load_db_file(this_db_file, self.stream_db) + (img_ref_records,)
+        db_files_to_scan = [this_db_file for this_db_file in list_of_db_files if this_db_file not in loaded_db_files]
+        
+        if self.parallel_scan and len(db_files_to_scan) > 1:
+            # Each worker process loads and scans whole DB files. The `img_ref`s
+            # are only created afterwards (see `find_all_img_references_in_world`).
+            with concurrent.futures.ProcessPoolExecutor(max_workers=min(self.jobs, len(db_files_to_scan))) as executor:
+                loaded_db_files.update(zip(db_files_to_scan,
+                                           executor.map(load_and_scan_db_file, 
+                                                        db_files_to_scan,
+                                                        [self.get_image_field_tree(this_db_file) for this_db_file in db_files_to_scan],
+                                                        [self.strict_html] * len(db_files_to_scan),
+                                                        [self.stream_db] * len(db_files_to_scan),
+                                                        [json_backend] * len(db_files_to_scan))))
+        elif self.scan_cache is not None:
+            # The references are needed right away, so they can be cached
+            for this_db_file in db_files_to_scan:
+                loaded_db_files[this_db_file] = load_and_scan_db_file(this_db_file, 
+                                                                      self.get_image_field_tree(this_db_file),
+                                                                      self.strict_html, self.stream_db)
+        else:
+            for this_db_file in db_files_to_scan:
+                loaded_db_files[this_db_file] = load_db_file(this_db_file, self.stream_db) + (None,)
+        
+        if self.scan_cache is not None:
+            for this_db_file in db_files_to_scan:
+                self.scan_cache.set_records(this_db_file, self.file_index.get_signature(this_db_file), 
+                                            scan_keys[this_db_file], loaded_db_files[this_db_file][3])
+        
+        self.db_files = {}
+        self.db_outdated_lines_on_disk = {}
+        self.db_files_to_rewrite = set()
+        self.compaction_stats = {'files_compacted':0, 'lines_removed':0, 'bytes_removed':0}
+        for this_db_file in list_of_db_files:
+            this_db_file_lines, lines_removed, bytes_removed, img_ref_records = loaded_db_files[this_db_file]
+            if lines_removed:
+                self.db_outdated_lines_on_disk[this_db_file] = lines_removed
+                self.compaction_stats['files_compacted'] += 1
+                self.compaction_stats['lines_removed'] += lines_removed
+                self.compaction_stats['bytes_removed'] += bytes_removed
+                if self.compact_db:
+                    self.db_files_to_rewrite.add(this_db_file)
+            
+            # Adding this DB file's list of dictionaries into the main object
+            self.db_files[this_db_file] = this_db_file_lines
+            if img_ref_records is not None:
+                self.img_ref_records[this_db_file] = img_ref_records
+        
+        if self.scan_cache is not None:
+            self.scan_cache.save(self.file_exists)
+            self.file_index.refresh(self.scan_cache.cache_file_path)
+        
+        if self.compaction_stats['lines_removed']:
+            print(f'Left out {self.compaction_stats["lines_removed"]} outdated or deleted lines '
+                  f'({self.compaction_stats["bytes_removed"]} bytes) from {self.compaction_stats["files_compacted"]} ".db" files'
+                  + (', which will be removed from disk on export.' if self.compact_db else '.'))
     
     
     def find_all_img_references_in_world(self, return_result=False):
@@ -798,28 +4095,137 @@ class world_refs:
         # List of ALL images referenced in world
         self.all_img_refs = []
         
-        self.all_img_refs_by_id = {}
+        # Pool of the "addresses" shared by the `img_ref`s (see `img_ref.__init__`)
+        self.json_address_pool = {}
+        
+        # The index by `ref_id` is only built when it is first needed
+        self.all_img_refs_by_id_cache = None
+        
+        # Indexes of the references by image, by hash and by "brokenness"
+        self.refs_by_img = {}
+        self.img_hash_by_path = None
+        self.img_paths_by_hash = {}
+        self.img_paths_to_hash = set()
+        self.broken_img_paths = set()
         
         # Scanning all JSON files for references to images
         for this_json_file in self.json_files:
+            
+            # The references found when the files were loaded only need to be
+            # turned into `img_ref`s. They are used only once, since the 
+            # files might change afterwards.
+            if this_json_file in self.img_ref_records:
+                for this_json_file_line, this_json_address, this_img_ref, this_is_html in self.img_ref_records.pop(this_json_file):
+                    self.add_img_ref('json', this_json_file, this_json_file_line, this_json_address,
+                                     this_img_ref, this_is_html)
+                continue
+            
             this_json_file_content = self.json_files[this_json_file]
             self.traverse_dict_and_find_all_refs(dict_content=this_json_file_content, 
                                                  ref_file_path=this_json_file, 
-                                                 json_or_db='json')
+                                                 json_or_db='json',
+                                                 field_tree=self.get_image_field_tree(this_json_file))
         
         # Scanning all DB files for references to images
         for this_db_file in self.db_files:
+            if this_db_file in self.img_ref_records:
+                for this_db_file_line, this_json_address, this_img_ref, this_is_html in self.img_ref_records.pop(this_db_file):
+                    self.add_img_ref('db', this_db_file, this_db_file_line, this_json_address,
+                                     this_img_ref, this_is_html)
+                continue
+            
+            this_field_tree = self.get_image_field_tree(this_db_file)
             for this_db_file_line,this_db_file_line_content in enumerate(self.db_files[this_db_file]):
+                # Lines kept as raw text don't mention any images
+                if isinstance(this_db_file_line_content, str):
+                    continue
                 self.traverse_dict_and_find_all_refs(dict_content=this_db_file_line_content, 
                                                      ref_file_path=this_db_file, 
                                                      json_or_db='db',
-                                                     ref_file_line=this_db_file_line)
+                                                     ref_file_line=this_db_file_line,
+                                                     field_tree=this_field_tree)
         if return_result:
             return self.all_img_refs
         
     
+    def get_document_type(self, ref_file_path=None):
+        '''
+        Finds out which type of Foundry document is stored in a DB or JSON 
+        file (see `foundry_image_fields`). The world's own DB files are 
+        identified by their file names (ex: "actors.db") and the compendium 
+        packs are identified by the "packs" section of the "world.json" file.
+        
+        INPUTS:
+        -------
+        ref_file_path (STR) : Relative file path to the DB or JSON file. For 
+            example: 'worlds/porvenir/world.json' or 'worlds/porvenir/data/actors.db'.
+        
+        RETURNS:
+        --------
+        document_type (STR or None) : Type of document. Ex: "world", "actors" 
+            or "scenes". Equals None when the type is unknown.
+        
+        EXAMPLE:
+        --------
+        # Input:
+        print(my_world_refs.get_document_type('worlds/porvenir/packs/maps.db'))
+        
+        # Output:
+        # 'scenes'
+        '''
+        world_json_file = self.world_folder + '/world.json'
+        world_data_folder = self.world_folder + '/data'
+        
+        if ref_file_path == world_json_file:
+            return 'world'
+        elif str(pathlib.Path(ref_file_path).parent).replace('\\','/') == world_data_folder:
+            return pathlib.Path(ref_file_path).stem
+        
+        # Compendium packs are listed inside the "world.json" file
+        document_type = None
+        for this_pack in self.json_files.get(world_json_file, {}).get('packs', []):
+            if not isinstance(this_pack, dict) or not isinstance(this_pack.get('path'), str):
+                continue
+            this_pack_path = os.path.normpath(os.path.join(self.world_folder, this_pack['path'])).replace('\\','/')
+            if this_pack_path == ref_file_path:
+                this_pack_type = str(this_pack.get('entity', this_pack.get('type', ''))).lower()
+                document_type = foundry_pack_document_types.get(this_pack_type)
+        return document_type
+    
+    def get_image_field_tree(self, ref_file_path=None):
+        '''
+        Finds out which type of Foundry document is stored in a DB or JSON file
+        (see `get_document_type`) and returns the tree of fields that can hold
+        images in that type of document (see `foundry_image_fields` and 
+        `build_image_field_tree`).
+        
+        INPUTS:
+        -------
+        ref_file_path (STR) : Relative file path to the DB or JSON file. For 
+            example: 'worlds/porvenir/world.json' or 'worlds/porvenir/data/actors.db'.
+        
+        RETURNS:
+        --------
+        field_tree (DICT or None) : Tree of the fields that can hold images. 
+            This output is "None" when the "deep scan" mode is on or when the 
+            type of document is unknown, meaning that the whole document needs
+            to be walked.
+        '''
+        if self.deep_scan:
+            return None
+        
+        document_type = self.get_document_type(ref_file_path)
+        
+        if document_type not in foundry_image_fields:
+            return None
+        
+        if document_type not in self.image_field_trees:
+            self.image_field_trees[document_type] = build_image_field_tree(foundry_image_fields[document_type])
+        return self.image_field_trees[document_type]
+    
     def traverse_dict_and_find_all_refs(self, dict_content=None, ref_file_path=None, 
-                                        json_or_db=None, ref_file_line=None):
+                                        json_or_db=None, ref_file_line=None, 
+                                        field_tree=None):
         '''
         Function that traverses a JSON-like dictionary looking for references 
         to images. For each reference that is found, an `img_ref` object is created
@@ -842,62 +4248,55 @@ class world_refs:
             the reference was found in a ".json" file, this attribute is instead 
             set to None.
             NOTE: As with everything else in Python, this line number is zero-indexed.
+        field_tree (DICT or None) : Tree of the fields that can hold images (see 
+            `get_image_field_tree`). Only these fields are visited. When this 
+            input is left blank (equal to "None"), every leaf of the dictionary 
+            is visited.
                 
         RETURNS:
         --------
         None
         
         '''
-        # Regular Expression used to find image files
-        #regex_img_exp = re.compile('.*\.webp|.*\.jpg|.*\.jpeg|.*\.png')
-        #regex_img_exp = re.compile('.*\.webp.*|.*\.jpg.*|.*\.jpeg.*|.*\.png.*')
-        regex_img_exp = re.compile('\.webp|\.jpg|\.jpeg|\.png')
+        # The walk itself is done by `find_img_refs_in_dict`
+        for this_json_address, this_img_ref, img_ref_content_is_html in find_img_refs_in_dict(dict_content, 
+                                                                                              field_tree, 
+                                                                                              self.strict_html):
+            self.add_img_ref(json_or_db, ref_file_path, ref_file_line, this_json_address,
+                             this_img_ref, img_ref_content_is_html)
+    
+    def add_img_ref(self, json_or_db=None, ref_file_path=None, ref_file_line=None,
+                    json_address=None, img_path_for_ref=None, img_ref_content_is_html=None):
+        '''
+        Creates one `img_ref` object, appends it to the `self.all_img_refs` 
+        list and adds it to the indexes.
         
-        # Within each leaf of the dict tree, see if there is a 
-        # reference to an image. 
-        for i,this_item in enumerate(dict_walker(dict_content)):
-            
-            this_item_content = this_item[-1]
-            if type(this_item_content) == str:
-                
-                # If an image extension is found, extract the full file path
-                if regex_img_exp.findall(this_item_content):
-                    this_img_ref_content = this_item_content
-                    
-                    # Check if leaf is an HTML block
-                    if BeautifulSoup(this_img_ref_content, 'html.parser').find():
-                        
-                        # If it is an HTML block, search for images
-                        img_html_matches = BeautifulSoup(this_img_ref_content, 'html.parser').findAll("img")
-                        unique_img_refs_in_html = {}
-                        for this_match in img_html_matches:
-                            if this_match['src'] not in unique_img_refs_in_html:
-                                unique_img_refs_in_html[this_match['src']] = 1
-                            else:
-                                unique_img_refs_in_html[this_match['src']] += 1 
-                        
-                        # For every image found, generate a reference_dict
-                        for this_img_ref in unique_img_refs_in_html:
-                            this_ref_obj = img_ref(ref_file_type=json_or_db, 
-                                                   ref_file_path=ref_file_path, 
-                                                   ref_file_line=ref_file_line if json_or_db == 'db' else None, 
-                                                   full_json_address=this_item, 
-                                                   img_path_for_ref=this_img_ref,
-                                                   world_refs_obj=self)
-                            self.all_img_refs.append(this_ref_obj)
-                            self.all_img_refs_by_id[this_ref_obj.ref_id] = this_ref_obj
-                            
-                    # If the leaf is not an HTML chunk, it's an img reference,
-                    # so we just need to add it to the list of references.
-                    else:
-                        this_ref_obj = img_ref(ref_file_type=json_or_db, 
-                                               ref_file_path=ref_file_path, 
-                                               ref_file_line=ref_file_line if json_or_db == 'db' else None, 
-                                               full_json_address=this_item, 
-                                               img_path_for_ref=this_img_ref_content,
-                                               world_refs_obj=self)
-                        self.all_img_refs.append(this_ref_obj)
-                        self.all_img_refs_by_id[this_ref_obj.ref_id] = this_ref_obj
+        INPUTS:
+        -------
+        json_or_db (STR) : Either "json" or "db".
+        ref_file_path (STR) : Relative file path to the reference file. 
+            Ex: 'worlds/porvenir/data/actors.db'
+        ref_file_line (INT or None) : Line of the ".db" file that holds the 
+            reference.
+        json_address (LIST or TUPLE) : "Address" of the leaf that holds the 
+            reference (without the leaf's content).
+        img_path_for_ref (STR) : File path of the image being referenced.
+        img_ref_content_is_html (BOOL) : Indicates whether the leaf is an HTML
+            chunk.
+        
+        RETURNS:
+        --------
+        None
+        '''
+        this_ref_obj = img_ref(ref_file_type=json_or_db, 
+                               ref_file_path=ref_file_path, 
+                               ref_file_line=ref_file_line if json_or_db == 'db' else None, 
+                               full_json_address=list(json_address) + [None], 
+                               img_path_for_ref=img_path_for_ref,
+                               world_refs_obj=self,
+                               img_ref_content_is_html=img_ref_content_is_html)
+        self.all_img_refs.append(this_ref_obj)
+        self.add_ref_to_indexes(this_ref_obj)
                         
     def fix_incorrect_file_extensions(self):
         '''
@@ -939,13 +4338,15 @@ class world_refs:
                                                                   pathlib.Path(old_img_path_for_ref).stem)
                 
                 new_img_path_for_ref = find_filename_that_doesnt_exist_yet(new_img_file_path_before_extension, 
-                                                                           new_extension).replace('\\','/')
+                                                                           new_extension,
+                                                                           self.file_exists).replace('\\','/')
                 
                 new_content = old_content.replace(old_img_path_for_ref,
                                                   new_img_path_for_ref)
                 
                 #os.rename(old_img_path_for_ref,new_img_path_for_ref)
                 shutil.copyfile(old_img_path_for_ref,new_img_path_for_ref)
+                self.file_index.refresh(new_img_path_for_ref)
                 
                 # After the file on disk was fixed, all the `img_ref`s that 
                 # pointed to the old image need to be updated
@@ -968,15 +4369,9 @@ class world_refs:
             inside the World folder.
         
         '''
-        # Using rglob to find multiple patterns:
-        types = ('*.jpg','*.jpeg','*.png','*.webp')
-        all_images_in_world_folder = []
-        for this_type in types:
-            all_images_in_world_folder.extend(list(pathlib.Path(self.world_folder).rglob(this_type)))
-        
-        # Fixing double backslash into forward slash
-        for i,this_img in enumerate(all_images_in_world_folder):
-            all_images_in_world_folder[i] = str(this_img).replace('\\','/')
+        # Looking up all the image extensions in the file index
+        types = ('.jpg','.jpeg','.png','.webp')
+        all_images_in_world_folder = self.file_index.find_files(types)
         
         return all_images_in_world_folder
     
@@ -997,21 +4392,10 @@ class world_refs:
         # Getting a list of all images on disk inside the World folder.
         all_images_in_world_folder = self.find_all_images_in_world_folder()
         
-        # Making a counter for each image inside the World folder.
-        all_images_in_world_folder_dict = {}
-        for this_img_in_folder in all_images_in_world_folder:
-            all_images_in_world_folder_dict[this_img_in_folder] = 0
-        
-        # Looping over every `img_ref`. For each image found, we increment the 
-        # respective counter.
-        for this_ref in self.all_img_refs:
-            if this_ref.img_path_for_ref in all_images_in_world_folder_dict:
-                all_images_in_world_folder_dict[this_ref.img_path_for_ref] += 1 
-        
-        # Fishing out only images whose counters remain at zero. 
+        # Fishing out only the images that are not in the index of references
         unused_images_in_world_folder = []
-        for this_img_in_folder in all_images_in_world_folder_dict:
-            if all_images_in_world_folder_dict[this_img_in_folder] == 0:
+        for this_img_in_folder in all_images_in_world_folder:
+            if this_img_in_folder not in self.refs_by_img:
                 unused_images_in_world_folder.append(this_img_in_folder)
         
         return unused_images_in_world_folder
@@ -1049,17 +4433,17 @@ class world_refs:
             images that do not exist on disk.
         
         '''
-        broken_ref_count = 0
         broken_refs = []
         
-        # Looping over every `img_ref` object searching for references to files 
-        # that don't exist in disk or that have already been added to the trash queue.
-        for this_ref in self.all_img_refs:
-            if ((this_ref.img_path_on_disk == 'ERROR!!! IMG REFERENCE NOT ON DISK!!!') 
-                and (not this_ref.img_ref_external_web_link)) or (
-                        this_ref.img_path_for_ref in self.trash_queue):
-                broken_ref_count += 1
-                broken_refs.append(this_ref)
+        # Looking up the images that don't exist on disk or that have already 
+        # been added to the trash queue. Only these images are visited, instead
+        # of every `img_ref` in the world.
+        for this_img_path in self.broken_img_paths.union(self.trash_queue):
+            if this_img_path in self.refs_by_img:
+                broken_refs.extend(self.refs_by_img[this_img_path].values())
+        
+        # Keeping the same order as the `self.all_img_refs` list
+        broken_refs.sort(key=lambda this_ref: this_ref.ref_number)
         return broken_refs
 
     def try_to_fix_one_broken_ref(self, img_ref_to_fix):
@@ -1094,7 +4478,7 @@ class world_refs:
             # folder and see if this new file exists on disk. If so, the reference
             # is fixed!
             new_img_path_for_ref = img_ref_to_fix.img_path_for_ref.replace('modules','worlds')
-            if os.path.isfile(new_img_path_for_ref):
+            if self.file_exists(new_img_path_for_ref):
                 new_img_content = img_ref_to_fix.get_img_ref_content().replace(img_ref_to_fix.img_path_for_ref,new_img_path_for_ref)
                 img_ref_to_fix.set_editable_attributes(new_img_path_for_ref)
                 img_ref_to_fix.push_updated_content_to_world(new_img_content)
@@ -1164,6 +4548,9 @@ class world_refs:
         --------
         refs_indexed_by_hash_by_img (DICT) : Dictionary that indexes all of the 
             `img_ref` objects by their hashes and by the file paths of the images.
+            When all the references in the world are indexed, this is a copy
+            of the maintained index (see `update_hash_index`), so it can be
+            looped over while the references are being updated.
             Structure of output:
             refs_indexed_by_hash_by_img = {'hash_a':{'img_1':[ref_i,
                                                               ref_ii,
@@ -1176,14 +4563,16 @@ class world_refs:
         # Preparing dictionary for indexing
         refs_indexed_by_hash_by_img = {}
         
-        # Checking which ref_list to use
-        if input_ref_list==None:
-            ref_list = self.all_img_refs
-        else:
-            ref_list = input_ref_list
+        # All the references in the world are read from the maintained indexes
+        if input_ref_list is None:
+            self.update_hash_index()
+            for this_hash in self.img_paths_by_hash:
+                refs_indexed_by_hash_by_img[this_hash] = {this_img_path:list(self.refs_by_img[this_img_path].values())
+                                                          for this_img_path in self.img_paths_by_hash[this_hash]}
+            return refs_indexed_by_hash_by_img
         
-        # Looping over all of the `img_ref`s in `ref_list`
-        for this_ref in ref_list:
+        # Looping over all of the `img_ref`s in `input_ref_list`
+        for this_ref in input_ref_list:
             if this_ref.img_hash not in refs_indexed_by_hash_by_img:
                 refs_indexed_by_hash_by_img[this_ref.img_hash] = {}
             
@@ -1193,11 +4582,41 @@ class world_refs:
             refs_indexed_by_hash_by_img[this_ref.img_hash][this_ref.img_path_for_ref].append(this_ref)
         
         return refs_indexed_by_hash_by_img
+    
+    def update_hash_index(self):
+        '''
+        Builds the index of images by hash the first time it is needed and, 
+        after that, only hashes the images that got their first reference 
+        since the last call.
+        
+        INPUTS:
+        -------
+        None
+        
+        RETURNS:
+        --------
+        None
+        '''
+        if self.img_hash_by_path is None:
+            self.img_hash_by_path = {}
+            self.img_paths_to_hash = set(self.refs_by_img)
+        
+        # Hashing the images in the same order as the `self.refs_by_img` index
+        for this_img_path in [this_img_path for this_img_path in self.refs_by_img 
+                              if this_img_path in self.img_paths_to_hash]:
+            temp_ref = next(iter(self.refs_by_img[this_img_path].values()))
+            this_hash = temp_ref.img_hash
+            self.img_hash_by_path[this_img_path] = this_hash
+            self.img_paths_by_hash.setdefault(this_hash, {})[this_img_path] = None
+        self.img_paths_to_hash = set()
 
     def get_duplicated_images(self):
         '''
         Scans all of the `img_ref` objects and finds which ones are duplicates
         of each other. The results of this function are indexed by hash. 
+        The images are compared using the tiered approach from the 
+        `find_duplicated_files` function, so most images never need to be 
+        hashed in full.
         
         INPUTS:
         -------
@@ -1216,14 +4635,21 @@ class world_refs:
                                                     ref_vi,
                                                     ref_vii]}}
         '''
-        refs_indexed_by_hash_by_img = self.get_refs_indexed_by_hash_by_img()
+        refs_indexed_by_img = self.get_refs_indexed_by_img()
+        
+        # Only images that exist inside the world folder can be deduplicated
+        candidate_imgs = []
+        for this_img_path in refs_indexed_by_img:
+            temp_ref = refs_indexed_by_img[this_img_path][0]
+            if temp_ref.img_exists and temp_ref.ref_img_in_world_folder:
+                candidate_imgs.append(temp_ref.img_path_on_disk)
+        
+        duplicated_files = find_duplicated_files(candidate_imgs, self.hash_cache, file_index=self.file_index)
         
-        duplicated_images_count_by_hash = 0
         duplicated_images = {}
-        for this_hash in refs_indexed_by_hash_by_img:
-            if (len(refs_indexed_by_hash_by_img[this_hash]) > 1) and (this_hash != None):
-                duplicated_images[this_hash] = refs_indexed_by_hash_by_img[this_hash]
-                duplicated_images_count_by_hash += 1
+        for this_hash in duplicated_files:
+            duplicated_images[this_hash] = {this_img_path:refs_indexed_by_img[this_img_path]
+                                            for this_img_path in duplicated_files[this_hash]}
     
         return duplicated_images
 
@@ -1287,76 +4713,451 @@ class world_refs:
 
         duplicated_images = self.get_duplicated_images()
     
-    def update_one_ref_to_webp(self, img_ref_to_update=None):
+    def update_one_ref_to_webp(self, img_ref_to_update=None):
+        '''
+        Updates one single `img_ref` object such that it points to the ".webp" 
+        image on disk instead of whatever the original file type was. 
+        
+        INPUTS:
+        -------
+        img_ref_to_update (OBJECT) : instance of the `img_ref` class that will
+            be updated by this function.
+        
+        RETURNS:
+        --------
+        None
+        '''
+        old_img_path_for_ref = img_ref_to_update.img_path_for_ref
+        old_img_ref_content  = img_ref_to_update.get_img_ref_content()
+        
+        new_img_path_for_ref = img_ref_to_update.webp_img_path_for_ref
+        new_img_ref_content  = old_img_ref_content.replace(old_img_path_for_ref,
+                                                           new_img_path_for_ref)
+        
+        img_ref_to_update.set_editable_attributes(new_img_path_for_ref)
+        img_ref_to_update.push_updated_content_to_world(new_img_ref_content)
+
+    def get_refs_indexed_by_img(self, input_ref_list=None):
+        '''
+        Creates a dictionary that indexes all of the `img_ref` objects inside a 
+        Foundry World by file path. 
+        
+        INPUTS:
+        -------
+        input_ref_list (LIST or None) : List of references to be indexes. When 
+            this input is left blank (equal to "None"), the default behavior is
+            to just index all of the `img_ref`s in the `self.all_img_refs` 
+            attribute.
+        
+        RETURNS:
+        --------
+        refs_indexed_by_img (DICT) : dictionary that indexes `img_ref` objects
+            by the image file paths. When all the references in the world are
+            indexed, this is a copy of the maintained `self.refs_by_img` index,
+            so it can be looped over while the references are being updated.
+            Structure of output:
+            refs_indexed_by_img = {'img_1':[ref_i,
+                                            ref_ii,
+                                            ref_iii],
+                                   'img_2':[ref_iv,
+                                            ref_v,
+                                            ref_vi,
+                                            ref_vii]}
+        '''
+        # All the references in the world are read from the maintained index
+        if input_ref_list is None:
+            return {this_img_path:list(self.refs_by_img[this_img_path].values()) 
+                    for this_img_path in self.refs_by_img}
+        
+        # Preparing dictionary for output
+        refs_indexed_by_img = {}
+        
+        # Looping all the `img_ref`s in `input_ref_list`
+        for this_ref in input_ref_list:
+            if this_ref.img_path_for_ref not in refs_indexed_by_img:
+                refs_indexed_by_img[this_ref.img_path_for_ref] = []
+            refs_indexed_by_img[this_ref.img_path_for_ref].append(this_ref)
+        return refs_indexed_by_img
+
+    def create_webp_copies(self, img_refs_to_convert=None, max_batch_bytes=4*1024*1024):
+        '''
+        Creates the ".webp" copies of several images at the same time. The 
+        `img_ref`s in `img_refs_to_convert` are split into batches of up to 
+        `self.ffmpeg_batch_size` images, and each batch is handed over to a 
+        pool of workers (the size of the pool is set by the `self.jobs` 
+        attribute). Each worker converts a whole batch with one FFMPEG call 
+        (see `create_webp_copies_in_batch`). 
+        Each image is encoded with its own settings (see 
+        `img_ref.webp_settings`). When `self.target_ssim` is set, the quality 
+        of each lossy image is searched for first, by a worker of the same 
+        pool (see `create_webp_copy_for_target_ssim`). Qualities that were 
+        already searched for are taken from the `self.quality_cache`, and 
+        those images are converted like any other one.
+        Images that were already encoded with the same encoder and settings 
+        are taken from the `self.webp_cache` instead (see `webp_output_cache`),
+        and every new ".webp" file is added to it.
+        A conversion that fails (or that raises an error) does not stop the 
+        other conversions. Its failure is simply recorded in the output.
+        NOTE: This method only creates the ".webp" files on disk. It does not 
+        touch the `img_ref`s or the `world_refs` object.
+        
+        INPUTS:
+        -------
+        img_refs_to_convert (LIST) : List of `img_ref` objects whose images will
+            be converted. Each image on disk should only appear once in this list.
+        max_batch_bytes (INT) : Maximum size (in bytes) of the images converted
+            by one single FFMPEG call. Images bigger than that are converted
+            on their own.
+        
+        RETURNS:
+        --------
+        conversion_return_codes (DICT) : Dictionary that indexes the return code 
+            of each conversion by the file path of the image that was converted.
+            A return code of 0 means the conversion was successful. All other 
+            values indicate some sort of problem.
+            Structure of output:
+            conversion_return_codes = {'img_1':0,
+                                       'img_2':1}
+        
+        EXAMPLE:
+        --------
+        # Input:
+        conversion_return_codes = my_world_refs.create_webp_copies([my_ref_1, my_ref_2])
+        print(conversion_return_codes)
+        
+        # Output:
+        # {'worlds/porvenir/art/wood-bg.jpg': 0, 'worlds/porvenir/art/map.png': 0}
+        '''
+        conversion_return_codes = {}
+        printed_percentages = {}
+        
+        # Picking out the images whose quality still needs to be searched for
+        img_refs_to_search = []
+        if self.target_ssim is not None:
+            img_refs_with_settings = []
+            for this_ref in img_refs_to_convert:
+                if (this_ref.webp_settings is not None) and this_ref.webp_settings.get('lossless'):
+                    img_refs_with_settings.append(this_ref)
+                    continue
+                this_webp_settings = self.quality_cache.get_webp_settings(self.get_img_hash(this_ref.img_path_for_ref), 
+                                                                          self.get_search_settings_key(this_ref), 
+                                                                          self.target_ssim)
+                if this_webp_settings is not None:
+                    this_ref.webp_settings = dict(this_ref.webp_settings or {}, **this_webp_settings)
+                    img_refs_with_settings.append(this_ref)
+                else:
+                    img_refs_to_search.append(this_ref)
+            if img_refs_to_search:
+                print(f'Searching for the quality of {len(img_refs_to_search)} images (target SSIM: {self.target_ssim}).')
+            img_refs_to_convert = img_refs_with_settings
+        
+        # Images that were already encoded with the same settings (in this 
+        # world or in another one) are simply taken from the cache
+        if self.webp_cache is not None:
+            img_refs_not_in_cache = []
+            for this_ref in img_refs_to_convert:
+                settings_key = self.webp_encoder.get_settings_key(this_ref.webp_settings)
+                if self.webp_cache.fetch(self.get_img_hash(this_ref.img_path_for_ref), settings_key,
+                                         this_ref.webp_img_path_for_ref):
+                    conversion_return_codes[this_ref.img_path_for_ref] = 0
+                    self.file_index.refresh(this_ref.webp_img_path_for_ref)
+                else:
+                    img_refs_not_in_cache.append(this_ref)
+            if conversion_return_codes:
+                print(f'Took {len(conversion_return_codes)} ".webp" images from the cache.')
+            img_refs_to_convert = img_refs_not_in_cache
+        
+        if not (img_refs_to_convert or img_refs_to_search):
+            if self.webp_cache is not None:
+                self.webp_cache.save()
+            return conversion_return_codes
+        
+        # Splitting the images into batches, but never into fewer batches than
+        # there are workers. Big images are converted on their own, since a 
+        # single FFMPEG call decodes all of its inputs at once.
+        batch_size = max(1, min(self.ffmpeg_batch_size, -(-len(img_refs_to_convert) // self.jobs)))
+        img_ref_batches = [[]]
+        batch_bytes = 0
+        for this_ref in img_refs_to_convert:
+            this_img_size = self.file_index.get_size(this_ref.img_path_for_ref) if self.file_exists(this_ref.img_path_for_ref) else 0
+            if img_ref_batches[-1] and ((len(img_ref_batches[-1]) >= batch_size) 
+                                        or (batch_bytes + this_img_size > max_batch_bytes)):
+                img_ref_batches.append([])
+                batch_bytes = 0
+            img_ref_batches[-1].append(this_ref)
+            batch_bytes += this_img_size
+        
+        if not img_refs_to_convert:
+            img_ref_batches = []
+        
+        # The conversions themselves happen in separate FFMPEG processes, so a 
+        # pool of threads is enough to keep all of the CPUs busy.
+        img_counter = 0
+        total_imgs = len(img_refs_to_convert) + len(img_refs_to_search)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            future_to_batch = {}
+            search_futures = set()
+            # The searches are the slowest jobs, so they are started first
+            for this_ref in img_refs_to_search:
+                this_future = executor.submit(self.create_webp_copy_for_target_ssim, this_ref)
+                future_to_batch[this_future] = [this_ref]
+                search_futures.add(this_future)
+            for this_batch in img_ref_batches:
+                this_future = executor.submit(self.create_webp_copies_in_batch, this_batch)
+                future_to_batch[this_future] = this_batch
+            
+            for this_future in concurrent.futures.as_completed(future_to_batch):
+                this_batch = future_to_batch[this_future]
+                try:
+                    conversion_return_codes.update(this_future.result())
+                except Exception as this_error:
+                    for this_ref in this_batch:
+                        print(f'Failed to convert {this_ref.img_path_for_ref}: {this_error}')
+                        conversion_return_codes[this_ref.img_path_for_ref] = -1
+                
+                # Keeping the file index up to date (on the main thread), and
+                # keeping a copy of the new ".webp" files (and of the qualities
+                # that were searched for) in the caches
+                for this_ref in this_batch:
+                    self.file_index.refresh(this_ref.webp_img_path_for_ref)
+                    # A quality picked without measuring the SSIM is not kept
+                    if ((this_future in search_futures) and (conversion_return_codes[this_ref.img_path_for_ref] == 0)
+                        and (this_ref.webp_settings['ssim'] is not None)):
+                        self.quality_cache.set_webp_settings(self.get_img_hash(this_ref.img_path_for_ref), 
+                                                             self.get_search_settings_key(this_ref),
+                                                             self.target_ssim, this_ref.webp_settings)
+                    if ((self.webp_cache is not None) and (conversion_return_codes[this_ref.img_path_for_ref] == 0)
+                        and self.file_exists(this_ref.webp_img_path_for_ref)):
+                        self.webp_cache.store(self.get_img_hash(this_ref.img_path_for_ref), 
+                                              self.webp_encoder.get_settings_key(this_ref.webp_settings), 
+                                              this_ref.webp_img_path_for_ref)
+                
+                percent_imgs_converted = 10*int(10*img_counter/total_imgs)
+                if percent_imgs_converted not in printed_percentages:
+                    printed_percentages[percent_imgs_converted] = True
+                    print(f'Converted {percent_imgs_converted}% of all images.')
+                img_counter += len(this_batch)
+        print('Converted 100% of all images.')
+        
+        if self.webp_cache is not None:
+            self.webp_cache.save()
+        if self.quality_cache is not None:
+            self.quality_cache.save()
+        
+        return conversion_return_codes
+    
+    def create_webp_copies_in_batch(self, img_refs_batch=None):
+        '''
+        Creates the ".webp" copies of several images with the encoder picked 
+        by the `world_refs` object. The "ffmpeg" encoder converts them all 
+        with one single FFMPEG call (see 
+        `ffmpeg_webp_encoder.create_webp_copies_in_batch`).
+        
+        INPUTS:
+        -------
+        img_refs_batch (LIST) : List of `img_ref` objects whose images will be
+            converted. Each image on disk should only appear once in this list.
+        
+        RETURNS:
+        --------
+        conversion_return_codes (DICT) : Dictionary that indexes the return code 
+            of each conversion by the file path of the image that was converted
+            (see `create_webp_copies`).
+        
+        EXAMPLE:
+        --------
+        # Input:
+        print(my_world_refs.create_webp_copies_in_batch([my_ref_1, my_ref_2]))
+        
+        # Output:
+        # {'worlds/porvenir/tokens/goblin.png': 0, 'worlds/porvenir/tokens/orc.png': 1}
+        '''
+        img_paths = [this_ref.img_path_for_ref for this_ref in img_refs_batch]
+        webp_img_paths = [this_ref.webp_img_path_for_ref for this_ref in img_refs_batch]
+        webp_settings_list = [this_ref.webp_settings for this_ref in img_refs_batch]
+        return_codes = self.webp_encoder.create_webp_copies_in_batch(img_paths, webp_img_paths, webp_settings_list)
+        return dict(zip(img_paths, return_codes))
+    
+    def create_webp_copy_for_target_ssim(self, this_ref=None):
+        '''
+        Creates the smallest lossy ".webp" copy of one image whose SSIM is at 
+        least `self.target_ssim` (see 
+        `webp_encoder.create_webp_copy_for_target_ssim`). The settings that 
+        were picked (including the quality) are stored in the `img_ref`'s 
+        `webp_settings` attribute.
+        
+        INPUTS:
+        -------
+        this_ref (img_ref) : Reference to the image that will be converted.
+        
+        RETURNS:
+        --------
+        conversion_return_codes (DICT) : Dictionary with the return code of 
+            the conversion, indexed by the file path of the image (see 
+            `create_webp_copies`).
+        
+        EXAMPLE:
+        --------
+        # Input:
+        print(my_world_refs.create_webp_copy_for_target_ssim(my_ref))
+        print(my_ref.webp_settings)
+        
+        # Output:
+        # {'worlds/porvenir/art/wood-bg.jpg': 0}
+        # {'lossless': False, 'quality': 62, 'ssim': 0.9803}
+        '''
+        return_code, webp_settings = self.webp_encoder.create_webp_copy_for_target_ssim(this_ref.img_path_for_ref,
+                                                                                       this_ref.webp_img_path_for_ref,
+                                                                                       self.target_ssim,
+                                                                                       webp_settings=this_ref.webp_settings)
+        if return_code == 0:
+            this_ref.webp_settings = webp_settings
+        return {this_ref.img_path_for_ref:return_code}
+    
+    def get_search_settings_key(self, this_ref=None):
         '''
-        Updates one single `img_ref` object such that it points to the ".webp" 
-        image on disk instead of whatever the original file type was. 
+        Returns the settings key under which the quality searched for an image
+        is cached (see `webp_quality_cache`). The key describes the encoder 
+        and, when the ".webp" copy is resized, the size of the copy.
         
         INPUTS:
         -------
-        img_ref_to_update (OBJECT) : instance of the `img_ref` class that will
-            be updated by this function.
+        this_ref (img_ref) : Reference to the image.
         
         RETURNS:
         --------
-        None
+        settings_key (STR) : Settings key. Ex: "ffmpeg:libwebp:2000x1500"
         '''
-        old_img_path_for_ref = img_ref_to_update.img_path_for_ref
-        old_img_ref_content  = img_ref_to_update.get_img_ref_content()
+        if (this_ref.webp_settings is not None) and ('width' in this_ref.webp_settings):
+            return self.webp_encoder.get_settings_key({'width':this_ref.webp_settings['width'],
+                                                       'height':this_ref.webp_settings['height']})
+        return self.webp_encoder.get_settings_key()
+    
+    def get_scene_size_for_background_ref(self, this_ref=None):
+        '''
+        Checks whether an `img_ref` is the background image of a scene (inside 
+        the world's "scenes.db" file or inside a compendium pack of scenes), 
+        and returns the size at which the scene displays it. Foundry stretches 
+        the background to the scene's "width" and "height".
         
-        new_img_path_for_ref = img_ref_to_update.webp_img_path_for_ref
-        new_img_ref_content  = old_img_ref_content.replace(old_img_path_for_ref,
-                                                           new_img_path_for_ref)
+        INPUTS:
+        -------
+        this_ref (img_ref) : Reference to check.
         
-        img_ref_to_update.set_editable_attributes(new_img_path_for_ref)
-        img_ref_to_update.push_updated_content_to_world(new_img_ref_content)
-
-    def get_refs_indexed_by_img(self, input_ref_list=None):
+        RETURNS:
+        --------
+        scene_size (TUPLE or None) : The (width, height) of the scene. Equals 
+            None when the reference is not a scene background, or when the 
+            scene doesn't have a valid size.
+        
+        EXAMPLE:
+        --------
+        # Input:
+        print(my_world_refs.get_scene_size_for_background_ref(my_ref))
+        
+        # Output:
+        # (4000, 3000)
         '''
-        Creates a dictionary that indexes all of the `img_ref` objects inside a 
-        Foundry World by file path. 
+        # Foundry 0.7.9 keeps the background in "img", and newer versions keep
+        # it in "background.src"
+        if (this_ref.ref_file_type != 'db') or (this_ref.img_ref_content_is_html
+            or (this_ref.json_address not in (('img',), ('background','src')))):
+            return None
+        if self.get_document_type(this_ref.ref_file_path) != 'scenes':
+            return None
+        
+        this_scene = self.db_files[this_ref.ref_file_path][this_ref.ref_file_line]
+        scene_width, scene_height = this_scene.get('width'), this_scene.get('height')
+        if not all(isinstance(this_value, (int, float)) and not isinstance(this_value, bool) and this_value > 0
+                   for this_value in (scene_width, scene_height)):
+            return None
+        return int(scene_width), int(scene_height)
+    
+    def downscale_scene_backgrounds(self):
+        '''
+        Finds the scene backgrounds that are bigger than the scenes that use 
+        them, and makes sure their ".webp" copies are created at the size the
+        scenes actually display them (see `create_webp_copies`). Purchased 
+        maps are often 2 to 4 times bigger than that, which makes the scenes
+        much slower to load.
+        An image is only downscaled when every one of its references is the 
+        background of a scene. Images that are also used somewhere else (ex: 
+        in a tile or a journal entry) keep their full resolution. When several
+        scenes use the same background, the copy is made big enough for all 
+        of them. Images are never upscaled.
+        This method only sets the "width" and "height" of the `img_ref`s' 
+        `webp_settings`, so it needs to run right before 
+        `convert_all_images_to_webp_and_update_refs`.
+        
+        Attributes set by this function:
+            self.scene_background_sizes (DICT) : New size of each background 
+                that gets downscaled, indexed by the file path of the image. 
+                Ex: {'worlds/porvenir/maps/ship.jpg' : [4000, 3000]}
         
         INPUTS:
         -------
-        input_ref_list (LIST or None) : List of references to be indexes. When 
-            this input is left blank (equal to "None"), the default behavior is
-            to just index all of the `img_ref`s in the `self.all_img_refs` 
-            attribute.
+        None
         
         RETURNS:
         --------
-        refs_indexed_by_img (DICT) : dictionary that indexes `img_ref` objects
-            by the image file paths. 
-            Structure of output:
-            refs_indexed_by_img = {'img_1':[ref_i,
-                                            ref_ii,
-                                            ref_iii],
-                                   'img_2':[ref_iv,
-                                            ref_v,
-                                            ref_vi,
-                                            ref_vii]}
+        None
         '''
-        # Preparing dictionary for output
-        refs_indexed_by_img = {}
+        self.scene_background_sizes = {}
+        refs_indexed_by_img = self.get_refs_indexed_by_img()
         
-        # Checking which ref_list to use
-        if input_ref_list==None:
-            ref_list = self.all_img_refs
-        else:
-            ref_list = input_ref_list
+        for this_img_path in refs_indexed_by_img:
+            temp_ref = refs_indexed_by_img[this_img_path][0]
+            if temp_ref.is_webp or (not temp_ref.img_exists) or (not temp_ref.ref_img_in_world_folder):
+                continue
+            
+            # Finding the biggest size needed by the scenes that use this image
+            needed_width, needed_height = 0, 0
+            for this_ref in refs_indexed_by_img[this_img_path]:
+                scene_size = self.get_scene_size_for_background_ref(this_ref)
+                if scene_size is None:
+                    # This reference might need the full resolution
+                    break
+                needed_width, needed_height = max(needed_width, scene_size[0]), max(needed_height, scene_size[1])
+            else:
+                img_stats = get_img_stats(this_img_path)
+                if (img_stats is None) or ((img_stats['width'] <= needed_width) and (img_stats['height'] <= needed_height)):
+                    continue
+                
+                new_size = [min(img_stats['width'], needed_width), min(img_stats['height'], needed_height)]
+                self.scene_background_sizes[this_img_path] = new_size
+                for this_ref in refs_indexed_by_img[this_img_path]:
+                    this_ref.webp_settings = dict(this_ref.webp_settings or {}, width=new_size[0], height=new_size[1])
         
-        # Looping all the `img_ref`s in `ref_list`
-        for this_ref in ref_list:
-            if this_ref.img_path_for_ref not in refs_indexed_by_img:
-                refs_indexed_by_img[this_ref.img_path_for_ref] = []
-            refs_indexed_by_img[this_ref.img_path_for_ref].append(this_ref)
-        return refs_indexed_by_img
-
+        print(f'Downscaling {len(self.scene_background_sizes)} scene backgrounds to the size of their scenes.')
+    
     def convert_all_images_to_webp_and_update_refs(self):
         '''
         Converts all of the images referenced in a Foundry World into a ".webp"
         format, updates all of the `img_ref` objects and pushes all of the 
         updated data back into the `world_refs` object.
+        The conversions run in parallel (see the `create_webp_copies` method), 
+        but the references are only updated afterwards, one image at a time 
+        and always in the same order.
+        A ".webp" copy is only used when it is smaller than the original image
+        by at least `self.min_webp_savings` (ex: 0.1 means 10% smaller). 
+        Otherwise, the original image and its references are left untouched, 
+        and the ".webp" copy created in this run is deleted. This happens with
+        tiny palette PNGs and with JPEGs that were already optimized.
+        
+        Attributes set by this function:
+            self.conversion_report (DICT) : Sizes of each image and of its 
+                ".webp" copy, and which one was kept. The report is also saved
+                inside the world's "_jwm_cache" folder. Its structure is as 
+                follows:
+                    {'images_converted':1, 'images_kept_as_original':1, 'bytes_saved':34000,
+                     'images':{'worlds/porvenir/art/map.png' : {'webp_img_path':'worlds/porvenir/art/map.webp', 
+                                                                'original_bytes':50000, 'webp_bytes':16000,
+                                                                'saved_bytes':34000, 'kept':'webp',
+                                                                'webp_settings':{'lossless':False, 'quality':80}},
+                               'worlds/porvenir/art/dot.png' : {'webp_img_path':'worlds/porvenir/art/dot.webp', 
+                                                                'original_bytes':90, 'webp_bytes':120,
+                                                                'saved_bytes':-30, 'kept':'original',
+                                                                'webp_settings':{'lossless':True, 'quality':100}}}}
         
         INPUTS:
         -------
@@ -1369,30 +5170,75 @@ class world_refs:
         '''
         refs_indexed_by_img = self.get_refs_indexed_by_img()
         
-        printed_percentages = {}
-        
-        for img_counter, this_img_path in enumerate(refs_indexed_by_img):
+        # Picking out the images that need to be converted. Images that already
+        # have a ".webp" copy on disk don't need to be converted again.
+        imgs_to_update = []
+        img_refs_to_convert = []
+        for this_img_path in refs_indexed_by_img:
             temp_ref = refs_indexed_by_img[this_img_path][0]
-            temp_path_for_deletion = this_img_path
-            percent_imgs_checked = int(100*img_counter/len(refs_indexed_by_img))
-            if (percent_imgs_checked % 10 == 0) & (percent_imgs_checked not in printed_percentages):
-                printed_percentages[percent_imgs_checked] = True
-                print(f'Scanned {percent_imgs_checked}% of all images.')
             if (not temp_ref.is_webp) and (temp_ref.img_exists) and (temp_ref.ref_img_in_world_folder):
-                conversion_return_code = 0
-                if (not os.path.isfile(temp_ref.webp_img_path_for_ref)):
-                    conversion_return_code = temp_ref.create_webp_copy()
-                if (conversion_return_code == 0) and (os.path.isfile(temp_ref.webp_img_path_for_ref)):
-                    for ref_counter, this_ref in enumerate(refs_indexed_by_img[this_img_path]):
-                        self.update_one_ref_to_webp(this_ref)
-                self.trash_queue.add(temp_path_for_deletion.replace('\\','/'))
-        print('Scanned 100% of all images.')
+                imgs_to_update.append(this_img_path)
+                if (not self.file_exists(temp_ref.webp_img_path_for_ref)):
+                    img_refs_to_convert.append(temp_ref)
+        
+        print(f'Converting {len(img_refs_to_convert)} images to ".webp" using {self.jobs} workers.')
+        conversion_return_codes = self.create_webp_copies(img_refs_to_convert)
+        
+        self.conversion_report = {'images_converted':0, 'images_kept_as_original':0, 'bytes_saved':0, 'images':{}}
+        
+        # Updating the references serially, in the original order
+        for this_img_path in imgs_to_update:
+            temp_ref = refs_indexed_by_img[this_img_path][0]
+            conversion_return_code = conversion_return_codes.get(this_img_path, 0)
+            if not ((conversion_return_code == 0) and (self.file_exists(temp_ref.webp_img_path_for_ref))):
+                print(f'Could not convert {this_img_path} to ".webp". Its references were left untouched.')
+                continue
+            
+            # Only keeping the ".webp" copy if it is small enough
+            original_bytes = self.file_index.get_size(this_img_path)
+            webp_bytes = self.file_index.get_size(temp_ref.webp_img_path_for_ref)
+            keep_webp = webp_bytes < original_bytes * (1 - self.min_webp_savings)
+            self.conversion_report['images'][this_img_path] = {'webp_img_path':temp_ref.webp_img_path_for_ref,
+                                                               'original_bytes':original_bytes,
+                                                               'webp_bytes':webp_bytes,
+                                                               'saved_bytes':original_bytes - webp_bytes,
+                                                               'kept':'webp' if keep_webp else 'original',
+                                                               'webp_settings':temp_ref.webp_settings}
+            
+            if keep_webp:
+                for ref_counter, this_ref in enumerate(refs_indexed_by_img[this_img_path]):
+                    self.update_one_ref_to_webp(this_ref)
+                self.trash_queue.add(this_img_path.replace('\\','/'))
+                self.conversion_report['images_converted'] += 1
+                self.conversion_report['bytes_saved'] += original_bytes - webp_bytes
+            else:
+                # A ".webp" file that was already on disk before this run is 
+                # left alone, since it might not be the tool's own copy
+                if this_img_path in conversion_return_codes:
+                    self.remove_file_if_it_exists(temp_ref.webp_img_path_for_ref)
+                self.conversion_report['images_kept_as_original'] += 1
+        
+        print(f'Switched {self.conversion_report["images_converted"]} images to ".webp", saving '
+              f'{self.conversion_report["bytes_saved"]} bytes. Kept {self.conversion_report["images_kept_as_original"]} '
+              f'original images, since their ".webp" copies were not smaller.')
+        
+        # Saving the report next to the other files the tool keeps for this world
+        os.makedirs(self.cache_folder, exist_ok=True)
+        with open(os.path.join(self.cache_folder,'conversion_report.json'),'w',encoding="utf-8") as fout:
+            json.dump(self.conversion_report, fout, indent=2, ensure_ascii=False)
+        self.file_index.refresh(os.path.join(self.cache_folder,'conversion_report.json').replace('\\','/'))
         
     def export_all_json_and_db_files(self):
         '''
         Creates a backup of the ".json" & ".db" files on disk and exports the 
         data inside the `world_refs` object into new ".json" & ".db" files onto
         the disk.
+        Only the files that were changed by an `img_ref` (see `mark_as_dirty`)
+        are backed up and rewritten. Every other file is left untouched, and 
+        any old backup of it is deleted, so that `restore_bak_files` does not 
+        bring back a version older than the one on disk.
+        When `self.append_db` is True, the changed documents are appended to 
+        the end of the ".db" files instead (see `append_changed_db_lines`).
         
         INPUTS:
         -------
@@ -1400,29 +5246,201 @@ class world_refs:
         
         RETURNS:
         --------
-        None
+        export_stats (DICT) : Number of files and bytes that were written 
+            and skipped. Files that were appended to are counted as exported,
+            and only the appended bytes are counted as written. Ex:
+                {'files_exported':2, 'bytes_exported':18000, 'files_appended':1,
+                 'files_skipped':40, 'bytes_skipped':3500000}
         
         '''
+        export_stats = {'files_exported':0, 'bytes_exported':0, 'files_appended':0,
+                        'files_skipped':0, 'bytes_skipped':0}
+        
         # Scanning all JSON files for references to images
         for this_json_file in self.json_files:
+            if this_json_file not in self.dirty_json_files:
+                self.skip_unchanged_file(this_json_file, export_stats)
+                continue
+            
             # Backing up current JSON file
             shutil.copyfile(this_json_file, this_json_file+'bak')
             
             this_json_file_content = self.json_files[this_json_file]
             # Writing JSON files to disk
             with open(this_json_file,'w',encoding="utf-8") as fout:
-                new_line = json.dumps(this_json_file_content,separators=(',', ':'),ensure_ascii=False) + '\n'
+                new_line = json_dumps(this_json_file_content) + '\n'
                 fout.writelines([new_line])
+            
+            self.file_index.refresh(this_json_file+'bak')
+            self.file_index.refresh(this_json_file)
+            export_stats['files_exported'] += 1
+            export_stats['bytes_exported'] += self.file_index.get_size(this_json_file)
 
         for this_db_file in self.db_files:
-            # Backing up current DB file
-            shutil.copyfile(this_db_file, this_db_file+'bak')
+            if (this_db_file not in self.dirty_db_lines) and (this_db_file not in self.db_files_to_rewrite):
+                self.skip_unchanged_file(this_db_file, export_stats)
+                continue
+            
+            # Appending only the changed documents, unless the file would get
+            # too bloated (or needs to be compacted on disk)
+            if (self.append_db and (this_db_file not in self.db_files_to_rewrite) 
+                and self.append_changed_db_lines(this_db_file, export_stats)):
+                continue
             
-            # Writing DB files to disk, line by line
-            with open(this_db_file,'w',encoding="utf-8") as fout:
-                for this_db_file_line,this_db_file_line_content in enumerate(self.db_files[this_db_file]):
-                    new_line = json.dumps(this_db_file_line_content,separators=(',', ':'),ensure_ascii=False) + '\n'
-                    fout.writelines([new_line])
+            # The file is rewritten in full, so an old "append" backup no 
+            # longer applies.
+            self.remove_file_if_it_exists(this_db_file+'append')
+            self.db_lines_appended.pop(this_db_file, None)
+            self.db_outdated_lines_on_disk.pop(this_db_file, None)
+            
+            if isinstance(self.db_files[this_db_file], streamed_db_file):
+                # Backing up current DB file and writing the new one in one pass
+                self.db_files[this_db_file].save(this_db_file+'bak')
+            else:
+                # Backing up current DB file
+                shutil.copyfile(this_db_file, this_db_file+'bak')
+                
+                # Writing DB files to disk, line by line
+                with open(this_db_file,'w',encoding="utf-8") as fout:
+                    for this_db_file_line,this_db_file_line_content in enumerate(self.db_files[this_db_file]):
+                        # Lines kept as raw text are written back as they are
+                        if isinstance(this_db_file_line_content, str):
+                            new_line = this_db_file_line_content + '\n'
+                        else:
+                            new_line = json_dumps(this_db_file_line_content) + '\n'
+                        fout.writelines([new_line])
+            
+            self.file_index.refresh(this_db_file+'bak')
+            self.file_index.refresh(this_db_file)
+            export_stats['files_exported'] += 1
+            export_stats['bytes_exported'] += self.file_index.get_size(this_db_file)
+        
+        # Everything that was changed is now on disk
+        self.dirty_json_files = set()
+        self.dirty_db_lines = {}
+        self.db_files_to_rewrite = set()
+        
+        print(f'Exported {export_stats["files_exported"]} changed files ({export_stats["bytes_exported"]} bytes, '
+              f'{export_stats["files_appended"]} of them by appending). '
+              f'Skipped {export_stats["files_skipped"]} unchanged files ({export_stats["bytes_skipped"]} bytes).')
+        return export_stats
+    
+    def skip_unchanged_file(self, file_path=None, export_stats=None):
+        '''
+        Leaves an unchanged ".json" or ".db" file out of the export. Its old 
+        backups (if any) are deleted, since the file on disk is already the 
+        version that a backup made now would hold.
+        
+        INPUTS:
+        -------
+        file_path (STR) : Relative file path of the unchanged file.
+            Ex: 'worlds/porvenir/data/actors.db'
+        export_stats (DICT) : Export statistics, updated in place (see 
+            `export_all_json_and_db_files`).
+        
+        RETURNS:
+        --------
+        None
+        '''
+        self.remove_file_if_it_exists(file_path+'bak')
+        self.remove_file_if_it_exists(file_path+'append')
+        
+        export_stats['files_skipped'] += 1
+        export_stats['bytes_skipped'] += self.file_index.get_size(file_path)
+    
+    def append_changed_db_lines(self, db_file=None, export_stats=None):
+        '''
+        Exports a ".db" file by appending a new copy of each changed document 
+        to the end of the file. NeDB (the database used by Foundry) keeps the 
+        last line with a given "_id" when it loads a ".db" file, so the new 
+        copies replace the old ones. This way, the time it takes to export a 
+        file depends on the number of changed documents, not on its size.
+        Instead of a full copy of the file, the backup is a small ".dbappend" 
+        file with the size of the ".db" file before the new lines were 
+        appended (see `restore_bak_files`).
+        Nothing is appended (and the function returns False) when one of the 
+        changed lines has no "_id", or when the file would end up with more 
+        than `self.max_db_bloat` outdated lines per live document. In both 
+        cases, the file needs to be rewritten in full.
+        
+        INPUTS:
+        -------
+        db_file (STR) : Relative file path of the ".db" file.
+            Ex: 'worlds/porvenir/data/actors.db'
+        export_stats (DICT) : Export statistics, updated in place (see 
+            `export_all_json_and_db_files`).
+        
+        RETURNS:
+        --------
+        db_file_appended (BOOL) : Indicates whether or not the changed 
+            documents were appended to the file.
+        '''
+        db_file_content = self.db_files[db_file]
+        
+        # All the documents in memory are live (see `compact_db_file_lines`),
+        # and each one needs an "_id" to replace its older copies
+        lines_to_append = sorted(self.dirty_db_lines[db_file])
+        for this_db_file_line in lines_to_append:
+            if '_id' not in db_file_content[this_db_file_line]:
+                return False
+        
+        # Checking how bloated the file would get
+        number_of_live_docs = len(db_file_content)
+        number_of_outdated_lines = (self.db_outdated_lines_on_disk.get(db_file, 0)
+                                    + self.db_lines_appended.get(db_file, 0) + len(lines_to_append))
+        if number_of_outdated_lines > self.max_db_bloat * max(number_of_live_docs, 1):
+            return False
+        
+        new_lines = ''.join(json_dumps(db_file_content[this_db_file_line]) + '\n'
+                            for this_db_file_line in lines_to_append).encode('utf-8')
+        db_file_size = self.file_index.get_size(db_file)
+        
+        # Saving the size of the file before anything is appended. This file 
+        # is written first, so that the original file can always be restored.
+        # The old full backup no longer applies.
+        with open(db_file+'append','w',encoding="utf-8") as fout:
+            json.dump({'size':db_file_size}, fout)
+            fout.flush()
+            os.fsync(fout.fileno())
+        self.file_index.refresh(db_file+'append')
+        self.remove_file_if_it_exists(db_file+'bak')
+        
+        # Appending the new lines and making sure they actually reach the disk
+        with open(db_file,'r+b') as fout:
+            fout.seek(0, os.SEEK_END)
+            if db_file_size > 0:
+                fout.seek(-1, os.SEEK_END)
+                if fout.read(1) != b'\n':
+                    new_lines = b'\n' + new_lines
+            fout.write(new_lines)
+            fout.flush()
+            os.fsync(fout.fileno())
+        self.file_index.refresh(db_file)
+        
+        self.db_lines_appended[db_file] = self.db_lines_appended.get(db_file, 0) + len(lines_to_append)
+        export_stats['files_exported'] += 1
+        export_stats['files_appended'] += 1
+        export_stats['bytes_exported'] += len(new_lines)
+        export_stats['bytes_skipped'] += db_file_size
+        return True
+    
+    def remove_file_if_it_exists(self, file_path=None):
+        '''
+        Deletes a file inside the world folder (if it exists) and removes it 
+        from the file index.
+        
+        INPUTS:
+        -------
+        file_path (STR) : Relative file path of the file to be deleted.
+            Ex: 'worlds/porvenir/data/actors.dbbak'
+        
+        RETURNS:
+        --------
+        None
+        '''
+        if self.file_index.isfile(file_path):
+            os.remove(file_path)
+            self.file_index.remove(file_path)
     
     def find_refs_by_img_path(self, img_path_to_search=None):
         '''
@@ -1440,16 +5458,68 @@ class world_refs:
             image file on disk.
         
         '''
-        found_refs = []
-        for this_ref in self.all_img_refs:
-            if this_ref.img_path_for_ref == img_path_to_search:
-                found_refs.append(this_ref)
+        found_refs = list(self.refs_by_img.get(img_path_to_search, {}).values())
         return found_refs
     
+    def find_img_paths_mentioned_in_world_files(self, img_paths_to_search=None):
+        '''
+        Searches the raw text of the world's DB and JSON files on disk for 
+        mentions of specific image file paths. Unlike the reference scan, this 
+        search looks at every field of every document (including the "flags" 
+        set by modules), so it is used as a safety net when the references were
+        found without the "deep scan" mode.
+        Only the live lines of the DB files are searched (see 
+        `compact_db_file_lines`). Older copies of documents (like the ones 
+        left behind when the changes are appended to the files) and deleted
+        documents are ignored, since Foundry never reads them.
+        
+        INPUTS:
+        -------
+        img_paths_to_search (SET) : Set of image file paths to search for.
+        
+        RETURNS:
+        --------
+        mentioned_img_paths (SET) : Set of the image file paths (from 
+            `img_paths_to_search`) that are mentioned somewhere in the world's 
+            DB and JSON files.
+        '''
+        mentioned_img_paths = set()
+        if not img_paths_to_search:
+            return mentioned_img_paths
+        
+        # Every run of characters that ends with an image extension and that 
+        # doesn't contain quotes or HTML brackets is a potential file path.
+        regex_img_path = re.compile(r'[^"\'\\<>=]+?\.(?:webp|jpg|jpeg|png)', re.IGNORECASE)
+        
+        for this_file in list(self.json_files) + list(self.db_files):
+            if not self.file_exists(this_file):
+                continue
+            with open(this_file,'r',encoding="utf-8") as fp:
+                if this_file in self.db_files:
+                    these_lines = compact_db_file_lines(fp.readlines())[0]
+                else:
+                    these_lines = fp
+                for this_line in these_lines:
+                    # Lines that mention images come back parsed
+                    if not isinstance(this_line, str):
+                        this_line = json_dumps(this_line)
+                    for this_match in regex_img_path.findall(this_line):
+                        # Paths can contain spaces, so every "tail" of the 
+                        # match that comes after a space is checked as well
+                        while this_match:
+                            if this_match in img_paths_to_search:
+                                mentioned_img_paths.add(this_match)
+                            this_match = this_match.partition(' ')[2]
+        
+        return mentioned_img_paths
+    
     def move_all_imgs_in_trash_queue_to_trash(self):
         '''
         Function used to actually move the files from the `trash_queue` into the
         "_trash" folder inside the world.
+        When the references were found without the "deep scan" mode, images 
+        that are still mentioned anywhere in the world's DB and JSON files 
+        (for example, by a module's "flags") are kept in place.
         
         INPUTS:
         -------
@@ -1460,18 +5530,26 @@ class world_refs:
         None
         
         '''
+        imgs_still_mentioned = set()
+        if not self.deep_scan:
+            imgs_still_mentioned = self.find_img_paths_mentioned_in_world_files(self.trash_queue)
+            if imgs_still_mentioned:
+                print(f'Kept {len(imgs_still_mentioned)} images out of the trash because they are '
+                      'still mentioned in fields that were not scanned. Use the "deep scan" mode to update them.')
+        
         for this_file in self.trash_queue:
             
             # Making sure that the file exists and that it is actually inside 
             # the world folder. This is to prevent accidentally moving images
             # from the Foundry Core folder
-            if (os.path.isfile(this_file) and 
+            if (self.file_exists(this_file) and (this_file not in imgs_still_mentioned) and 
                 re.match('.*' + self.world_folder + '.*', this_file)):
                 temp = re.split('\\\\|/',this_file)
                 temp.insert(2,'_trash')
                 trash_name = os.path.join(*temp).replace('\\','/')
                 os.makedirs(os.path.dirname(trash_name), exist_ok=True)
                 os.rename(this_file,trash_name)
+                self.file_index.move(this_file,trash_name)
     
     def empty_trash(self,delete_unreferenced_images=False):
         '''
@@ -1492,10 +5570,13 @@ class world_refs:
         '''
         if delete_unreferenced_images:
             shutil.rmtree(self.trash_folder)
+            self.file_index.remove_folder(self.trash_folder)
 
     def restore_bak_files(self):
         '''
         Restores the ".jsonbak" and "dbbak" files to ".json" and ".db" respectively.
+        ".db" files that were exported by appending (see `append_changed_db_lines`)
+        are truncated back to the size saved in their ".dbappend" files.
         Note: this process overwrites whatever was in their places.
         
         INPUTS:
@@ -1506,8 +5587,8 @@ class world_refs:
         --------
         None
         '''
-        list_of_dbbak_files   = [str(this_path).replace('\\','/') for this_path in pathlib.Path(self.world_folder).rglob('*.dbbak')]
-        list_of_jsonbak_files = [str(this_path).replace('\\','/') for this_path in pathlib.Path(self.world_folder).rglob('*.jsonbak')]
+        list_of_dbbak_files   = self.file_index.find_files(('.dbbak',))
+        list_of_jsonbak_files = self.file_index.find_files(('.jsonbak',))
         
         for this_dbbak_file in list_of_dbbak_files:
             this_dborig_file = this_dbbak_file[:-3]
@@ -1516,6 +5597,19 @@ class world_refs:
         for this_jsonbak_file in list_of_jsonbak_files:
             this_jsonorig_file = this_jsonbak_file[:-3]
             shutil.move(this_jsonbak_file,this_jsonorig_file)
+        
+        for this_bak_file in list_of_dbbak_files + list_of_jsonbak_files:
+            self.file_index.move(this_bak_file, this_bak_file[:-3])
+        
+        # Removing the lines that were appended to the ".db" files
+        for this_dbappend_file in self.file_index.find_files(('.dbappend',)):
+            this_dborig_file = this_dbappend_file[:-6]
+            with open(this_dbappend_file,'r',encoding="utf-8") as fp:
+                this_dborig_size = json.load(fp)['size']
+            with open(this_dborig_file,'r+b') as fout:
+                fout.truncate(this_dborig_size)
+            self.remove_file_if_it_exists(this_dbappend_file)
+            self.file_index.refresh(this_dborig_file)
 
     def restore_trash_folder(self):
         '''
@@ -1536,15 +5630,19 @@ class world_refs:
             pass
             shutil.move(os.path.join(self.trash_folder,this_item),
                         os.path.join(self.world_folder,this_item))
+        
+        # Whole folders were moved around, so the file index is rebuilt
+        self.file_index.scan()
     
 
 def input_checker(user_data_folder=None, world_folder=None,
                   core_data_folder=None,ffmpeg_location=None, 
-                  delete_unreferenced_images=False):
+                  delete_unreferenced_images=False, encoder='ffmpeg'):
     '''
     Checks all of the inputs to make sure they are valid. For the folder inputs,
     it checks that the folders exist. For the FFMPEG input, it checks if the 
-    ".exe" executable file exists on disk. For the flag that determines whether 
+    ".exe" executable file exists on disk (unless another encoder is used, in 
+    which case FFMPEG is not needed). For the flag that determines whether 
     or not files will actually be deleted, it checks if the input is "y" or "n".
     
     !!!Note: This is also where the working directory is set!
@@ -1572,6 +5670,8 @@ def input_checker(user_data_folder=None, world_folder=None,
     delete_unreferenced_images (STR) : string that indicates whether or not the 
         files that got placed in the "_trash" folder should actually be deleted
         at the end of the process. This attribute expects either "y" or "n".
+    encoder (STR) : Name of the encoder used to create the ".webp" copies (see
+        `webp_encoders`). Ex: "ffmpeg" or "pillow".
         
     
     RETURNS:
@@ -1603,7 +5703,16 @@ def input_checker(user_data_folder=None, world_folder=None,
     if type(core_data_folder) != str:
         raise AssertionError('The type of value supplied for the `core_data_folder` variable is not valid. Please provide a string value.')
 
-    if type(ffmpeg_location) != str:
+    if encoder not in webp_encoders:
+        raise ValueError(f'Unknown encoder: {encoder}. Please use one of these: {", ".join(webp_encoders)}.')
+    
+    if encoder == 'pillow' and PIL_Image is None:
+        raise ImportError('The "pillow" encoder needs the `Pillow` library, which is not installed.')
+    
+    # FFMPEG is only needed by the "ffmpeg" encoder
+    if encoder != 'ffmpeg' and not ffmpeg_location:
+        ffmpeg_location = None
+    elif type(ffmpeg_location) != str:
         raise AssertionError('The type of value supplied for the `ffmpeg_location` variable is not valid. Please provide a string value.')
         
     if type(delete_unreferenced_images) != str:
@@ -1623,9 +5732,10 @@ def input_checker(user_data_folder=None, world_folder=None,
         raise NotADirectoryError(f'The `core_data_folder` supplied does not exist: {core_data_folder}')
     
     # !!! FIX HERE FOR CROSS-PLATFORM CHECKING
-    ffmpeg_location = os.path.normpath(ffmpeg_location).replace("\\","/")
-    if not os.path.isfile(ffmpeg_location):
-        raise NotADirectoryError(f'The `ffmpeg_location` supplied does not exist: {ffmpeg_location}')
+    if ffmpeg_location is not None:
+        ffmpeg_location = os.path.normpath(ffmpeg_location).replace("\\","/")
+        if encoder == 'ffmpeg' and not os.path.isfile(ffmpeg_location):
+            raise NotADirectoryError(f'The `ffmpeg_location` supplied does not exist: {ffmpeg_location}')
     
     if delete_unreferenced_images.lower() == 'y':
         delete_unreferenced_images_bool = True
@@ -1645,7 +5755,266 @@ def input_checker(user_data_folder=None, world_folder=None,
     
     return checked_inputs
 
-def find_filename_that_doesnt_exist_yet(file_path_before_extension, extension):
+def check_yes_no_flag(flag_value=None, flag_name=None):
+    '''
+    Checks a "y"/"n" flag supplied by the user and converts it to a boolean.
+    Booleans are accepted as well and are returned untouched.
+    
+    INPUTS:
+    -------
+    flag_value (STR or BOOL) : Value of the flag. Should be "y" or "n".
+    flag_name (STR) : Name of the flag. Only used in the error message.
+    
+    RETURNS:
+    --------
+    flag_bool (BOOL) : True if the flag was "y" and False if it was "n".
+    
+    EXAMPLE:
+    --------
+    # Input:
+    print(check_yes_no_flag("y", "strict_html"))
+    
+    # Output:
+    # True
+    '''
+    if type(flag_value) == bool:
+        return flag_value
+    
+    if type(flag_value) == str and flag_value.lower() == 'y':
+        return True
+    elif type(flag_value) == str and flag_value.lower() == 'n':
+        return False
+    else:
+        raise ValueError(f'The value supplied to the `{flag_name}` flag is not valid. Please type in either "y" or "n".')
+
+def check_number_of_jobs(jobs=None):
+    '''
+    Checks the number of parallel workers requested for the image conversion 
+    process. When no number is supplied, the number of CPUs on the machine is
+    used instead. Zero and negative numbers are rejected.
+    
+    INPUTS:
+    -------
+    jobs (INT, STR or None) : Number of parallel workers requested. Ex: 4 or "4".
+    
+    RETURNS:
+    --------
+    checked_jobs (INT) : Verified number of parallel workers.
+    
+    EXAMPLE:
+    --------
+    # Input:
+    print(check_number_of_jobs(None))
+    print(check_number_of_jobs("4"))
+    
+    # Output (on a machine with 8 CPUs):
+    # 8
+    # 4
+    '''
+    if jobs is None or jobs == '':
+        return os.cpu_count() or 1
+    
+    try:
+        checked_jobs = int(jobs)
+    except (TypeError, ValueError):
+        raise ValueError(f'The value supplied to the `jobs` input is not valid: {jobs}. Please provide a positive integer.')
+    
+    if checked_jobs < 1:
+        raise ValueError(f'The value supplied to the `jobs` input is not valid: {jobs}. Please provide a positive integer.')
+    
+    return checked_jobs
+
+def check_ffmpeg_batch_size(ffmpeg_batch_size=None):
+    '''
+    Checks the maximum number of images converted by one single FFMPEG call.
+    When no number is supplied, the default of 16 images is used.
+    
+    INPUTS:
+    -------
+    ffmpeg_batch_size (INT, STR or None) : Number of images per FFMPEG call. 
+        Ex: 16 or "16".
+    
+    RETURNS:
+    --------
+    checked_ffmpeg_batch_size (INT) : Verified number of images per FFMPEG call.
+    
+    EXAMPLE:
+    --------
+    # Input:
+    print(check_ffmpeg_batch_size(None))
+    print(check_ffmpeg_batch_size("1"))
+    
+    # Output:
+    # 16
+    # 1
+    '''
+    if ffmpeg_batch_size is None or ffmpeg_batch_size == '':
+        return 16
+    
+    try:
+        checked_ffmpeg_batch_size = int(ffmpeg_batch_size)
+    except (TypeError, ValueError):
+        raise ValueError(f'The value supplied to the `ffmpeg_batch_size` input is not valid: {ffmpeg_batch_size}. Please provide a positive integer.')
+    
+    if checked_ffmpeg_batch_size < 1:
+        raise ValueError(f'The value supplied to the `ffmpeg_batch_size` input is not valid: {ffmpeg_batch_size}. Please provide a positive integer.')
+    
+    return checked_ffmpeg_batch_size
+
+def check_webp_cache_size(webp_cache_size=None):
+    '''
+    Checks the maximum size (in MB) of the cache of ".webp" files. When no 
+    size is supplied, the default of 1024 MB is used.
+    
+    INPUTS:
+    -------
+    webp_cache_size (FLOAT, STR or None) : Maximum size of the cache in MB. 
+        Ex: 1024 or "500". A size of 0 turns the cache off.
+    
+    RETURNS:
+    --------
+    checked_webp_cache_size (FLOAT) : Verified maximum size of the cache in MB.
+    
+    EXAMPLE:
+    --------
+    # Input:
+    print(check_webp_cache_size(None))
+    print(check_webp_cache_size("0"))
+    
+    # Output:
+    # 1024.0
+    # 0.0
+    '''
+    if webp_cache_size is None or webp_cache_size == '':
+        return 1024.0
+    
+    try:
+        checked_webp_cache_size = float(webp_cache_size)
+    except (TypeError, ValueError):
+        raise ValueError(f'The value supplied to the `webp_cache_size` input is not valid: {webp_cache_size}. Please provide a number that is not negative.')
+    
+    if not checked_webp_cache_size >= 0:
+        raise ValueError(f'The value supplied to the `webp_cache_size` input is not valid: {webp_cache_size}. Please provide a number that is not negative.')
+    
+    return checked_webp_cache_size
+
+def check_min_webp_savings(min_webp_savings=None):
+    '''
+    Checks the minimum fraction of its size that an image needs to save when 
+    it gets converted to ".webp". When no value is supplied, any ".webp" copy 
+    that is smaller than the original image is used.
+    
+    INPUTS:
+    -------
+    min_webp_savings (FLOAT, STR or None) : Minimum savings, between 0 and 1.
+        Ex: 0.1 or "0.1" (the ".webp" copy needs to be at least 10% smaller).
+    
+    RETURNS:
+    --------
+    checked_min_webp_savings (FLOAT) : Verified minimum savings.
+    
+    EXAMPLE:
+    --------
+    # Input:
+    print(check_min_webp_savings(None))
+    print(check_min_webp_savings("0.1"))
+    
+    # Output:
+    # 0.0
+    # 0.1
+    '''
+    if min_webp_savings is None or min_webp_savings == '':
+        return 0.0
+    
+    try:
+        checked_min_webp_savings = float(min_webp_savings)
+    except (TypeError, ValueError):
+        raise ValueError(f'The value supplied to the `min_webp_savings` input is not valid: {min_webp_savings}. Please provide a number between 0 and 1.')
+    
+    if not (0 <= checked_min_webp_savings < 1):
+        raise ValueError(f'The value supplied to the `min_webp_savings` input is not valid: {min_webp_savings}. Please provide a number between 0 and 1.')
+    
+    return checked_min_webp_savings
+
+def check_target_ssim(target_ssim=None):
+    '''
+    Checks the target SSIM used to pick the quality of the ".webp" copies. 
+    When no value is supplied (or when it equals 0), the quality is not 
+    searched for.
+    
+    INPUTS:
+    -------
+    target_ssim (FLOAT, STR or None) : Target SSIM, between 0 and 1. 
+        Ex: 0.98 or "0.98"
+    
+    RETURNS:
+    --------
+    checked_target_ssim (FLOAT or None) : Verified target SSIM.
+    
+    EXAMPLE:
+    --------
+    # Input:
+    print(check_target_ssim(None))
+    print(check_target_ssim("0.98"))
+    
+    # Output:
+    # None
+    # 0.98
+    '''
+    if target_ssim is None or target_ssim == '':
+        return None
+    
+    try:
+        checked_target_ssim = float(target_ssim)
+    except (TypeError, ValueError):
+        raise ValueError(f'The value supplied to the `target_ssim` input is not valid: {target_ssim}. Please provide a number between 0 and 1.')
+    
+    if not (0 <= checked_target_ssim <= 1):
+        raise ValueError(f'The value supplied to the `target_ssim` input is not valid: {target_ssim}. Please provide a number between 0 and 1.')
+    
+    if checked_target_ssim == 0:
+        return None
+    
+    return checked_target_ssim
+
+def check_max_db_bloat(max_db_bloat=None):
+    '''
+    Checks the maximum "bloat" allowed when appending to ".db" files, which is
+    the number of outdated lines per live document that a ".db" file can hold
+    before it gets rewritten in full. When no number is supplied, 0.5 is used.
+    
+    INPUTS:
+    -------
+    max_db_bloat (FLOAT, STR or None) : Maximum bloat requested. Ex: 0.5 or "0.5".
+    
+    RETURNS:
+    --------
+    checked_max_db_bloat (FLOAT) : Verified maximum bloat.
+    
+    EXAMPLE:
+    --------
+    # Input:
+    print(check_max_db_bloat(None))
+    print(check_max_db_bloat("2"))
+    
+    # Output:
+    # 0.5
+    # 2.0
+    '''
+    if max_db_bloat is None or max_db_bloat == '':
+        return 0.5
+    
+    try:
+        checked_max_db_bloat = float(max_db_bloat)
+    except (TypeError, ValueError):
+        raise ValueError(f'The value supplied to the `max_db_bloat` input is not valid: {max_db_bloat}. Please provide a number that is zero or greater.')
+    
+    if not checked_max_db_bloat >= 0:
+        raise ValueError(f'The value supplied to the `max_db_bloat` input is not valid: {max_db_bloat}. Please provide a number that is zero or greater.')
+    
+    return checked_max_db_bloat
+
+def find_filename_that_doesnt_exist_yet(file_path_before_extension, extension, file_exists=os.path.isfile):
     '''
     Function that recursively checks if a specific filename exists or not. The 
     function keeps tacking on underscore characters ("_") until it finds a name
@@ -1662,6 +6031,9 @@ def find_filename_that_doesnt_exist_yet(file_path_before_extension, extension):
     For example, for the file located at "worlds/porvenir/art/wood-bg.jpg", the 
     `extension` would be "jpg". 
     
+    file_exists (FUNCTION) : Function used to check whether a file exists. 
+    Ex: `os.path.isfile` or `world_refs.file_exists`.
+    
     RETURNS:
     --------
     current_filename (STR) : String of the filename that doesn't yet exist on disk.
@@ -1685,16 +6057,21 @@ def find_filename_that_doesnt_exist_yet(file_path_before_extension, extension):
     '''
     current_filename = file_path_before_extension + '.' + extension
     
-    if os.path.isfile(current_filename):
+    if file_exists(current_filename):
         # Recursive call in case the current filename is found on disk
-        return find_filename_that_doesnt_exist_yet(file_path_before_extension+'_', extension)
+        return find_filename_that_doesnt_exist_yet(file_path_before_extension+'_', extension, file_exists)
     else:
         # If the current filename points to a non-existing file, we're done!
         return current_filename
 
 # Function that does all that is needed for world compression in one single command
 def one_liner_compress_world(user_data_folder=None, world_folder=None,core_data_folder=None,
-                             ffmpeg_location=None, delete_unreferenced_images=False):
+                             ffmpeg_location=None, delete_unreferenced_images=False,
+                             jobs=None, strict_html='n', deep_scan='n', append_db='n',
+                             max_db_bloat=None, compact_db='n', stream_db='n',
+                             parallel_scan='n', scan_cache='y', ffmpeg_batch_size=None,
+                             encoder='ffmpeg', webp_cache_size=None, min_webp_savings=None,
+                             auto_webp_settings='y', target_ssim=None, downscale_scenes='n'):
     '''
     Main function to compress the Foudry World. 
     
@@ -1718,6 +6095,71 @@ def one_liner_compress_world(user_data_folder=None, world_folder=None,core_data_
     delete_unreferenced_images (STR) : string that indicates whether or not the 
         files that got placed in the "_trash" folder should actually be deleted
         at the end of the process. This attribute expects either "y" or "n".
+    jobs (INT or None) : Maximum number of images that get converted at the 
+        same time. When this input is left blank (equal to "None"), the number
+        of CPUs on the machine is used.
+    strict_html (STR) : string that indicates whether the HTML chunks inside the
+        world should be parsed with BeautifulSoup instead of the faster built-in
+        parser. This attribute expects either "y" or "n".
+    deep_scan (STR) : string that indicates whether every field of every 
+        document should be searched for images, instead of only the fields that
+        Foundry uses for images. This attribute expects either "y" or "n".
+    append_db (STR) : string that indicates whether the changed documents 
+        should be appended to the end of the ".db" files instead of rewriting 
+        the whole files. This attribute expects either "y" or "n".
+    max_db_bloat (FLOAT or None) : Maximum number of outdated lines per live
+        document that appending can leave in a ".db" file before the file gets
+        rewritten in full. When this input is left blank (equal to "None"), 
+        0.5 is used.
+    compact_db (STR) : string that indicates whether the ".db" files that 
+        have outdated copies of documents or deleted documents should be 
+        rewritten, which removes those lines from disk. With "n", they are 
+        only removed from the files that are rewritten anyway (because their
+        images changed and the changes were not appended). This attribute 
+        expects either "y" or "n".
+    stream_db (STR) : string that indicates whether the documents of the ".db"
+        files should be read from disk when needed instead of being kept in
+        memory. This is slower, but it uses much less memory on huge worlds. 
+        This attribute expects either "y" or "n".
+    parallel_scan (STR) : string that indicates whether the ".db" files should 
+        be loaded and scanned by `jobs` worker processes at the same time. 
+        This attribute expects either "y" or "n".
+    scan_cache (STR) : string that indicates whether the references found in 
+        each ".db" and ".json" file should be cached inside the world folder, 
+        so that the next runs only scan the files that changed. This attribute
+        expects either "y" or "n".
+    ffmpeg_batch_size (INT, STR or None) : Maximum number of images converted 
+        by one single FFMPEG call. When this input is left blank (equal to 
+        "None"), up to 16 images are converted by each call.
+    encoder (STR) : Name of the encoder used to create the ".webp" copies. 
+        Either "ffmpeg" (calls the FFMPEG executable) or "pillow" (converts 
+        the images inside Python, using the `Pillow` library). The "pillow" 
+        encoder does not need the `ffmpeg_location` input.
+    webp_cache_size (FLOAT, STR or None) : Maximum size (in MB) of the cache 
+        of ".webp" files shared by all worlds. Images that are already in the 
+        cache are not encoded again. When this input is left blank (equal to 
+        "None"), the cache can grow up to 1024 MB. A size of 0 turns it off.
+    min_webp_savings (FLOAT, STR or None) : Fraction of the size of an image 
+        that its ".webp" copy needs to save for the image to be replaced. 
+        Ex: 0.1 means at least 10% smaller. Images whose ".webp" copies are 
+        not small enough are left as they are. When this input is left blank
+        (equal to "None"), any ".webp" copy that is smaller is used.
+    auto_webp_settings (STR) : string that indicates whether each image should
+        get its own ".webp" settings (lossless for line art and icons, and a 
+        lossy quality that depends on the image for everything else), instead
+        of the encoder's default settings. This attribute expects either "y" 
+        or "n".
+    target_ssim (FLOAT, STR or None) : When this input is set, the quality of
+        each lossy ".webp" copy is the lowest one whose SSIM (a measure of how
+        close the copy looks to the original) is at least this value. 
+        Ex: 0.98. This takes about 7 encodes per image, but the qualities are
+        cached, so they are only searched for once. When this input is left 
+        blank (equal to "None"), the quality is not searched for.
+    downscale_scenes (STR) : string that indicates whether the scene 
+        backgrounds that are bigger than their scenes should be converted at 
+        the size of the scenes (see `world_refs.downscale_scene_backgrounds`).
+        Images that are also used outside of scene backgrounds are left 
+        alone. This attribute expects either "y" or "n".
     
     RETURNS:
     --------
@@ -1732,7 +6174,7 @@ def one_liner_compress_world(user_data_folder=None, world_folder=None,core_data_
     # None
     '''
     checked_inputs = input_checker(user_data_folder,world_folder,core_data_folder,
-                                   ffmpeg_location,delete_unreferenced_images)
+                                   ffmpeg_location,delete_unreferenced_images,encoder)
     
     user_data_folder_checked = checked_inputs['user_data_folder']
     world_folder_checked = checked_inputs['world_folder']
@@ -1741,18 +6183,37 @@ def one_liner_compress_world(user_data_folder=None, world_folder=None,core_data_
     delete_unreferenced_images_checked = checked_inputs['delete_unreferenced_images']
     
     my_world_refs = world_refs(user_data_folder_checked,world_folder_checked,
-                               core_data_folder_checked,ffmpeg_location_checked)
+                               core_data_folder_checked,ffmpeg_location_checked,
+                               jobs=jobs,
+                               strict_html=check_yes_no_flag(strict_html,'strict_html'),
+                               deep_scan=check_yes_no_flag(deep_scan,'deep_scan'),
+                               append_db=check_yes_no_flag(append_db,'append_db'),
+                               max_db_bloat=max_db_bloat,
+                               compact_db=check_yes_no_flag(compact_db,'compact_db'),
+                               stream_db=check_yes_no_flag(stream_db,'stream_db'),
+                               parallel_scan=check_yes_no_flag(parallel_scan,'parallel_scan'),
+                               scan_cache=check_yes_no_flag(scan_cache,'scan_cache'),
+                               ffmpeg_batch_size=ffmpeg_batch_size,
+                               encoder=encoder,
+                               webp_cache_size=webp_cache_size,
+                               min_webp_savings=min_webp_savings,
+                               auto_webp_settings=check_yes_no_flag(auto_webp_settings,'auto_webp_settings'),
+                               target_ssim=target_ssim)
 
     #my_world_refs.find_all_img_references_in_world()
     my_world_refs.try_to_fix_all_broken_refs()
     my_world_refs.fix_incorrect_file_extensions()
     my_world_refs.fix_all_sets_of_duplicated_images()
+    if check_yes_no_flag(downscale_scenes,'downscale_scenes'):
+        my_world_refs.downscale_scene_backgrounds()
     my_world_refs.convert_all_images_to_webp_and_update_refs()
     my_world_refs.fix_all_sets_of_duplicated_images()
     my_world_refs.export_all_json_and_db_files()
     my_world_refs.add_unused_images_to_trash_queue()
     my_world_refs.move_all_imgs_in_trash_queue_to_trash()
     my_world_refs.empty_trash(delete_unreferenced_images_checked)
+    my_world_refs.hash_cache.save(my_world_refs.file_exists)
+    my_world_refs.file_index.refresh(my_world_refs.hash_cache.cache_file_path)
     
     return my_world_refs
 
@@ -50,9 +50,57 @@ parser.add_argument('-c','--core-data-folder', type=str, metavar='',
 parser.add_argument('-f','--ffmpeg-location', type=str, metavar='', 
                     help=f'Location of the FFMPEG application/executable. Ex: "{default_ffmpeg_location}"',
                     default=default_ffmpeg_location)
+parser.add_argument('-e','--encoder', type=str, metavar='', 
+                    help=r'Encoder used to convert the images to WEBP. Either "ffmpeg" (calls the FFMPEG executable) or "pillow" (converts the images inside Python and does not need FFMPEG).', 
+                    default='ffmpeg')
+parser.add_argument('-M','--webp-cache-size', type=float, metavar='', 
+                    help='Maximum size (in MB) of the cache of converted images shared by all worlds. Use 0 to turn the cache off. Defaults to 1024.', 
+                    default=None)
+parser.add_argument('-A','--auto-webp-settings', type=str, metavar='', 
+                    help=r'Flag that determines whether or not to pick the WEBP settings (lossless or lossy, and the quality) of each image based on the image itself, instead of using the same settings for every image. Should be "y" or "n".', 
+                    default='y')
+parser.add_argument('-T','--target-ssim', type=float, metavar='', 
+                    help='Lowest SSIM (similarity to the original, between 0 and 1) of the lossy WEBP copies. When set, the quality of each image is the lowest one that reaches it (ex: 0.98). By default, the quality is not searched for.', 
+                    default=None)
+parser.add_argument('-g','--downscale-scenes', type=str, metavar='', 
+                    help=r'Flag that determines whether or not to shrink the scene backgrounds that are bigger than their scenes down to the size of the scenes. Images that are also used elsewhere keep their full size. Should be "y" or "n".', 
+                    default='n')
+parser.add_argument('-m','--min-webp-savings', type=float, metavar='', 
+                    help='Fraction of its size that an image needs to save to be replaced by its WEBP copy (ex: 0.1 means at least 10%% smaller). Images whose WEBP copies are not small enough are kept. Defaults to 0.', 
+                    default=None)
 parser.add_argument('-d','--delete-unreferenced-images', type=str, metavar='', 
                     help=r'Flag that determines whether or not to delete unreferenced images. Should be "y" or "n".', 
                     default='n')
+parser.add_argument('-j','--jobs', type=int, metavar='', 
+                    help='Number of images to convert at the same time (at least 1). Defaults to the number of CPUs on the machine.', 
+                    default=None)
+parser.add_argument('-B','--ffmpeg-batch-size', type=int, metavar='', 
+                    help='Maximum number of images converted by each call to FFMPEG. Defaults to 16.', 
+                    default=None)
+parser.add_argument('-s','--strict-html', type=str, metavar='', 
+                    help=r'Flag that determines whether or not to parse HTML with BeautifulSoup instead of the built-in parser. Should be "y" or "n".', 
+                    default='n')
+parser.add_argument('-D','--deep-scan', type=str, metavar='', 
+                    help=r'Flag that determines whether or not to search every field of every document for images (slower), instead of only the fields Foundry uses for images. Should be "y" or "n".', 
+                    default='n')
+parser.add_argument('-a','--append-db', type=str, metavar='', 
+                    help=r'Flag that determines whether or not to append the changed documents to the end of the ".db" files instead of rewriting them. Should be "y" or "n".', 
+                    default='n')
+parser.add_argument('-b','--max-db-bloat', type=float, metavar='', 
+                    help='Maximum number of outdated lines per document that appending can leave in a ".db" file before it gets rewritten in full. Defaults to 0.5.', 
+                    default=None)
+parser.add_argument('-C','--compact-db', type=str, metavar='', 
+                    help=r'Flag that determines whether or not to rewrite the ".db" files that have outdated copies of documents or deleted documents, which removes those lines from disk. With "n", these lines are only kept in files that are not rewritten anyway (a file whose images changed is rewritten with only its live documents, unless the changes are appended). Should be "y" or "n".', 
+                    default='n')
+parser.add_argument('-S','--stream-db', type=str, metavar='', 
+                    help=r'Flag that determines whether or not to read the documents of the ".db" files from disk when needed instead of keeping them in memory (slower, but uses much less memory). Should be "y" or "n".', 
+                    default='n')
+parser.add_argument('-P','--parallel-scan', type=str, metavar='', 
+                    help=r'Flag that determines whether or not to load and scan the ".db" files in parallel, using as many processes as the --jobs flag. Should be "y" or "n".', 
+                    default='n')
+parser.add_argument('-R','--scan-cache', type=str, metavar='', 
+                    help=r'Flag that determines whether or not to cache the image references found in each ".db" and ".json" file, so that the next runs only scan the files that changed. Should be "y" or "n".', 
+                    default='y')
 args = parser.parse_args()
 
 # Main function - this function is run automatically when this script is run.
@@ -63,5 +111,21 @@ if __name__ == '__main__':
             world_folder=args.world_folder,
             core_data_folder=args.core_data_folder,
             ffmpeg_location=args.ffmpeg_location, 
-            delete_unreferenced_images=args.delete_unreferenced_images)
+            delete_unreferenced_images=args.delete_unreferenced_images,
+            jobs=args.jobs,
+            strict_html=args.strict_html,
+            deep_scan=args.deep_scan,
+            append_db=args.append_db,
+            max_db_bloat=args.max_db_bloat,
+            compact_db=args.compact_db,
+            stream_db=args.stream_db,
+            parallel_scan=args.parallel_scan,
+            scan_cache=args.scan_cache,
+            ffmpeg_batch_size=args.ffmpeg_batch_size,
+            encoder=args.encoder,
+            webp_cache_size=args.webp_cache_size,
+            min_webp_savings=args.min_webp_savings,
+            auto_webp_settings=args.auto_webp_settings,
+            target_ssim=args.target_ssim,
+            downscale_scenes=args.downscale_scenes)
 
@@ -0,0 +1,94 @@
+'''
+Helpers shared by the tests. Each test gets its own tiny Foundry install (a
+user data folder with one world, and a core folder) inside pytest's
+temporary folder, so the tests never touch a real world or the tool's own
+"_jwm_cache" folder.
+'''
+
+import json
+import os
+import struct
+import sys
+import zlib
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jegasus_world_manager as jwm
+
+
+def write_png(file_path, size=16, color=(255, 0, 0)):
+    '''
+    Writes a plain RGB PNG of `size`x`size` pixels filled with one colour.
+    '''
+    raw_rows = b''.join(b'\x00' + bytes(color) * size for _ in range(size))
+
+    def png_chunk(chunk_type, chunk_data):
+        return (struct.pack('>I', len(chunk_data)) + chunk_type + chunk_data
+                + struct.pack('>I', zlib.crc32(chunk_type + chunk_data) & 0xffffffff))
+
+    with open(file_path, 'wb') as fout:
+        fout.write(b'\x89PNG\r\n\x1a\n'
+                   + png_chunk(b'IHDR', struct.pack('>IIBBBBB', size, size, 8, 2, 0, 0, 0))
+                   + png_chunk(b'IDAT', zlib.compress(raw_rows))
+                   + png_chunk(b'IEND', b''))
+
+
+def write_db(file_path, documents):
+    '''
+    Writes a list of documents as a ".db" file, one compact JSON line each
+    (the same way Foundry's NeDB does).
+    '''
+    with open(file_path, 'w', encoding='utf-8') as fout:
+        for this_document in documents:
+            fout.write(json.dumps(this_document, separators=(',', ':'), ensure_ascii=False) + '\n')
+
+
+@pytest.fixture
+def foundry_folders(tmp_path, monkeypatch):
+    '''
+    Creates an empty world ("worlds/test") and a Foundry 0.7.9 core folder.
+    The tool changes the working directory, so it is restored afterwards.
+    '''
+    monkeypatch.setattr(jwm, 'tool_cache_folder', (tmp_path / 'tool_cache').as_posix())
+    monkeypatch.chdir(tmp_path)
+
+    user_data_folder = tmp_path / 'Data'
+    world_path = user_data_folder / 'worlds' / 'test'
+    (world_path / 'data').mkdir(parents=True)
+    (world_path / 'img').mkdir()
+    core_data_folder = tmp_path / 'core' / 'resources' / 'app' / 'public'
+    core_data_folder.mkdir(parents=True)
+    (core_data_folder.parent / 'package.json').write_text(json.dumps({'version': '0.7.9'}))
+    (world_path / 'world.json').write_text(json.dumps({'name': 'test', 'title': 'Test'}))
+
+    return {'user_data_folder': user_data_folder.as_posix(),
+            'world_folder': 'worlds/test',
+            'core_data_folder': core_data_folder.as_posix(),
+            'world_path': world_path}
+
+
+class half_copy_webp_encoder(jwm.webp_encoder):
+    '''
+    Encoder used by the tests instead of FFMPEG: the ".webp" copy is simply
+    the first half of the image's bytes, which is always smaller.
+    '''
+
+    encoder_name = 'half_copy'
+
+    def create_webp_copy(self, img_path=None, webp_img_path=None, webp_settings=None):
+        with open(img_path, 'rb') as fin:
+            img_bytes = fin.read()
+        with open(webp_img_path, 'wb') as fout:
+            fout.write(img_bytes[:max(1, len(img_bytes) // 2)])
+        return 0
+
+
+@pytest.fixture
+def half_copy_encoder(monkeypatch):
+    '''
+    Makes the `half_copy_webp_encoder` available by name (see `get_webp_encoder`).
+    '''
+    monkeypatch.setitem(jwm.webp_encoders, 'half_copy', half_copy_webp_encoder)
+    return 'half_copy'
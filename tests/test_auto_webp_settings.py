@@ -0,0 +1,111 @@
+'''
+Tests for picking the lossless or lossy settings of each image from the image
+itself (see `get_img_stats` and `choose_webp_settings`).
+'''
+
+import json
+import struct
+import zlib
+
+import pytest
+
+import jegasus_world_manager as jwm
+
+from conftest import write_db
+
+
+def write_raw_png(file_path, width, height, color_type, pixel_bytes, palette=None):
+    '''
+    Writes an 8-bit PNG from the bytes of its pixels (`pixel_bytes(x, y)`).
+    '''
+    raw_rows = b''.join(b'\x00' + b''.join(pixel_bytes(x, y) for x in range(width)) for y in range(height))
+
+    def png_chunk(chunk_type, chunk_data):
+        return (struct.pack('>I', len(chunk_data)) + chunk_type + chunk_data
+                + struct.pack('>I', zlib.crc32(chunk_type + chunk_data) & 0xffffffff))
+
+    with open(file_path, 'wb') as fout:
+        fout.write(b'\x89PNG\r\n\x1a\n'
+                   + png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0))
+                   + (png_chunk(b'PLTE', palette) if palette else b'')
+                   + png_chunk(b'IDAT', zlib.compress(raw_rows))
+                   + png_chunk(b'IEND', b''))
+
+
+def write_jpeg_header(file_path, width, height):
+    '''
+    Writes the start of a JPEG (the JFIF and "start of frame" markers), which
+    is all that `get_img_stats` reads.
+    '''
+    with open(file_path, 'wb') as fout:
+        fout.write(b'\xff\xd8' + b'\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00'
+                   + b'\xff\xc0\x00\x11\x08' + struct.pack('>HH', height, width) + b'\x03' + b'\x00' * 9
+                   + b'\xff\xd9')
+
+
+@pytest.fixture
+def mixed_images_world(foundry_folders):
+    '''
+    World with one image of each kind, referenced from "actors.db".
+    '''
+    def create_world():
+        img_path = foundry_folders['world_path'] / 'img'
+        write_raw_png(img_path / 'palette.png', 100, 100, 3, lambda x, y: bytes([(x + y) % 16]),
+                      palette=bytes(range(48)))
+        # Transparent border around an opaque, colourful token
+        write_raw_png(img_path / 'token.png', 100, 100, 6,
+                      lambda x, y: bytes([x, y, (x * y) % 256, 255 if 10 <= x < 90 and 10 <= y < 90 else 0]))
+        write_raw_png(img_path / 'painting.png', 100, 100, 2, lambda x, y: bytes([x * 2, y * 2, (x * y) % 256]))
+        write_raw_png(img_path / 'flat.png', 100, 100, 2, lambda x, y: bytes([(x // 20) * 40, 0, 0]))
+        write_raw_png(img_path / 'icon.png', 32, 32, 6, lambda x, y: bytes([x * 8, y * 8, 0, x * 8]))
+        write_jpeg_header(img_path / 'photo.jpg', 800, 600)
+        write_jpeg_header(img_path / 'huge_map.jpg', 5000, 4000)
+        write_db(foundry_folders['world_path'] / 'data' / 'actors.db',
+                 [{'_id': this_name, 'img': f'worlds/test/img/{this_name}'}
+                  for this_name in ('palette.png', 'token.png', 'painting.png', 'flat.png', 'icon.png',
+                                    'photo.jpg', 'huge_map.jpg')])
+    return create_world
+
+
+def get_chosen_settings(foundry_folders, encoder):
+    jwm.one_liner_compress_world(foundry_folders['user_data_folder'], foundry_folders['world_folder'],
+                                 foundry_folders['core_data_folder'], None, 'n', encoder=encoder,
+                                 webp_cache_size=0)
+    with open(foundry_folders['world_path'] / '_jwm_cache' / 'conversion_report.json', encoding='utf-8') as fin:
+        return {this_img_path.rsplit('/', 1)[-1]: this_entry['webp_settings']
+                for this_img_path, this_entry in json.load(fin)['images'].items()}
+
+
+def test_settings_follow_the_kind_of_image(foundry_folders, half_copy_encoder, mixed_images_world):
+    mixed_images_world()
+    chosen_settings = get_chosen_settings(foundry_folders, half_copy_encoder)
+
+    lossless = {'lossless': True, 'quality': 100}
+    assert chosen_settings['palette.png'] == lossless
+    assert chosen_settings['icon.png'] == lossless
+    assert chosen_settings['token.png'] == {'lossless': False, 'quality': 85}
+    assert chosen_settings['painting.png'] == {'lossless': False, 'quality': 80}
+    assert chosen_settings['photo.jpg'] == {'lossless': False, 'quality': 80}
+    assert chosen_settings['huge_map.jpg'] == {'lossless': False, 'quality': 75}
+    # The colours of an RGB PNG can only be counted with Pillow
+    assert chosen_settings['flat.png'] == (lossless if jwm.PIL_Image is not None
+                                           else {'lossless': False, 'quality': 80})
+
+
+def test_settings_are_the_same_on_a_rerun(foundry_folders, half_copy_encoder, mixed_images_world):
+    mixed_images_world()
+    first_settings = get_chosen_settings(foundry_folders, half_copy_encoder)
+
+    # Restoring the world as it was (the scan and hash caches are kept)
+    for this_file in (foundry_folders['world_path'] / 'img').iterdir():
+        this_file.unlink()
+    mixed_images_world()
+    assert get_chosen_settings(foundry_folders, half_copy_encoder) == first_settings
+
+
+@pytest.mark.skipif(jwm.PIL_Image is None, reason='Pillow is not installed')
+def test_fully_opaque_alpha_channel_is_not_transparency(tmp_path):
+    write_raw_png(tmp_path / 'opaque.png', 100, 100, 6, lambda x, y: bytes([x, y, (x * y) % 256, 255]))
+    img_stats = jwm.get_img_stats((tmp_path / 'opaque.png').as_posix())
+    assert img_stats['has_alpha'] is False
+    assert jwm.choose_webp_settings(img_stats) == {'lossless': False, 'quality': 80}
@@ -0,0 +1,85 @@
+'''
+Tests for leaving the outdated and deleted lines of the ".db" files out (see
+`compact_db_file_lines` and `streamed_db_file`).
+'''
+
+import json
+
+import pytest
+
+import jegasus_world_manager as jwm
+
+from conftest import write_db, write_png
+
+DB_FILE_LINES = ['{"$$indexCreated":{"fieldName":"name","unique":false,"sparse":false}}\n',
+                 '{"_id":"a","img":"x.png"}\n',
+                 '{"_id":"b","img":"y.png"}\n',
+                 '\n',
+                 '{"_id":"c","name":"Bob"}\n',
+                 '{"_id":"a","img":"x.webp"}\n',
+                 '{"_id":"d","name":"Élodie","flags":{"some-module":{"$$deleted":true}}}\n',
+                 '{"$$deleted":true,"_id":"b"}\n',
+                 '{"items":[{"_id":"i1"}],"_id":"e","img":"z.png"}\n',
+                 '{"$$indexCreated":{"fieldName":"folder","unique":false,"sparse":false}}\n']
+
+
+def test_live_lines_keep_their_order():
+    live_db_file_lines, lines_removed, bytes_removed = jwm.compact_db_file_lines(DB_FILE_LINES)
+
+    assert live_db_file_lines == ['{"$$indexCreated":{"fieldName":"name","unique":false,"sparse":false}}',
+                                  '{"_id":"c","name":"Bob"}',
+                                  {'_id': 'a', 'img': 'x.webp'},
+                                  '{"_id":"d","name":"Élodie","flags":{"some-module":{"$$deleted":true}}}',
+                                  {'items': [{'_id': 'i1'}], '_id': 'e', 'img': 'z.png'},
+                                  '{"$$indexCreated":{"fieldName":"folder","unique":false,"sparse":false}}']
+    # The first copy of "a", both lines of "b" and the blank line
+    assert lines_removed == 4
+    assert bytes_removed == sum(len(DB_FILE_LINES[this_line].encode('utf-8')) for this_line in (1, 2, 3, 7))
+
+
+def test_document_added_again_after_its_tombstone_is_live():
+    live_db_file_lines, lines_removed, _ = jwm.compact_db_file_lines(['{"_id":"a","name":"Old"}\n',
+                                                                      '{"$$deleted":true,"_id":"a"}\n',
+                                                                      '{"_id":"a","name":"New"}\n'])
+    assert live_db_file_lines == ['{"_id":"a","name":"New"}']
+    assert lines_removed == 2
+
+
+@pytest.mark.parametrize('db_file_line, expected_result', [('{"$$deleted":true,"_id":"a"}', True),
+                                                           ('{"_id":"a","$$deleted":true}', True),
+                                                           ('{"_id":"a","flags":{"x":{"$$deleted":true}}}', False),
+                                                           ('{"_id":"a","name":"\\"$$deleted\\":true"}', False),
+                                                           ('{"_id":"a","$$deleted":false}', False)])
+def test_only_top_level_tombstones_count(db_file_line, expected_result):
+    assert jwm.is_db_line_deleted(db_file_line) is expected_result
+    assert jwm.is_db_line_deleted(db_file_line, json.loads(db_file_line)) is expected_result
+
+
+def test_streamed_file_keeps_the_same_lines(tmp_path):
+    (tmp_path / 'actors.db').write_text(''.join(DB_FILE_LINES), encoding='utf-8')
+    my_db_file = jwm.streamed_db_file((tmp_path / 'actors.db').as_posix())
+    live_db_file_lines, lines_removed, bytes_removed = jwm.compact_db_file_lines(DB_FILE_LINES)
+
+    assert list(my_db_file) == live_db_file_lines
+    assert (my_db_file.lines_removed, my_db_file.bytes_removed) == (lines_removed, bytes_removed)
+
+
+@pytest.mark.parametrize('compact_db', ['n', 'y'])
+def test_compact_db_only_decides_for_files_that_are_not_rewritten_anyway(foundry_folders, half_copy_encoder,
+                                                                          compact_db):
+    world_path = foundry_folders['world_path']
+    write_png(world_path / 'img' / 'map.png')
+    # "actors.db" has no images to convert, "scenes.db" does
+    write_db(world_path / 'data' / 'actors.db', [{'_id': 'a', 'name': 'Old'}, {'_id': 'a', 'name': 'New'}])
+    write_db(world_path / 'data' / 'scenes.db', [{'_id': 's', 'name': 'Old'},
+                                                 {'_id': 's', 'name': 'New', 'img': 'worlds/test/img/map.png'}])
+
+    jwm.one_liner_compress_world(foundry_folders['user_data_folder'], foundry_folders['world_folder'],
+                                 foundry_folders['core_data_folder'], None, 'n', compact_db=compact_db,
+                                 encoder=half_copy_encoder, webp_cache_size=0)
+
+    actors_db_lines = (world_path / 'data' / 'actors.db').read_text(encoding='utf-8').splitlines()
+    scenes_db_lines = (world_path / 'data' / 'scenes.db').read_text(encoding='utf-8').splitlines()
+    assert len(actors_db_lines) == (2 if compact_db == 'n' else 1)
+    assert [json.loads(this_line) for this_line in scenes_db_lines] == [{'_id': 's', 'name': 'New',
+                                                                         'img': 'worlds/test/img/map.webp'}]
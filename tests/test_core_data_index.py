@@ -0,0 +1,67 @@
+'''
+Tests for the saved index of the Foundry Core Data folder (see `core_data_index`).
+'''
+
+import json
+import os
+
+import jegasus_world_manager as jwm
+
+
+def make_core_data_folder(root_folder, file_paths, foundry_version='0.7.9'):
+    core_data_folder = root_folder / 'resources' / 'app' / 'public'
+    for this_file_path in file_paths:
+        (core_data_folder / this_file_path).parent.mkdir(parents=True, exist_ok=True)
+        (core_data_folder / this_file_path).write_bytes(b'x')
+    (core_data_folder.parent / 'package.json').write_text(json.dumps({'version': foundry_version}))
+    return core_data_folder.as_posix()
+
+
+def test_index_of_another_install_with_the_same_version_is_not_reused(tmp_path):
+    cache_folder = (tmp_path / 'tool_cache').as_posix()
+    first_core_folder = make_core_data_folder(tmp_path / 'first', ['icons/svg/mystery.png'])
+    second_core_folder = make_core_data_folder(tmp_path / 'second', ['icons/svg/mystery-man.svg',
+                                                                     'icons/svg/d20.svg'])
+
+    first_index = jwm.core_data_index(first_core_folder, cache_folder)
+    second_index = jwm.core_data_index(second_core_folder, cache_folder)
+
+    assert first_index.index_file_path != second_index.index_file_path
+    assert not second_index.isfile('icons/svg/mystery.png')
+    assert second_index.isfile('icons/svg/mystery-man.svg') and second_index.isfile('icons/svg/d20.svg')
+    assert len(os.listdir(cache_folder)) == 2
+
+
+def test_saved_index_is_reused_until_the_folder_changes(tmp_path, monkeypatch):
+    cache_folder = (tmp_path / 'tool_cache').as_posix()
+    core_data_folder = make_core_data_folder(tmp_path / 'foundry', ['icons/svg/mystery-man.svg'])
+    jwm.core_data_index(core_data_folder, cache_folder)
+
+    # Loading the saved index doesn't walk the folder again
+    def fail_build(self):
+        raise AssertionError('The index should not be built again')
+    with monkeypatch.context() as patch:
+        patch.setattr(jwm.core_data_index, 'build', fail_build)
+        assert jwm.core_data_index(core_data_folder, cache_folder).isfile('icons/svg/mystery-man.svg')
+
+    # Updating Foundry adds a new folder, which changes the fingerprint
+    (tmp_path / 'foundry' / 'resources' / 'app' / 'public' / 'sounds').mkdir()
+    (tmp_path / 'foundry' / 'resources' / 'app' / 'public' / 'sounds' / 'dice.wav').write_bytes(b'x')
+    assert jwm.core_data_index(core_data_folder, cache_folder).isfile('sounds/dice.wav')
+
+
+def test_index_saved_by_hand_for_another_folder_is_ignored(tmp_path):
+    cache_folder = tmp_path / 'tool_cache'
+    core_data_folder = make_core_data_folder(tmp_path / 'foundry', ['icons/svg/mystery-man.svg'])
+    index_file_path = jwm.core_data_index(core_data_folder, cache_folder.as_posix()).index_file_path
+
+    with open(index_file_path, encoding='utf-8') as fin:
+        saved_index = json.load(fin)
+    saved_index['core_data_folder'] = '/somewhere/else'
+    saved_index['files'] = ['icons/svg/mystery.png']
+    with open(index_file_path, 'w', encoding='utf-8') as fout:
+        json.dump(saved_index, fout)
+
+    my_core_index = jwm.core_data_index(core_data_folder, cache_folder.as_posix())
+    assert my_core_index.isfile('icons/svg/mystery-man.svg')
+    assert not my_core_index.isfile('icons/svg/mystery.png')
@@ -0,0 +1,57 @@
+'''
+Tests for exporting only the ".json" & ".db" files that were changed (see
+`world_refs.export_all_json_and_db_files`).
+'''
+
+import json
+import os
+
+import jegasus_world_manager as jwm
+
+from conftest import write_db, write_png
+
+
+def test_only_changed_files_are_backed_up_and_rewritten(foundry_folders, half_copy_encoder):
+    world_path = foundry_folders['world_path']
+    write_png(world_path / 'img' / 'map.png', color=(1, 1, 1))
+    write_png(world_path / 'img' / 'bg.png', size=20, color=(2, 2, 2))
+    (world_path / 'world.json').write_text(json.dumps({'name': 'test', 'background': 'worlds/test/img/bg.png'}))
+    (world_path / 'descr.json').write_text(json.dumps({'description': 'No images here'}))
+    write_db(world_path / 'data' / 'actors.db', [{'_id': 'a', 'img': 'worlds/test/img/map.png'},
+                                                 {'_id': 'b', 'name': 'No image'}])
+    write_db(world_path / 'data' / 'items.db', [{'_id': 'i', 'name': 'No image'}])
+    # A broken reference is not changed, so its file is not either
+    write_db(world_path / 'data' / 'journal.db', [{'_id': 'j', 'img': 'worlds/test/img/gone.png'}])
+    # An old backup of an unchanged file must not be restored over it later
+    (world_path / 'data' / 'items.dbbak').write_text('outdated\n')
+
+    dirty_files = {'world.json': None, 'data/actors.db': None}
+    clean_files = {'descr.json': None, 'data/items.db': None, 'data/journal.db': None}
+    for these_files in (dirty_files, clean_files):
+        for this_file in these_files:
+            these_files[this_file] = (world_path / this_file).read_bytes()
+    clean_mtimes = {this_file: os.stat(world_path / this_file).st_mtime_ns for this_file in clean_files}
+
+    my_world_refs = jwm.world_refs(foundry_folders['user_data_folder'], foundry_folders['world_folder'],
+                                   foundry_folders['core_data_folder'], None,
+                                   encoder=half_copy_encoder, webp_cache_size=0)
+    my_world_refs.convert_all_images_to_webp_and_update_refs()
+    export_stats = my_world_refs.export_all_json_and_db_files()
+
+    for this_file, this_content in dirty_files.items():
+        assert (world_path / (this_file + 'bak')).read_bytes() == this_content
+        assert b'.webp' in (world_path / this_file).read_bytes()
+    for this_file, this_content in clean_files.items():
+        assert not (world_path / (this_file + 'bak')).exists()
+        assert (world_path / this_file).read_bytes() == this_content
+        assert os.stat(world_path / this_file).st_mtime_ns == clean_mtimes[this_file]
+    assert not my_world_refs.file_exists('worlds/test/data/items.dbbak')
+
+    assert export_stats == {'files_exported': 2,
+                            'bytes_exported': sum(os.path.getsize(world_path / this_file) for this_file in dirty_files),
+                            'files_appended': 0,
+                            'files_skipped': 3,
+                            'bytes_skipped': sum(len(this_content) for this_content in clean_files.values())}
+
+    # Nothing is left to export
+    assert my_world_refs.export_all_json_and_db_files()['files_exported'] == 0
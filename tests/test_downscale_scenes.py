@@ -0,0 +1,69 @@
+'''
+Tests for shrinking the scene backgrounds that are bigger than their scenes
+(see `world_refs.downscale_scene_backgrounds`).
+'''
+
+import pytest
+
+import jegasus_world_manager as jwm
+
+from conftest import write_db, write_png
+
+
+@pytest.fixture
+def scenes_world(foundry_folders):
+    world_path = foundry_folders['world_path']
+    for img_number, (this_img_name, this_size) in enumerate([('big.png', 200), ('shared_with_tile.png', 200),
+                                                             ('shared_with_journal.png', 200), ('small.png', 50),
+                                                             ('two_scenes.png', 200)]):
+        write_png(world_path / 'img' / this_img_name, size=this_size, color=(img_number, 0, 0))
+    write_db(world_path / 'data' / 'scenes.db',
+             [{'_id': 's1', 'img': 'worlds/test/img/big.png', 'width': 100, 'height': 80},
+              {'_id': 's2', 'img': 'worlds/test/img/shared_with_tile.png', 'width': 100, 'height': 80,
+               'tiles': [{'_id': 't1', 'img': 'worlds/test/img/shared_with_tile.png'}]},
+              {'_id': 's3', 'img': 'worlds/test/img/shared_with_journal.png', 'width': 100, 'height': 80},
+              {'_id': 's4', 'img': 'worlds/test/img/small.png', 'width': 100, 'height': 80},
+              {'_id': 's5', 'img': 'worlds/test/img/two_scenes.png', 'width': 100, 'height': 80},
+              {'_id': 's6', 'img': 'worlds/test/img/two_scenes.png', 'width': 150, 'height': 60}])
+    write_db(world_path / 'data' / 'journal.db',
+             [{'_id': 'j1', 'content': '<p><img src="worlds/test/img/shared_with_journal.png"></p>'}])
+    return foundry_folders
+
+
+def compress_world(foundry_folders, encoder, downscale_scenes='y'):
+    return jwm.one_liner_compress_world(foundry_folders['user_data_folder'], foundry_folders['world_folder'],
+                                        foundry_folders['core_data_folder'], None, 'n', encoder=encoder,
+                                        webp_cache_size=0, downscale_scenes=downscale_scenes)
+
+
+def test_only_backgrounds_used_by_scenes_alone_are_downscaled(scenes_world, half_copy_encoder):
+    my_world_refs = compress_world(scenes_world, half_copy_encoder)
+
+    assert my_world_refs.scene_background_sizes == {'worlds/test/img/big.png': [100, 80],
+                                                    'worlds/test/img/two_scenes.png': [150, 80]}
+    webp_settings = {this_img_path: this_entry['webp_settings']
+                     for this_img_path, this_entry in my_world_refs.conversion_report['images'].items()}
+    for this_img_name, this_size in [('big.png', (100, 80)), ('two_scenes.png', (150, 80))]:
+        this_webp_settings = webp_settings[f'worlds/test/img/{this_img_name}']
+        assert (this_webp_settings['width'], this_webp_settings['height']) == this_size
+    for this_img_name in ('shared_with_tile.png', 'shared_with_journal.png', 'small.png'):
+        assert 'width' not in (webp_settings[f'worlds/test/img/{this_img_name}'] or {})
+
+
+def test_nothing_is_downscaled_without_the_flag(scenes_world, half_copy_encoder):
+    my_world_refs = compress_world(scenes_world, half_copy_encoder, downscale_scenes='n')
+
+    assert not any('width' in (this_entry['webp_settings'] or {})
+                   for this_entry in my_world_refs.conversion_report['images'].values())
+
+
+@pytest.mark.skipif(jwm.PIL_Image is None, reason='Pillow is not installed')
+def test_downscaled_copies_have_the_size_of_the_scene(scenes_world):
+    compress_world(scenes_world, 'pillow')
+
+    img_folder = scenes_world['world_path'] / 'img'
+    assert jwm.get_webp_img_size((img_folder / 'big.webp').as_posix()) == (100, 80)
+    assert jwm.get_webp_img_size((img_folder / 'two_scenes.webp').as_posix()) == (150, 80)
+    assert jwm.get_webp_img_size((img_folder / 'shared_with_tile.webp').as_posix()) == (200, 200)
+    assert jwm.get_webp_img_size((img_folder / 'shared_with_journal.webp').as_posix()) == (200, 200)
+    assert jwm.get_webp_img_size((img_folder / 'small.webp').as_posix()) == (50, 50)
@@ -0,0 +1,27 @@
+'''
+Tests for finding duplicated image files (see `find_duplicated_files`).
+'''
+
+import pytest
+
+import jegasus_world_manager as jwm
+
+from conftest import write_png
+
+
+@pytest.mark.parametrize('use_hash_cache', [False, True])
+def test_duplicated_files_are_grouped_by_full_hash(tmp_path, monkeypatch, use_hash_cache):
+    monkeypatch.chdir(tmp_path)
+    write_png(tmp_path / 'a.png', color=(1, 2, 3))
+    write_png(tmp_path / 'b.png', color=(9, 9, 9))
+    write_png(tmp_path / 'c.png', color=(1, 2, 3))
+    write_png(tmp_path / 'd.png', size=20)
+    # Same size and same beginning and end as "f.bin", but different content
+    (tmp_path / 'e.bin').write_bytes(b'x' * 100 + b'1' + b'x' * 100)
+    (tmp_path / 'f.bin').write_bytes(b'x' * 100 + b'2' + b'x' * 100)
+
+    hash_cache = jwm.img_hash_cache('hash_cache.json') if use_hash_cache else None
+    duplicated_files = jwm.find_duplicated_files(['a.png', 'b.png', 'c.png', 'd.png', 'e.bin', 'f.bin', 'a.png'],
+                                                 hash_cache=hash_cache, partial_hash_size=8)
+
+    assert duplicated_files == {jwm.get_full_hash('a.png'): ['a.png', 'c.png']}
@@ -0,0 +1,132 @@
+'''
+Tests for the command lines sent to FFMPEG by `ffmpeg_webp_encoder`.
+'''
+
+import json
+import os
+import shutil
+import stat
+import sys
+
+import pytest
+
+import jegasus_world_manager as jwm
+
+from conftest import write_png
+
+
+@pytest.fixture
+def recording_ffmpeg(tmp_path):
+    '''
+    Stand-in for FFMPEG that records its arguments and writes every output
+    file (the last path after each "libwebp" codec option).
+    '''
+    ffmpeg_location = tmp_path / 'ffmpeg'
+    ffmpeg_location.write_text(
+        f'#!{sys.executable}\n'
+        'import json, sys\n'
+        'with open(sys.argv[0] + ".calls", "a") as fout:\n'
+        '    fout.write(json.dumps(sys.argv[1:]) + "\\n")\n'
+        'args = sys.argv[1:]\n'
+        'for i, arg in enumerate(args):\n'
+        '    if arg == "libwebp":\n'
+        '        output = [a for a in args[i + 1:] if a.endswith(".webp")][0]\n'
+        '        open(output, "wb").write(b"RIFF")\n')
+    ffmpeg_location.chmod(ffmpeg_location.stat().st_mode | stat.S_IEXEC)
+
+    def get_calls():
+        with open(str(ffmpeg_location) + '.calls') as fin:
+            return [json.loads(this_line) for this_line in fin]
+
+    return str(ffmpeg_location), get_calls
+
+
+@pytest.mark.skipif(os.name == 'nt', reason='the stand-in FFMPEG is a Python script')
+def test_file_paths_are_passed_as_separate_arguments(tmp_path, recording_ffmpeg):
+    ffmpeg_location, get_calls = recording_ffmpeg
+    img_path = (tmp_path / 'it\'s a "map" $HOME.png').as_posix()
+    webp_img_path = (tmp_path / 'it\'s a "map" $HOME.webp').as_posix()
+
+    my_encoder = jwm.get_webp_encoder('ffmpeg', ffmpeg_location)
+    webp_settings = {'lossless': False, 'quality': 80, 'width': 200, 'height': 100}
+    assert my_encoder.create_webp_copy(img_path, webp_img_path, webp_settings) == 0
+    assert os.path.isfile(webp_img_path)
+
+    assert get_calls() == [['-y', '-i', img_path, '-c:v', 'libwebp',
+                            '-vf', 'scale=200:100:flags=lanczos', '-lossless', '0', '-quality', '80',
+                            webp_img_path, '-hide_banner', '-loglevel', 'error']]
+
+
+@pytest.mark.skipif(os.name == 'nt', reason='the stand-in FFMPEG is a Python script')
+def test_batch_call_maps_each_input_to_its_own_output(tmp_path, recording_ffmpeg):
+    ffmpeg_location, get_calls = recording_ffmpeg
+    img_paths = [(tmp_path / f'token {img_number}.png').as_posix() for img_number in range(3)]
+    webp_img_paths = [(tmp_path / f'token {img_number}.webp').as_posix() for img_number in range(3)]
+    webp_settings_list = [{'lossless': True, 'quality': 100}, None, {'lossless': False, 'quality': 60}]
+
+    my_encoder = jwm.get_webp_encoder('ffmpeg', ffmpeg_location)
+    assert my_encoder.create_webp_copies_in_batch(img_paths, webp_img_paths, webp_settings_list) == [0, 0, 0]
+
+    assert get_calls() == [['-y', '-hide_banner', '-loglevel', 'error',
+                            '-i', img_paths[0], '-i', img_paths[1], '-i', img_paths[2],
+                            '-map', '0:v:0', '-c:v', 'libwebp', '-lossless', '1', webp_img_paths[0],
+                            '-map', '1:v:0', '-c:v', 'libwebp', webp_img_paths[1],
+                            '-map', '2:v:0', '-c:v', 'libwebp', '-lossless', '0', '-quality', '60', webp_img_paths[2]]]
+
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None, reason='FFMPEG is not on the PATH')
+def test_batch_call_works_with_real_ffmpeg(tmp_path):
+    img_paths = []
+    for img_number, (size, color) in enumerate([(16, (255, 0, 0)), (40, (0, 128, 255)), (24, (10, 200, 10))]):
+        img_paths.append((tmp_path / f'token {img_number}.png').as_posix())
+        write_png(img_paths[-1], size=size, color=color)
+    # A broken image in the middle of the batch must only fail itself
+    broken_img_path = (tmp_path / 'broken.png').as_posix()
+    with open(broken_img_path, 'wb') as fout:
+        fout.write(b'\x89PNG\r\n\x1a\nnot really a png')
+    img_paths.insert(1, broken_img_path)
+    webp_img_paths = [this_img_path[:-len('.png')] + '.webp' for this_img_path in img_paths]
+    webp_settings_list = [{'lossless': True, 'quality': 100}, None,
+                          {'lossless': False, 'quality': 60, 'width': 20, 'height': 10}, None]
+
+    my_encoder = jwm.get_webp_encoder('ffmpeg', shutil.which('ffmpeg'))
+    return_codes = my_encoder.create_webp_copies_in_batch(img_paths, webp_img_paths, webp_settings_list)
+
+    assert [this_code == 0 for this_code in return_codes] == [True, False, True, True]
+    for this_webp_img_path in (webp_img_paths[0], webp_img_paths[2], webp_img_paths[3]):
+        with open(this_webp_img_path, 'rb') as fin:
+            webp_header = fin.read(30)
+        assert webp_header[:4] == b'RIFF' and webp_header[8:12] == b'WEBP'
+    assert jwm.get_webp_img_size(webp_img_paths[2]) == (20, 10)
+    assert jwm.get_webp_img_size(webp_img_paths[3]) == (24, 24)
+
+
+@pytest.mark.skipif(os.name == 'nt', reason='the stand-in FFMPEG is a Python script')
+def test_ssim_scales_the_original_to_the_size_of_the_copy(tmp_path, recording_ffmpeg):
+    ffmpeg_location, get_calls = recording_ffmpeg
+    webp_img_path = (tmp_path / 'map.webp').as_posix()
+    # Header of a 40x30 lossless WEBP
+    with open(webp_img_path, 'wb') as fout:
+        fout.write(b'RIFF\x00\x00\x00\x00WEBPVP8L\x00\x00\x00\x00\x2f'
+                   + (39 | (29 << 14)).to_bytes(4, 'little') + b'\x00' * 5)
+    my_encoder = jwm.get_webp_encoder('ffmpeg', ffmpeg_location)
+    # The stand-in never prints an SSIM
+    assert my_encoder.get_ssim('map.png', webp_img_path) is None
+    assert my_encoder.get_ssim('map.png', 'not_a_webp.webp') is None
+
+    filter_graphs = [this_call[this_call.index('-lavfi') + 1] for this_call in get_calls()]
+    assert filter_graphs[0] == '[1:v]scale=40:30:flags=lanczos[original];[0:v][original]ssim'
+    assert 'scale=rw:rh' in filter_graphs[1]
+    assert not any('scale2ref' in this_graph for this_graph in filter_graphs)
+
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None, reason='FFMPEG is not on the PATH')
+def test_ssim_of_resized_copy_works_with_real_ffmpeg(tmp_path):
+    img_path = (tmp_path / 'map.png').as_posix()
+    webp_img_path = (tmp_path / 'map.webp').as_posix()
+    write_png(img_path, size=64, color=(30, 60, 90))
+
+    my_encoder = jwm.get_webp_encoder('ffmpeg', shutil.which('ffmpeg'))
+    assert my_encoder.create_webp_copy(img_path, webp_img_path, {'lossless': False, 'quality': 90,
+                                                                 'width': 32, 'height': 32}) == 0
+    assert my_encoder.get_ssim(img_path, webp_img_path) > 0.9
@@ -0,0 +1,58 @@
+'''
+Tests for the in-memory table of the files of the world (see
+`world_file_index`), which has to follow every file the tool creates, moves,
+renames or deletes.
+'''
+
+import os
+
+import pytest
+
+import jegasus_world_manager as jwm
+
+from conftest import write_db, write_png
+
+
+def test_moves_and_renames_update_the_table(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'world' / 'img').mkdir(parents=True)
+    write_png(tmp_path / 'world' / 'img' / 'a.png')
+    write_png(tmp_path / 'world' / 'img' / 'b.png')
+    my_file_index = jwm.world_file_index('world')
+
+    os.rename('world/img/a.png', 'world/img/renamed.png')
+    my_file_index.move('world/img/a.png', 'world/img/renamed.png')
+    os.makedirs('world/_trash/img')
+    os.rename('world/img/b.png', 'world/_trash/img/b.png')
+    my_file_index.move('world/img/b.png', 'world/_trash/img/b.png')
+
+    assert not my_file_index.isfile('world/img/a.png') and not my_file_index.isfile('world/img/b.png')
+    assert my_file_index.isfile('world/img/renamed.png') and my_file_index.isfile('world/_trash/img/b.png')
+    assert my_file_index.files == jwm.world_file_index('world').files
+    assert my_file_index.find_files(('.png',), ('world/_trash',)) == ['world/img/renamed.png']
+
+    my_file_index.remove_folder('world/_trash')
+    assert list(my_file_index.files) == [my_file_index.get_key('world/img/renamed.png')]
+
+
+@pytest.mark.parametrize('append_db', ['n', 'y'])
+def test_table_matches_the_disk_after_a_full_run(foundry_folders, half_copy_encoder, append_db):
+    world_path = foundry_folders['world_path']
+    write_png(world_path / 'img' / 'map.png', color=(1, 1, 1))
+    write_png(world_path / 'img' / 'copy.png', color=(1, 1, 1))
+    # A PNG saved as ".jpg", which gets renamed
+    write_png(world_path / 'img' / 'wrong.jpg', color=(2, 2, 2))
+    write_png(world_path / 'img' / 'unused.png', color=(3, 3, 3))
+    write_db(world_path / 'data' / 'actors.db', [{'_id': 'a', 'img': 'worlds/test/img/map.png'},
+                                                 {'_id': 'b', 'img': 'worlds/test/img/copy.png'},
+                                                 {'_id': 'c', 'img': 'worlds/test/img/wrong.jpg'},
+                                                 {'_id': 'd', 'name': 'No image'},
+                                                 {'_id': 'e', 'name': 'No image either'}])
+
+    my_world_refs = jwm.one_liner_compress_world(foundry_folders['user_data_folder'], foundry_folders['world_folder'],
+                                                 foundry_folders['core_data_folder'], None, 'y', append_db=append_db,
+                                                 encoder=half_copy_encoder, webp_cache_size=0)
+
+    assert my_world_refs.file_index.files == jwm.world_file_index(foundry_folders['world_folder']).files
+    assert not my_world_refs.file_exists('worlds/test/img/wrong.jpg')
+    assert not my_world_refs.file_exists('worlds/test/img/unused.png')
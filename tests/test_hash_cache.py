@@ -0,0 +1,56 @@
+'''
+Tests for hashing each image only once (see `img_hash_cache` and
+`world_refs.get_img_hash`).
+'''
+
+import collections
+
+import jegasus_world_manager as jwm
+
+from conftest import write_db, write_png
+
+
+def test_images_are_hashed_once_and_not_again_on_a_rerun(foundry_folders, half_copy_encoder, monkeypatch):
+    hashed_img_paths = collections.Counter()
+    original_get_full_hash = jwm.get_full_hash
+
+    def counting_get_full_hash(file_path):
+        if file_path.endswith('.png'):
+            hashed_img_paths[file_path] += 1
+        return original_get_full_hash(file_path)
+    monkeypatch.setattr(jwm, 'get_full_hash', counting_get_full_hash)
+
+    world_path = foundry_folders['world_path']
+    # "a.png" and "b.png" are duplicates, and "c.png" has the same size
+    write_png(world_path / 'img' / 'a.png', color=(1, 2, 3))
+    write_png(world_path / 'img' / 'b.png', color=(1, 2, 3))
+    write_png(world_path / 'img' / 'c.png', color=(9, 9, 9))
+    write_db(world_path / 'data' / 'actors.db', [{'_id': this_name, 'img': f'worlds/test/img/{this_name}.png'}
+                                                 for this_name in ('a', 'b', 'c')])
+    img_paths = [f'worlds/test/img/{this_name}.png' for this_name in ('a', 'b', 'c')]
+
+    def run_tool():
+        my_world_refs = jwm.world_refs(foundry_folders['user_data_folder'], foundry_folders['world_folder'],
+                                       foundry_folders['core_data_folder'], None,
+                                       encoder=half_copy_encoder, webp_cache_size=0)
+        # The duplicates search and the caches both need the hashes
+        duplicated_images = my_world_refs.get_duplicated_images()
+        assert [list(this_set) for this_set in duplicated_images.values()] == [img_paths[:2]]
+        for _ in range(2):
+            for this_img_path in img_paths:
+                my_world_refs.get_img_hash(this_img_path)
+        my_world_refs.hash_cache.save(my_world_refs.file_exists)
+
+    run_tool()
+    assert hashed_img_paths == {this_img_path: 1 for this_img_path in img_paths}
+
+    # Nothing changed on disk, so the saved hashes are used
+    hashed_img_paths.clear()
+    run_tool()
+    assert hashed_img_paths == {}
+
+    # Only the image that changed is hashed again
+    write_png(world_path / 'img' / 'c.png', size=20, color=(9, 9, 9))
+    hashed_img_paths.clear()
+    run_tool()
+    assert hashed_img_paths == {'worlds/test/img/c.png': 1}
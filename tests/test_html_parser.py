@@ -0,0 +1,74 @@
+'''
+Differential tests for the fast HTML parsing (`img_src_extractor`): for every
+chunk of the corpus it must find the same images as the "strict HTML" mode,
+which parses the chunk with BeautifulSoup.
+'''
+
+import pytest
+
+import jegasus_world_manager as jwm
+
+
+html_corpus = [
+    # Plain file paths (not HTML)
+    'worlds/test/img/map.png',
+    'worlds/test/img/old map (1).jpeg',
+    'icons/svg/mystery-man.svg',
+    'https://example.com/art/token.webp?size=2',
+    'a > b and c.png',
+    '',
+    # Quoting and case
+    '<p><img src="a.png"></p>',
+    "<img src='single quoted.png'>",
+    '<img src=unquoted.webp width=100>',
+    '<IMG SRC="UPPER.PNG">',
+    '<Img Src=\'Mixed.Jpg\' ALT="x">',
+    '<img  src = "spaces around.png" >',
+    # Entities in the "src"
+    '<img src="a&amp;b.png">',
+    '<img src="caf&eacute;.png">',
+    '<img src="x&#47;y&#x2F;z.png">',
+    '<img src="&lt;weird&gt;.png">',
+    '<img src="a&amp b.png">',
+    # Nested and malformed tags
+    '<div><p><span><img src="deep.png"></span></p></div>',
+    '<p><img src="unclosed.png"<img src="next.png"></p>',
+    '<img src="a.png" src="b.png">',
+    '<img alt="no src">',
+    '<img src>',
+    '<img src="">',
+    '<img/src="slash.png">',
+    '<img src="self-closing.png"/>',
+    '<p>Unclosed <b>bold <img src="b.png">',
+    '</p>closing first<img src="c.png">',
+    '<!-- <img src="commented.png"> --><img src="real.png">',
+    '<script>var x = \'<img src="in-script.png">\';</script>',
+    '<p>1 < 2 and <img src="after-lt.png"></p>',
+    '<<img src="double.png">>',
+    '<p class="a>b"><img src="attr-gt.png"></p>',
+    '<img src="line\nbreak.png">',
+    '<![CDATA[<img src="cdata.png">]]>',
+    # Duplicate images
+    '<img src="dup.png"><p><img src="dup.png"><img src="other.png"><img src="dup.png"></p>',
+    # Data URIs
+    '<img src="data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg==">',
+    '<img src="data:image/svg+xml;utf8,<svg xmlns=\'http://www.w3.org/2000/svg\'></svg>">',
+    # Not really HTML
+    '<3 this map.png',
+    'x.png <',
+]
+
+
+@pytest.mark.skipif(jwm.BeautifulSoup is None, reason='bs4 is not installed')
+@pytest.mark.parametrize('img_ref_content', html_corpus, ids=ascii)
+def test_fast_parser_matches_beautifulsoup(img_ref_content):
+    assert (jwm.parse_img_ref_content(img_ref_content, strict_html=False)
+            == jwm.parse_img_ref_content(img_ref_content, strict_html=True))
+
+
+def test_duplicated_images_are_listed_once():
+    assert jwm.parse_img_ref_content('<img src="a.png"><img src="b.png"><img src="a.png">') == (True, ['a.png', 'b.png'])
+
+
+def test_plain_file_paths_are_not_html():
+    assert jwm.parse_img_ref_content('worlds/test/img/map.png') == (False, [])
@@ -0,0 +1,39 @@
+'''
+Tests for the values an `img_ref` calculates only when they are first read
+(see `lazy_attribute` and `img_ref.set_editable_attributes`).
+'''
+
+import jegasus_world_manager as jwm
+
+from conftest import write_db, write_png
+
+
+def test_repointing_a_ref_forgets_the_values_of_the_old_image(foundry_folders, half_copy_encoder):
+    world_path = foundry_folders['world_path']
+    write_png(world_path / 'img' / 'old.png', size=16, color=(1, 1, 1))
+    write_png(world_path / 'img' / 'new.png', size=20, color=(2, 2, 2))
+    write_db(world_path / 'data' / 'actors.db', [{'_id': 'a', 'img': 'worlds/test/img/old.png'}])
+    my_world_refs = jwm.world_refs(foundry_folders['user_data_folder'], foundry_folders['world_folder'],
+                                   foundry_folders['core_data_folder'], None,
+                                   encoder=half_copy_encoder, webp_cache_size=0)
+
+    my_ref = next(iter(my_world_refs.refs_by_img['worlds/test/img/old.png'].values()))
+    old_ref_id = my_ref.ref_id
+    old_hash = my_ref.img_hash
+    assert my_ref.webp_img_path_for_ref == 'worlds/test/img/old.webp'
+    assert my_ref.img_exists and not my_ref.webp_copy_exists
+
+    my_ref.set_editable_attributes('worlds/test/img/new.png')
+
+    # Only the values that don't depend on the image are kept (re-indexing the
+    # ref already read where the new image is)
+    assert my_ref.lazy_values == {'ref_id': old_ref_id, 'img_path_on_disk': 'worlds/test/img/new.png'}
+    assert my_ref.img_hash == jwm.get_full_hash('worlds/test/img/new.png') != old_hash
+    assert my_ref.webp_img_path_for_ref == 'worlds/test/img/new.webp'
+    assert my_ref.ref_id == old_ref_id
+    # The indexes follow the ref to its new image
+    assert 'worlds/test/img/old.png' not in my_world_refs.refs_by_img
+    assert list(my_world_refs.refs_by_img['worlds/test/img/new.png'].values()) == [my_ref]
+
+    my_ref.set_editable_attributes('worlds/test/img/missing.png')
+    assert not my_ref.img_exists
@@ -0,0 +1,70 @@
+'''
+Tests for `json_loads` and `json_dumps`: whatever the library picked by
+`select_json_backend`, the files must be written exactly like the standard
+`json` library would write them.
+'''
+
+import json
+
+import pytest
+
+import jegasus_world_manager as jwm
+
+
+installed_backends = [pytest.param(this_name, marks=pytest.mark.skipif(this_module is None,
+                                                                      reason=f'{this_name} is not installed'))
+                      for this_name, this_module in (('orjson', jwm.orjson), ('ujson', jwm.ujson), ('json', json))]
+
+tricky_values = [1e-05, 1.5e-05, 0.0001, 1e16, 1.5e+300, -2.5e-300, 5e-324, 0.1, -0.0, 123456.789,
+                 2**63 - 1, 2**63, -2**63 - 1, 2**64, 2**64 + 1, 10**30, -10**40,
+                 '\ud800', 'a\udfffb', '\x00\x01\x1f\x7f\n\t\r"\\/', '  ',
+                 'Éowyn <b>é</b> 日本語 😀', '', None, True, False, [], {},
+                 {'_id': 'a1e5b', 'img': 'worlds/test/img/map 1e0.png', 'nested': [1, [2.5, {'x': 1e-07}]]}]
+
+nonfinite_texts = ['NaN', 'Infinity', '-Infinity']
+
+
+def compact_json_dumps(json_content):
+    return json.dumps(json_content, separators=(',', ':'), ensure_ascii=False)
+
+
+@pytest.fixture(params=installed_backends)
+def json_backend(request, monkeypatch):
+    monkeypatch.setattr(jwm, 'json_backend', jwm.json_backend)
+    return jwm.select_json_backend(request.param)
+
+
+@pytest.mark.parametrize('json_value', tricky_values, ids=ascii)
+def test_dumps_matches_standard_library(json_backend, json_value):
+    json_document = {'_id': 'x', 'value': json_value}
+    assert jwm.json_dumps(json_document) == compact_json_dumps(json_document)
+
+
+@pytest.mark.parametrize('json_value', tricky_values, ids=ascii)
+@pytest.mark.parametrize('as_bytes', [False, True])
+def test_round_trip_is_byte_identical(json_backend, json_value, as_bytes):
+    json_text = compact_json_dumps({'_id': 'x', 'value': json_value})
+    if as_bytes:
+        try:
+            json_text_read = json_text.encode('utf-8')
+        except UnicodeEncodeError:
+            # Lone surrogates can only be stored in a UTF-8 file as "\ud800"
+            json_text_read = json.dumps({'_id': 'x', 'value': json_value}, separators=(',', ':')).encode('utf-8')
+    else:
+        json_text_read = json_text
+    json_content = jwm.json_loads(json_text_read)
+    assert json_content == json.loads(json_text_read)
+    assert jwm.json_dumps(json_content) == json_text
+
+
+@pytest.mark.parametrize('nonfinite_text', nonfinite_texts)
+def test_nonfinite_values_are_written_back(json_backend, nonfinite_text):
+    json_text = '{"_id":"x","value":' + nonfinite_text + ',"list":[1.5,' + nonfinite_text + ']}'
+    json_content = jwm.json_loads(json_text)
+    assert compact_json_dumps(json_content) == json_text
+    assert jwm.json_dumps(json_content) == json_text
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        jwm.select_json_backend('simplejson')
@@ -0,0 +1,82 @@
+'''
+Tests for keeping the original images whose ".webp" copies don't save enough
+(see `world_refs.convert_all_images_to_webp_and_update_refs`).
+'''
+
+import json
+import os
+
+import pytest
+
+import jegasus_world_manager as jwm
+
+from conftest import half_copy_webp_encoder, write_db, write_png
+
+
+class sized_copy_webp_encoder(half_copy_webp_encoder):
+    '''
+    Encoder whose ".webp" copy has `size_ratios[name]` times the size of the
+    image. Images that are not listed get the usual half copy.
+    '''
+
+    encoder_name = 'sized_copy'
+    size_ratios = {'same.png': 1.0, 'bigger.png': 1.5, 'close.png': 0.95}
+
+    def create_webp_copy(self, img_path=None, webp_img_path=None, webp_settings=None):
+        if os.path.basename(img_path) not in self.size_ratios:
+            return super().create_webp_copy(img_path, webp_img_path, webp_settings)
+        with open(webp_img_path, 'wb') as fout:
+            fout.write(b'w' * round(os.path.getsize(img_path) * self.size_ratios[os.path.basename(img_path)]))
+        return 0
+
+
+def get_webp_bytes(img_name=None, original_bytes=None):
+    if img_name in sized_copy_webp_encoder.size_ratios:
+        return round(original_bytes * sized_copy_webp_encoder.size_ratios[img_name])
+    return original_bytes // 2
+
+
+@pytest.mark.parametrize('min_webp_savings', [0, 0.1])
+def test_webp_copies_that_are_not_small_enough_are_dropped(foundry_folders, monkeypatch, min_webp_savings):
+    monkeypatch.setitem(jwm.webp_encoders, 'sized_copy', sized_copy_webp_encoder)
+    world_path = foundry_folders['world_path']
+    img_names = ['small.png', 'same.png', 'bigger.png', 'close.png']
+    for img_number, this_img_name in enumerate(img_names):
+        write_png(world_path / 'img' / this_img_name, color=(img_number, 0, 0))
+    write_db(world_path / 'data' / 'actors.db', [{'_id': f'a{img_number}', 'img': f'worlds/test/img/{this_img_name}'}
+                                                 for img_number, this_img_name in enumerate(img_names)])
+
+    jwm.one_liner_compress_world(foundry_folders['user_data_folder'], foundry_folders['world_folder'],
+                                 foundry_folders['core_data_folder'], None, 'n', encoder='sized_copy',
+                                 webp_cache_size=0, min_webp_savings=min_webp_savings)
+
+    # "close.png" only saves 5%, which is enough unless 10% is required
+    kept_as_webp = ['small.png'] + (['close.png'] if min_webp_savings == 0 else [])
+    with open(world_path / 'data' / 'actors.db', encoding='utf-8') as fin:
+        db_img_paths = [json.loads(this_line)['img'] for this_line in fin]
+    assert db_img_paths == [f'worlds/test/img/{this_img_name[:-4]}.webp' if this_img_name in kept_as_webp
+                            else f'worlds/test/img/{this_img_name}' for this_img_name in img_names]
+    for this_img_name in img_names:
+        webp_is_kept = this_img_name in kept_as_webp
+        assert (world_path / 'img' / this_img_name).exists() is not webp_is_kept
+        assert (world_path / 'img' / f'{this_img_name[:-4]}.webp').exists() is webp_is_kept
+
+    with open(world_path / '_jwm_cache' / 'conversion_report.json', encoding='utf-8') as fin:
+        conversion_report = json.load(fin)
+    original_sizes = {this_img_name: (world_path / '_trash' / 'img' / this_img_name
+                                      if this_img_name in kept_as_webp
+                                      else world_path / 'img' / this_img_name).stat().st_size
+                      for this_img_name in img_names}
+    assert conversion_report['images_converted'] == len(kept_as_webp)
+    assert conversion_report['images_kept_as_original'] == len(img_names) - len(kept_as_webp)
+    assert conversion_report['bytes_saved'] == sum(original_sizes[this_img_name]
+                                                   - get_webp_bytes(this_img_name, original_sizes[this_img_name])
+                                                   for this_img_name in kept_as_webp)
+    for this_img_name in img_names:
+        this_entry = conversion_report['images'][f'worlds/test/img/{this_img_name}']
+        webp_bytes = get_webp_bytes(this_img_name, original_sizes[this_img_name])
+        assert this_entry['webp_img_path'] == f'worlds/test/img/{this_img_name[:-4]}.webp'
+        assert this_entry['original_bytes'] == original_sizes[this_img_name]
+        assert this_entry['webp_bytes'] == webp_bytes
+        assert this_entry['saved_bytes'] == original_sizes[this_img_name] - webp_bytes
+        assert this_entry['kept'] == ('webp' if this_img_name in kept_as_webp else 'original')
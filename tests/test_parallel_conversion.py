@@ -0,0 +1,102 @@
+'''
+Tests for converting the images with several workers (see
+`world_refs.create_webp_copies` and `check_number_of_jobs`).
+'''
+
+import json
+import os
+import shutil
+import time
+
+import pytest
+
+import jegasus_world_manager as jwm
+
+from conftest import half_copy_webp_encoder, write_db, write_png
+
+IMG_NAMES = [f'img_{img_number}.png' for img_number in range(8)]
+
+
+class unreliable_webp_encoder(half_copy_webp_encoder):
+    '''
+    Half-copy encoder that fails on "img_2.png", raises an exception on
+    "img_5.png", and finishes the first images last.
+    '''
+
+    encoder_name = 'unreliable'
+
+    def create_webp_copy(self, img_path=None, webp_img_path=None, webp_settings=None):
+        img_number = int(os.path.basename(img_path)[len('img_'):-len('.png')])
+        time.sleep(0.002 * (len(IMG_NAMES) - img_number))
+        if img_number == 2:
+            return 1
+        if img_number == 5:
+            raise RuntimeError('encoder crashed')
+        return super().create_webp_copy(img_path, webp_img_path, webp_settings)
+
+
+@pytest.fixture
+def many_images_world(foundry_folders, monkeypatch):
+    monkeypatch.setitem(jwm.webp_encoders, 'unreliable', unreliable_webp_encoder)
+
+    def create_world():
+        world_path = foundry_folders['world_path']
+        for this_folder in ('img', '_trash', '_jwm_cache'):
+            shutil.rmtree(world_path / this_folder, ignore_errors=True)
+        (world_path / 'img').mkdir()
+        # Different sizes, so that the half copies are not duplicates of each other
+        for img_number, this_img_name in enumerate(IMG_NAMES):
+            write_png(world_path / 'img' / this_img_name, size=16 + img_number)
+        # Several references to each image, spread over the file
+        write_db(world_path / 'data' / 'actors.db',
+                 [{'_id': f'a{doc_number}', 'img': f'worlds/test/img/{IMG_NAMES[doc_number % len(IMG_NAMES)]}',
+                   'items': [{'_id': f'i{doc_number}', 'img': f'worlds/test/img/{IMG_NAMES[-1 - doc_number % len(IMG_NAMES)]}'}]}
+                  for doc_number in range(3 * len(IMG_NAMES))])
+
+    return create_world
+
+
+def compress_world(foundry_folders, jobs):
+    return jwm.one_liner_compress_world(foundry_folders['user_data_folder'], foundry_folders['world_folder'],
+                                        foundry_folders['core_data_folder'], None, 'n', jobs=jobs,
+                                        ffmpeg_batch_size=1, encoder='unreliable', webp_cache_size=0)
+
+
+def test_failed_conversions_dont_stop_the_others(foundry_folders, many_images_world):
+    many_images_world()
+    compress_world(foundry_folders, jobs=4)
+
+    world_path = foundry_folders['world_path']
+    failed_img_names = {'img_2.png', 'img_5.png'}
+    with open(world_path / 'data' / 'actors.db', encoding='utf-8') as fin:
+        db_img_paths = {this_path for this_line in fin
+                        for this_path in (json.loads(this_line)['img'], json.loads(this_line)['items'][0]['img'])}
+    assert db_img_paths == {f'worlds/test/img/{this_img_name}' if this_img_name in failed_img_names
+                            else f'worlds/test/img/{this_img_name[:-4]}.webp' for this_img_name in IMG_NAMES}
+    for this_img_name in IMG_NAMES:
+        assert (world_path / 'img' / this_img_name).exists() is (this_img_name in failed_img_names)
+
+
+def test_results_dont_depend_on_the_number_of_workers(foundry_folders, many_images_world):
+    outputs_by_jobs = {}
+    for this_jobs in (1, 4):
+        many_images_world()
+        my_world_refs = compress_world(foundry_folders, jobs=this_jobs)
+        with open(foundry_folders['world_path'] / 'data' / 'actors.db', encoding='utf-8') as fin:
+            outputs_by_jobs[this_jobs] = (fin.read(), list(my_world_refs.conversion_report['images']),
+                                          sorted(my_world_refs.trash_queue))
+    assert outputs_by_jobs[1] == outputs_by_jobs[4]
+    # The images are handled in the order in which they first show up in the
+    # world, whatever the order in which the workers finished
+    assert outputs_by_jobs[1][1] == [f'worlds/test/img/img_{img_number}.png' for img_number in (0, 7, 1, 6, 3, 4)]
+
+
+@pytest.mark.parametrize('jobs', [0, '0', -2, 'many'])
+def test_invalid_number_of_jobs_is_rejected(jobs):
+    with pytest.raises(ValueError):
+        jwm.check_number_of_jobs(jobs)
+
+
+def test_missing_number_of_jobs_uses_every_cpu():
+    assert jwm.check_number_of_jobs(None) == (os.cpu_count() or 1)
+    assert jwm.check_number_of_jobs('3') == 3
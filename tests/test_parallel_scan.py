@@ -0,0 +1,80 @@
+'''
+The parallel scan (see `load_and_scan_db_file`) must find exactly the same
+references, in the same order, as the serial scan.
+'''
+
+import concurrent.futures
+import json
+
+import pytest
+
+import jegasus_world_manager as jwm
+
+from conftest import write_db, write_png
+
+
+@pytest.fixture
+def multi_pack_world(foundry_folders):
+    world_path = foundry_folders['world_path']
+    (world_path / 'packs').mkdir()
+    for this_number in range(6):
+        write_png(world_path / 'img' / f'img_{this_number}.png', color=(40 * this_number, 0, 0))
+
+    (world_path / 'world.json').write_text(json.dumps(
+        {'name': 'test', 'title': 'Test', 'background': 'worlds/test/img/img_5.png',
+         'packs': [{'name': 'monsters', 'path': 'packs/monsters.db', 'entity': 'Actor'},
+                   {'name': 'maps', 'path': 'packs/maps.db', 'entity': 'Scene'},
+                   {'name': 'lore', 'path': 'packs/lore.db', 'entity': 'JournalEntry'}]}))
+
+    write_db(world_path / 'data' / 'actors.db',
+             [{'_id': 'a1', 'img': 'worlds/test/img/img_0.png', 'token': {'img': 'worlds/test/img/img_1.png'}},
+              {'_id': 'a2', 'name': 'No image'},
+              {'_id': 'a1', 'img': 'worlds/test/img/img_2.png', 'token': {'img': 'worlds/test/img/img_1.png'}}])
+    write_db(world_path / 'data' / 'journal.db',
+             [{'_id': 'j1', 'content': '<p><img src="worlds/test/img/img_3.png"><img src="worlds/test/img/img_4.png"></p>'}])
+    write_db(world_path / 'packs' / 'monsters.db',
+             [{'_id': f'm{this_number}', 'img': f'worlds/test/img/img_{this_number % 6}.png',
+               'items': [{'_id': 'i', 'img': 'worlds/test/img/img_0.png'}]} for this_number in range(12)]
+             + [{'$$deleted': True, '_id': 'm3'}])
+    write_db(world_path / 'packs' / 'maps.db',
+             [{'_id': 's1', 'img': 'worlds/test/img/img_5.png', 'thumb': 'worlds/test/img/img_4.png',
+               'tiles': [{'_id': 't1', 'img': 'worlds/test/img/img_1.png'}],
+               'tokens': [{'_id': 'k1', 'img': 'worlds/test/img/img_2.png'}]}])
+    write_db(world_path / 'packs' / 'lore.db',
+             [{'_id': 'l1', 'img': 'worlds/test/img/img_3.png',
+               'content': '<img src="worlds/test/img/img_0.png"><IMG SRC=\'worlds/test/img/img_1.png\'>'}])
+
+    return foundry_folders
+
+
+@pytest.mark.parametrize('deep_scan', [False, True])
+def test_parallel_scan_finds_the_same_refs_as_serial_scan(multi_pack_world, half_copy_encoder, deep_scan,
+                                                          monkeypatch):
+    # Making sure that the worker processes are really used
+    worker_pools = []
+
+    class counted_process_pool(concurrent.futures.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            worker_pools.append(self)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(jwm.concurrent.futures, 'ProcessPoolExecutor', counted_process_pool)
+
+    world_refs_by_mode = {}
+    for parallel_scan in (False, True):
+        world_refs_by_mode[parallel_scan] = jwm.world_refs(
+            multi_pack_world['user_data_folder'], multi_pack_world['world_folder'],
+            multi_pack_world['core_data_folder'], None, jobs=3, deep_scan=deep_scan,
+            parallel_scan=parallel_scan, scan_cache=False, encoder=half_copy_encoder, webp_cache_size=0)
+
+    def get_ref_records(my_world_refs):
+        return [(this_ref.ref_file_path, this_ref.ref_file_line, tuple(this_ref.json_address),
+                 this_ref.img_path_for_ref) for this_ref in my_world_refs.all_img_refs]
+
+    assert len(worker_pools) == 1
+
+    serial_refs = get_ref_records(world_refs_by_mode[False])
+    assert len({this_ref[0] for this_ref in serial_refs}) >= 5
+    assert get_ref_records(world_refs_by_mode[True]) == serial_refs
+    assert ([this_ref.ref_id for this_ref in world_refs_by_mode[True].all_img_refs]
+            == [this_ref.ref_id for this_ref in world_refs_by_mode[False].all_img_refs])
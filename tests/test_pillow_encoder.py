@@ -0,0 +1,81 @@
+'''
+Tests for the encoder that creates the ".webp" copies with the `Pillow`
+library (see `pillow_webp_encoder`).
+'''
+
+import pytest
+
+import jegasus_world_manager as jwm
+
+pytestmark = pytest.mark.skipif(jwm.PIL_Image is None, reason='Pillow is not installed')
+
+
+def get_webp_chunk_type(webp_img_path):
+    with open(webp_img_path, 'rb') as fin:
+        webp_header = fin.read(16)
+    assert webp_header[:4] == b'RIFF' and webp_header[8:12] == b'WEBP'
+    return webp_header[12:16]
+
+
+@pytest.fixture
+def gradient_png(tmp_path):
+    img_path = (tmp_path / 'gradient.png').as_posix()
+    gradient_img = jwm.PIL_Image.new('RGB', (64, 48))
+    gradient_img.putdata([(x * 4, y * 5, (x * y) % 256) for y in range(48) for x in range(64)])
+    gradient_img.save(img_path)
+    return img_path
+
+
+def test_lossless_copy_keeps_every_pixel(tmp_path, gradient_png):
+    webp_img_path = (tmp_path / 'gradient.webp').as_posix()
+    assert jwm.get_webp_encoder('pillow').create_webp_copy(gradient_png, webp_img_path,
+                                                           {'lossless': True, 'quality': 100}) == 0
+
+    assert get_webp_chunk_type(webp_img_path) == b'VP8L'
+    with jwm.PIL_Image.open(gradient_png) as original_img, jwm.PIL_Image.open(webp_img_path) as webp_img:
+        assert list(webp_img.convert('RGB').getdata()) == list(original_img.getdata())
+
+
+def test_lossy_copy_follows_the_quality(tmp_path, gradient_png):
+    webp_sizes = {}
+    for this_quality in (10, 95):
+        webp_img_path = (tmp_path / f'gradient_q{this_quality}.webp').as_posix()
+        assert jwm.get_webp_encoder('pillow').create_webp_copy(gradient_png, webp_img_path,
+                                                               {'lossless': False, 'quality': this_quality}) == 0
+        assert get_webp_chunk_type(webp_img_path) == b'VP8 '
+        assert jwm.get_webp_img_size(webp_img_path) == (64, 48)
+        webp_sizes[this_quality] = (tmp_path / f'gradient_q{this_quality}.webp').stat().st_size
+    assert webp_sizes[10] < webp_sizes[95]
+
+
+@pytest.mark.parametrize('webp_settings', [{'width': 32, 'height': 24},
+                                           {'lossless': True, 'quality': 100, 'width': 16, 'height': 12},
+                                           {'lossless': False, 'quality': 80, 'width': 40, 'height': 30}])
+def test_resized_copy_has_the_requested_size(tmp_path, gradient_png, webp_settings):
+    webp_img_path = (tmp_path / 'gradient.webp').as_posix()
+    assert jwm.get_webp_encoder('pillow').create_webp_copy(gradient_png, webp_img_path, webp_settings) == 0
+    assert jwm.get_webp_img_size(webp_img_path) == (webp_settings['width'], webp_settings['height'])
+
+
+def test_palette_transparency_is_kept(tmp_path):
+    img_path = (tmp_path / 'palette.png').as_posix()
+    palette_img = jwm.PIL_Image.new('P', (8, 8), 1)
+    palette_img.putpalette([0, 0, 0, 255, 0, 0] + [0] * 762)
+    palette_img.paste(0, (0, 0, 4, 8))
+    palette_img.save(img_path, transparency=0)
+
+    webp_img_path = (tmp_path / 'palette.webp').as_posix()
+    assert jwm.get_webp_encoder('pillow').create_webp_copy(img_path, webp_img_path,
+                                                           {'lossless': True, 'quality': 100}) == 0
+    with jwm.PIL_Image.open(webp_img_path) as webp_img:
+        assert webp_img.mode == 'RGBA'
+        assert webp_img.getpixel((0, 0))[3] == 0
+        assert webp_img.getpixel((7, 0)) == (255, 0, 0, 255)
+
+
+def test_broken_image_fails_without_leaving_a_file(tmp_path):
+    img_path = tmp_path / 'broken.png'
+    img_path.write_bytes(b'\x89PNG\r\n\x1a\nnot really a png')
+    webp_img_path = tmp_path / 'broken.webp'
+    assert jwm.get_webp_encoder('pillow').create_webp_copy(img_path.as_posix(), webp_img_path.as_posix()) != 0
+    assert not webp_img_path.exists()
@@ -0,0 +1,41 @@
+'''
+Tests for keeping the lines of the ".db" files that mention no images as raw
+text, which is never decoded (see `compact_db_file_lines`).
+'''
+
+import pytest
+
+import jegasus_world_manager as jwm
+
+from conftest import write_png
+
+IMG_FREE_DB_LINES = ['{"name":"Zoë","_id":"b","flags":{"z":1,"a":2}}\n',
+                     '{"_id": "c", "name": "\\u00c9lodie",   "system": {"hp": 7}}\n',
+                     '{"_id":"d","name":"日本語の名前","notes":"<p>No picture</p>"}\n',
+                     '{"$$indexCreated":{"fieldName":"name","unique":false,"sparse":false}}\n']
+DB_LINES = ['{"_id":"a","img":"worlds/test/img/a.png"}\n'] + IMG_FREE_DB_LINES
+
+
+def test_only_lines_with_images_are_decoded(tmp_path):
+    (tmp_path / 'actors.db').write_text(''.join(DB_LINES), encoding='utf-8')
+    db_file_lines, _, _ = jwm.load_db_file((tmp_path / 'actors.db').as_posix())
+
+    assert db_file_lines == [{'_id': 'a', 'img': 'worlds/test/img/a.png'}] + [this_line[:-1]
+                                                                               for this_line in IMG_FREE_DB_LINES]
+
+
+@pytest.mark.parametrize('stream_db', ['n', 'y'])
+def test_image_free_lines_are_written_back_verbatim(foundry_folders, half_copy_encoder, stream_db):
+    world_path = foundry_folders['world_path']
+    write_png(world_path / 'img' / 'a.png')
+    (world_path / 'data' / 'actors.db').write_text(''.join(DB_LINES), encoding='utf-8')
+
+    jwm.one_liner_compress_world(foundry_folders['user_data_folder'], foundry_folders['world_folder'],
+                                 foundry_folders['core_data_folder'], None, 'n', stream_db=stream_db,
+                                 encoder=half_copy_encoder, webp_cache_size=0)
+
+    with open(world_path / 'data' / 'actors.db', encoding='utf-8') as fin:
+        exported_db_lines = fin.readlines()
+    # The file was rewritten, because the line with the image was changed
+    assert exported_db_lines[0] == '{"_id":"a","img":"worlds/test/img/a.webp"}\n'
+    assert exported_db_lines[1:] == IMG_FREE_DB_LINES
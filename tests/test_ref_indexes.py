@@ -0,0 +1,80 @@
+'''
+Tests for the indexes of the `img_ref`s by image, by hash and by
+"brokenness", which `world_refs` keeps up to date instead of rebuilding them
+(see `world_refs.add_ref_to_indexes`).
+'''
+
+import os
+
+import jegasus_world_manager as jwm
+
+from conftest import write_db, write_png
+
+
+def get_ref_numbers(refs):
+    return sorted(this_ref.ref_number for this_ref in refs)
+
+
+def assert_indexes_match_a_full_rebuild(my_world_refs):
+    all_img_refs = my_world_refs.all_img_refs
+
+    # By image
+    rebuilt_refs_by_img = my_world_refs.get_refs_indexed_by_img(all_img_refs)
+    assert ({this_img_path: get_ref_numbers(this_refs)
+             for this_img_path, this_refs in my_world_refs.get_refs_indexed_by_img().items()}
+            == {this_img_path: get_ref_numbers(this_refs) for this_img_path, this_refs in rebuilt_refs_by_img.items()})
+
+    # By hash, with every image hashed again from disk
+    rebuilt_refs_by_hash = {}
+    for this_img_path, this_refs in rebuilt_refs_by_img.items():
+        this_hash = (jwm.get_full_hash(this_img_path) if this_img_path.startswith('worlds/test/')
+                     and os.path.isfile(this_img_path) else None)
+        rebuilt_refs_by_hash.setdefault(this_hash, {})[this_img_path] = get_ref_numbers(this_refs)
+    assert ({this_hash: {this_img_path: get_ref_numbers(this_refs) for this_img_path, this_refs in this_imgs.items()}
+             for this_hash, this_imgs in my_world_refs.get_refs_indexed_by_hash_by_img().items()}
+            == rebuilt_refs_by_hash)
+
+    # By "brokenness"
+    assert (get_ref_numbers(my_world_refs.get_broken_refs())
+            == get_ref_numbers(this_ref for this_ref in all_img_refs
+                               if not os.path.isfile(this_ref.img_path_for_ref)
+                               or this_ref.img_path_for_ref in my_world_refs.trash_queue))
+
+
+def test_indexes_match_a_full_rebuild_after_each_stage(foundry_folders, half_copy_encoder):
+    world_path = foundry_folders['world_path']
+    # Different sizes, so that only "a.png" and "b.png" are duplicates
+    write_png(world_path / 'img' / 'a.png', color=(1, 1, 1))
+    write_png(world_path / 'img' / 'b.png', color=(1, 1, 1))
+    # A PNG saved as ".jpg", which gets renamed
+    write_png(world_path / 'img' / 'wrong.jpg', size=20, color=(2, 2, 2))
+    # Referenced through the "modules" folder, which gets fixed
+    write_png(world_path / 'img' / 'moved.png', size=24, color=(3, 3, 3))
+    write_db(world_path / 'data' / 'actors.db',
+             [{'_id': 'a', 'img': 'worlds/test/img/a.png', 'items': [{'_id': 'i', 'img': 'worlds/test/img/b.png'}]},
+              {'_id': 'b', 'img': 'worlds/test/img/b.png'},
+              {'_id': 'c', 'img': 'worlds/test/img/wrong.jpg'},
+              {'_id': 'd', 'img': 'modules/test/img/moved.png'},
+              {'_id': 'e', 'img': 'worlds/test/img/gone.png'}])
+    my_world_refs = jwm.world_refs(foundry_folders['user_data_folder'], foundry_folders['world_folder'],
+                                   foundry_folders['core_data_folder'], None,
+                                   encoder=half_copy_encoder, webp_cache_size=0)
+    assert_indexes_match_a_full_rebuild(my_world_refs)
+
+    my_world_refs.try_to_fix_all_broken_refs()
+    assert_indexes_match_a_full_rebuild(my_world_refs)
+    assert [this_ref.img_path_for_ref for this_ref in my_world_refs.get_broken_refs()] == ['worlds/test/img/gone.png']
+
+    my_world_refs.fix_incorrect_file_extensions()
+    assert_indexes_match_a_full_rebuild(my_world_refs)
+    assert 'worlds/test/img/wrong.jpg' not in my_world_refs.refs_by_img
+
+    my_world_refs.fix_all_sets_of_duplicated_images()
+    assert_indexes_match_a_full_rebuild(my_world_refs)
+    assert len(my_world_refs.refs_by_img['worlds/test/img/a.png']) == 3
+
+    my_world_refs.convert_all_images_to_webp_and_update_refs()
+    my_world_refs.fix_all_sets_of_duplicated_images()
+    assert_indexes_match_a_full_rebuild(my_world_refs)
+    assert sorted(my_world_refs.refs_by_img) == ['worlds/test/img/a.webp', 'worlds/test/img/gone.png',
+                                                 'worlds/test/img/moved.webp', 'worlds/test/img/wrong.webp']
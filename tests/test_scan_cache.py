@@ -0,0 +1,34 @@
+'''
+Tests for reusing the references found in the previous run (see `ref_scan_cache`).
+'''
+
+import pytest
+
+import jegasus_world_manager as jwm
+
+from conftest import write_db, write_png
+
+
+def build_world_refs(foundry_folders, encoder, stream_db):
+    return jwm.world_refs(foundry_folders['user_data_folder'], foundry_folders['world_folder'],
+                          foundry_folders['core_data_folder'], None, stream_db=stream_db,
+                          encoder=encoder, webp_cache_size=0)
+
+
+@pytest.mark.parametrize('stream_db, expected_type', [(False, list), (True, jwm.streamed_db_file)])
+def test_cached_db_files_are_loaded_like_scanned_ones(foundry_folders, half_copy_encoder, stream_db, expected_type):
+    world_path = foundry_folders['world_path']
+    write_png(world_path / 'img' / 'map.png')
+    write_db(world_path / 'data' / 'actors.db', [{'_id': 'a', 'img': 'worlds/test/img/map.png'},
+                                                 {'_id': 'b', 'name': 'Token'}])
+    actors_db = 'worlds/test/data/actors.db'
+
+    first_world_refs = build_world_refs(foundry_folders, half_copy_encoder, stream_db)
+    assert isinstance(first_world_refs.db_files[actors_db], expected_type)
+
+    # The second run takes the references from the cache
+    second_world_refs = build_world_refs(foundry_folders, half_copy_encoder, stream_db)
+    assert isinstance(second_world_refs.db_files[actors_db], expected_type)
+    assert list(second_world_refs.db_files[actors_db]) == list(first_world_refs.db_files[actors_db])
+    assert ([this_ref.ref_id for this_ref in second_world_refs.all_img_refs]
+            == [this_ref.ref_id for this_ref in first_world_refs.all_img_refs])
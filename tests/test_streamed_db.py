@@ -0,0 +1,50 @@
+'''
+Tests for keeping only the position of each line of the ".db" files in memory
+(see `streamed_db_file`).
+'''
+
+import shutil
+
+import pytest
+
+import jegasus_world_manager as jwm
+
+from conftest import write_png
+
+ACTORS_DB_LINES = ['{"_id":"a","name":"Zoë","img":"worlds/test/img/a.png","items":[{"_id":"i","img":"worlds/test/img/b.png"}]}\n',
+                   '{"name":"Bob","_id":"b"}\n',
+                   '{"_id":"c","img":"worlds/test/img/gone.png"}\n',
+                   '{"_id":"b","name":"Bob the Second"}\n',
+                   '{"$$deleted":true,"_id":"c"}\n',
+                   '{"_id":"d","img":"worlds/test/img/a.png","flags":{"x":{"$$deleted":true}}}\n',
+                   '{"$$indexCreated":{"fieldName":"name","unique":false,"sparse":false}}\n']
+JOURNAL_DB_LINES = ['{"_id":"j","content":"<p>Voilà <img src=\\"worlds/test/img/b.png\\"></p>"}\n',
+                    '{"_id":"k","content":"<p>Rien</p>"}\n']
+
+
+@pytest.mark.parametrize('compact_db', ['n', 'y'])
+def test_streamed_export_matches_the_in_memory_one(foundry_folders, half_copy_encoder, compact_db):
+    world_path = foundry_folders['world_path']
+    exported_files = {}
+    for this_stream_db in ('n', 'y'):
+        for this_folder in ('img', '_trash', '_jwm_cache'):
+            shutil.rmtree(world_path / this_folder, ignore_errors=True)
+        (world_path / 'img').mkdir()
+        write_png(world_path / 'img' / 'a.png', color=(1, 1, 1))
+        write_png(world_path / 'img' / 'b.png', size=20, color=(2, 2, 2))
+        (world_path / 'data' / 'actors.db').write_text(''.join(ACTORS_DB_LINES), encoding='utf-8')
+        (world_path / 'data' / 'journal.db').write_text(''.join(JOURNAL_DB_LINES), encoding='utf-8')
+
+        my_world_refs = jwm.one_liner_compress_world(foundry_folders['user_data_folder'],
+                                                     foundry_folders['world_folder'],
+                                                     foundry_folders['core_data_folder'], None, 'n',
+                                                     compact_db=compact_db, stream_db=this_stream_db,
+                                                     encoder=half_copy_encoder, webp_cache_size=0)
+        assert isinstance(my_world_refs.db_files['worlds/test/data/actors.db'],
+                          jwm.streamed_db_file if this_stream_db == 'y' else list)
+        exported_files[this_stream_db] = {this_file: (world_path / 'data' / this_file).read_bytes()
+                                          for this_file in ('actors.db', 'actors.dbbak',
+                                                            'journal.db', 'journal.dbbak')}
+
+    assert exported_files['y'] == exported_files['n']
+    assert b'a.webp' in exported_files['y']['actors.db'] and b'b.webp' in exported_files['y']['journal.db']
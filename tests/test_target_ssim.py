@@ -0,0 +1,123 @@
+'''
+Tests for the search of the lowest quality that reaches a target SSIM (see
+`webp_encoder.create_webp_copy_for_target_ssim` and `webp_quality_cache`).
+'''
+
+import json
+import os
+
+import pytest
+
+import jegasus_world_manager as jwm
+
+from conftest import half_copy_webp_encoder, write_db, write_png
+
+
+class quality_ssim_webp_encoder(half_copy_webp_encoder):
+    '''
+    Encoder whose SSIM is simply the quality of the last copy divided by 100
+    (or None, when `measures_ssim` is False). Every encode is recorded.
+    '''
+
+    encoder_name = 'quality_ssim'
+    measures_ssim = True
+    encoded_qualities = []
+
+    def create_webp_copy(self, img_path=None, webp_img_path=None, webp_settings=None):
+        self.last_quality = (webp_settings or {}).get('quality')
+        self.encoded_qualities.append(self.last_quality)
+        return super().create_webp_copy(img_path, webp_img_path, webp_settings)
+
+    def get_ssim(self, img_path=None, webp_img_path=None):
+        return self.last_quality / 100 if self.measures_ssim else None
+
+
+@pytest.fixture
+def quality_ssim_encoder(monkeypatch):
+    monkeypatch.setitem(jwm.webp_encoders, 'quality_ssim', quality_ssim_webp_encoder)
+    monkeypatch.setattr(quality_ssim_webp_encoder, 'encoded_qualities', [])
+    return 'quality_ssim'
+
+
+@pytest.mark.parametrize('target_ssim, expected_quality', [(0.6, 60), (0.1, 10), (0.995, 100)])
+def test_search_keeps_the_lowest_quality_that_reaches_the_target(tmp_path, quality_ssim_encoder, target_ssim,
+                                                                  expected_quality):
+    write_png(tmp_path / 'map.png')
+    my_encoder = quality_ssim_webp_encoder()
+    return_code, webp_settings = my_encoder.create_webp_copy_for_target_ssim((tmp_path / 'map.png').as_posix(),
+                                                                             (tmp_path / 'map.webp').as_posix(),
+                                                                             target_ssim)
+
+    assert return_code == 0
+    assert webp_settings == {'lossless': False, 'quality': expected_quality, 'ssim': expected_quality / 100}
+    assert len(my_encoder.encoded_qualities) <= 7
+    assert (tmp_path / 'map.webp').is_file()
+
+
+def test_search_without_ssim_falls_back_to_the_highest_quality(tmp_path, quality_ssim_encoder, monkeypatch):
+    write_png(tmp_path / 'map.png')
+    monkeypatch.setattr(quality_ssim_webp_encoder, 'measures_ssim', False)
+    return_code, webp_settings = quality_ssim_webp_encoder().create_webp_copy_for_target_ssim(
+        (tmp_path / 'map.png').as_posix(), (tmp_path / 'map.webp').as_posix(), 0.6)
+
+    assert return_code == 0
+    assert webp_settings == {'lossless': False, 'quality': 100, 'ssim': None}
+
+
+def compress_world_with_target_ssim(foundry_folders, encoder):
+    jwm.one_liner_compress_world(foundry_folders['user_data_folder'], foundry_folders['world_folder'],
+                                 foundry_folders['core_data_folder'], None, 'n', jobs=1, encoder=encoder,
+                                 webp_cache_size=0, auto_webp_settings='n', target_ssim=0.6)
+
+
+def read_saved_qualities():
+    with open(jwm.tool_cache_folder + '/webp_quality_cache.json', encoding='utf-8') as fin:
+        return json.load(fin)['qualities']
+
+
+def test_searched_quality_is_reused_on_the_next_run(foundry_folders, quality_ssim_encoder):
+    world_path = foundry_folders['world_path']
+    write_png(world_path / 'img' / 'map.png', color=(10, 20, 30))
+    write_db(world_path / 'data' / 'scenes.db', [{'_id': 'a', 'img': 'worlds/test/img/map.png'}])
+    compress_world_with_target_ssim(foundry_folders, quality_ssim_encoder)
+
+    assert len(quality_ssim_webp_encoder.encoded_qualities) <= 7
+    assert list(read_saved_qualities().values()) == [[60, 0.6]]
+
+    # The same image shows up again under another name: it is encoded once,
+    # straight at the quality that was found before
+    quality_ssim_webp_encoder.encoded_qualities.clear()
+    write_png(world_path / 'img' / 'copy.png', color=(10, 20, 30))
+    write_db(world_path / 'data' / 'scenes.db', [{'_id': 'b', 'img': 'worlds/test/img/copy.png'}])
+    compress_world_with_target_ssim(foundry_folders, quality_ssim_encoder)
+
+    assert quality_ssim_webp_encoder.encoded_qualities == [60]
+    assert (world_path / 'img' / 'copy.webp').is_file()
+
+
+def test_quality_picked_without_ssim_is_not_cached(foundry_folders, quality_ssim_encoder, monkeypatch):
+    monkeypatch.setattr(quality_ssim_webp_encoder, 'measures_ssim', False)
+    world_path = foundry_folders['world_path']
+    write_png(world_path / 'img' / 'map.png')
+    write_db(world_path / 'data' / 'scenes.db', [{'_id': 'a', 'img': 'worlds/test/img/map.png'}])
+    compress_world_with_target_ssim(foundry_folders, quality_ssim_encoder)
+
+    assert quality_ssim_webp_encoder.encoded_qualities[-1] == 100
+    assert (world_path / 'img' / 'map.webp').is_file()
+    assert not os.path.exists(jwm.tool_cache_folder + '/webp_quality_cache.json')
+
+
+@pytest.mark.skipif(jwm.PIL_Image is None, reason='Pillow is not installed')
+def test_ssim_works_without_lambda_eval(tmp_path, monkeypatch):
+    # Pillow versions older than 10.3 only have `ImageMath.eval`
+    class old_image_math:
+        eval = staticmethod(jwm.PIL_ImageMath.unsafe_eval if hasattr(jwm.PIL_ImageMath, 'unsafe_eval')
+                            else jwm.PIL_ImageMath.eval)
+
+    write_png(tmp_path / 'a.png', size=32, color=(200, 100, 50))
+    jwm.PIL_Image.open(tmp_path / 'a.png').save(tmp_path / 'a.webp', lossless=True)
+    expected_ssim = jwm.compute_ssim((tmp_path / 'a.png').as_posix(), (tmp_path / 'a.webp').as_posix())
+    monkeypatch.setattr(jwm, 'PIL_ImageMath', old_image_math)
+
+    assert jwm.compute_ssim((tmp_path / 'a.png').as_posix(), (tmp_path / 'a.webp').as_posix()) == expected_ssim
+    assert expected_ssim == pytest.approx(1)
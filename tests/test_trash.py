@@ -0,0 +1,49 @@
+'''
+Tests for moving the converted and unused images to the "_trash" folder.
+'''
+
+import jegasus_world_manager as jwm
+
+from conftest import write_db, write_png
+
+
+def test_raw_text_search_ignores_superseded_and_deleted_lines(foundry_folders, half_copy_encoder):
+    world_path = foundry_folders['world_path']
+    for this_img in ('map.png', 'map.webp', 'gone.png', 'flag.png'):
+        write_png(world_path / 'img' / this_img)
+    write_db(world_path / 'data' / 'actors.db',
+             [{'_id': 'a', 'img': 'worlds/test/img/map.png'},
+              {'_id': 'b', 'img': 'worlds/test/img/gone.png'},
+              {'_id': 'a', 'img': 'worlds/test/img/map.webp',
+               'flags': {'some-module': {'art': 'worlds/test/img/flag.png'}}},
+              {'$$deleted': True, '_id': 'b'}])
+
+    my_world_refs = jwm.world_refs(foundry_folders['user_data_folder'], foundry_folders['world_folder'],
+                                   foundry_folders['core_data_folder'], None,
+                                   encoder=half_copy_encoder, webp_cache_size=0)
+
+    img_paths_to_search = {'worlds/test/img/map.png', 'worlds/test/img/gone.png', 'worlds/test/img/flag.png'}
+    assert (my_world_refs.find_img_paths_mentioned_in_world_files(img_paths_to_search)
+            == {'worlds/test/img/flag.png'})
+
+
+def test_appended_db_changes_still_move_converted_images_to_trash(foundry_folders, half_copy_encoder):
+    world_path = foundry_folders['world_path']
+    write_png(world_path / 'img' / 'map.png')
+    write_db(world_path / 'data' / 'actors.db', [{'_id': 'a', 'name': 'Map', 'img': 'worlds/test/img/map.png'},
+                                                 {'_id': 'b', 'name': 'Token'},
+                                                 {'_id': 'c', 'name': 'Other token'}])
+
+    jwm.one_liner_compress_world(foundry_folders['user_data_folder'], foundry_folders['world_folder'],
+                                 foundry_folders['core_data_folder'], None, 'n',
+                                 append_db='y', encoder=half_copy_encoder, webp_cache_size=0)
+
+    # The old line is still in the file, but it was superseded by the new one
+    with open(world_path / 'data' / 'actors.db', encoding='utf-8') as fin:
+        db_lines = fin.readlines()
+    assert len(db_lines) == 4
+    assert 'worlds/test/img/map.webp' in db_lines[-1]
+
+    assert (world_path / 'img' / 'map.webp').is_file()
+    assert not (world_path / 'img' / 'map.png').exists()
+    assert (world_path / '_trash' / 'img' / 'map.png').is_file()
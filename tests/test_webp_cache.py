@@ -0,0 +1,34 @@
+'''
+Tests for the cache of ".webp" files shared by all worlds (see `webp_output_cache`).
+'''
+
+import os
+
+import jegasus_world_manager as jwm
+
+
+def test_fetched_files_are_independent_copies(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    my_webp_cache = jwm.webp_output_cache((tmp_path / 'webp_cache').as_posix())
+
+    (tmp_path / 'encoded.webp').write_bytes(b'RIFF encoded image')
+    my_webp_cache.store('img_hash', 'half_copy', 'encoded.webp')
+    assert my_webp_cache.fetch('img_hash', 'half_copy', 'fetched.webp')
+    assert (tmp_path / 'fetched.webp').read_bytes() == b'RIFF encoded image'
+
+    # Editing the fetched file in place must not touch the cache
+    with open(tmp_path / 'fetched.webp', 'r+b') as fout:
+        fout.write(b'XXXX')
+    cached_file_path = my_webp_cache.get_cached_file_path(my_webp_cache.get_key('img_hash', 'half_copy'))
+    assert not os.path.samefile(cached_file_path, tmp_path / 'fetched.webp')
+    with open(cached_file_path, 'rb') as fin:
+        assert fin.read() == b'RIFF encoded image'
+
+    assert my_webp_cache.fetch('img_hash', 'half_copy', 'fetched_again.webp')
+    assert (tmp_path / 'fetched_again.webp').read_bytes() == b'RIFF encoded image'
+
+
+def test_unknown_images_are_not_fetched(tmp_path):
+    my_webp_cache = jwm.webp_output_cache((tmp_path / 'webp_cache').as_posix())
+    assert not my_webp_cache.fetch('img_hash', 'half_copy', (tmp_path / 'fetched.webp').as_posix())
+    assert not (tmp_path / 'fetched.webp').exists()